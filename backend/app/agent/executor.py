@@ -1,7 +1,8 @@
 import json
 import logging
 from app.db.session import AsyncSessionLocal
-from app.services.chat_history import ChatHistoryService
+from app.services.chat_history import ChatHistoryService, MessageBuffer
+from app.core.config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
@@ -31,17 +32,8 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
                 await self.local.__aexit__(exc_type, exc_val, exc_tb)
 
     async with SessionContext(session) as db_session:
-        # Load messages (optional check)
-        # db_messages = await ChatHistoryService.get_recent_messages(db_session, conversation_id, limit=20)
-        
-        # Build Inputs
-        # NOTE: For now we trust graph state management or start fresh?
-        # Ideally we load from DB.
-        db_messages = await ChatHistoryService.get_recent_messages(db_session, conversation_id, limit=20)
-        
         from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
-        
-        initial_messages = []
+        from app.services.context_builder import build_context, count_tokens
         
         # Inject Dynamic System Prompt
         from app.services.plugin_manager import plugin_manager
@@ -102,9 +94,9 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
         # ----------------------------------------------------
         k8s_status_text = ""
         if "kubectl_plugin" in active_plugins:
-            from app.services.k8s_client import k8s_client
-            # Live Check
-            conn_status = k8s_client.check_connection()
+            from app.services.health_monitor import health_monitor
+            # Cached snapshot from the background health monitor (never blocks the turn)
+            conn_status = health_monitor.kubernetes()
             if conn_status["connected"]:
                 k8s_status_text = "## CLUSTER STATUS: [ONLINE] ✅\n(You are connected to the cluster. You may run kubectl commands.)"
             else:
@@ -126,29 +118,14 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
 ## CRITICAL RULES:
 {rules_text}
 """
-        initial_messages.append(SystemMessage(content=system_content))
+        # Build Inputs: system prompt + rolling summary + recent history within the token budget
+        initial_messages = await build_context(
+            db_session, conversation_id, SystemMessage(content=system_content),
+            pending_tokens=count_tokens(last_user_message or "")
+        )
         
-        for msg in db_messages:
-            if msg.role == "user":
-                initial_messages.append(HumanMessage(content=msg.content))
-            elif msg.role == "assistant":
-                content = msg.content or ""
-                tool_calls = []
-                
-                # Check for serialized tool calls
-                if ":::TOOL_CALLS:::" in content:
-                    parts = content.split(":::TOOL_CALLS:::")
-                    content = parts[0].strip() # The visible text
-                    try:
-                        import json
-                        tool_calls = json.loads(parts[1])
-                    except (IndexError, json.JSONDecodeError):
-                        logger.warning("Failed to parse persisted tool calls")
-                
-                initial_messages.append(AIMessage(content=content, tool_calls=tool_calls))
-            elif msg.role == "tool":
-                call_id = getattr(msg, "tool_call_id", "unknown") 
-                initial_messages.append(ToolMessage(tool_call_id=call_id, content=msg.content, name="unknown"))
+        # Messages of this run are written behind, batched per graph step (CHAT_PERSIST_DURABILITY)
+        buffer = MessageBuffer(db_session, conversation_id, settings.CHAT_PERSIST_DURABILITY)
         
         # New User Message (Append and Persist)
         if last_user_message:
@@ -159,7 +136,7 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
             try:
                 # Ensure conversation exists first!
                 await ChatHistoryService.ensure_conversation(db_session, conversation_id, conversation_type)
-                await ChatHistoryService.add_message(db_session, conversation_id, "user", last_user_message)
+                await buffer.add("user", last_user_message)
             except Exception as e:
                 logger.error(f"Failed to save user prompt: {e}")
         
@@ -191,7 +168,7 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
                     content = ""
                     is_valid_msg = False
                     
-                    if hasattr(output, "content") and output.content:
+                    if hasattr(output, "content") and (output.content or getattr(output, "tool_calls", None)):
                         content = output.content
                         is_valid_msg = True
                     elif isinstance(output, str):
@@ -199,28 +176,10 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
                         is_valid_msg = True
                     
                     if is_valid_msg:
-                         # Serialize Tool Calls if present
-                         tool_calls_data = []
-                         if hasattr(output, "tool_calls") and output.tool_calls:
-                             tool_calls_data = output.tool_calls
-                             
-                         # Construct persistable content
-                         # If we have tool calls, we MUST save them to restore state later.
-                         # Format: <Visible Content>\n:::TOOL_CALLS:::<JSON>
-                         persist_content = content
-                         if tool_calls_data:
-                             if not persist_content:
-                                 # Add a placeholder for UI visibility
-                                 persist_content = "🤖 [Thinking/Tool Use]"
-                             
-                             import json
-                             json_calls = json.dumps(tool_calls_data)
-                             persist_content += f"\n:::TOOL_CALLS:::{json_calls}"
-                         
-                         try:
-                            saved_msg = await ChatHistoryService.add_message(db_session, conversation_id, "assistant", persist_content)
-                         except Exception as e:
-                            logger.error(f"Persist Fail: {e}")
+                         # Tool calls are stored as rows (tool_calls table) to restore state later
+                         tool_calls_data = getattr(output, "tool_calls", None) or []
+                         await buffer.add("assistant", content, dedupe_key=getattr(output, "id", None) or content,
+                                          tool_calls=tool_calls_data)
                     
                     # Notify Tool Starts
                     if hasattr(output, "tool_calls") and output.tool_calls:
@@ -238,14 +197,9 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
                         for msg in node_output["messages"]:
                             # Check for AIMessage (relaxed check)
                             if hasattr(msg, "content") and msg.content and getattr(msg, "type", "") == "ai":
-                                 try:
-                                    # Deduplicate? ChatHistoryService logic helps?
-                                    # Ideally we rely on ID, but we generate new ID.
-                                    # Simple check: Was the last message same content?
-                                    # For now, just append.
-                                    await ChatHistoryService.add_message(db_session, conversation_id, "assistant", msg.content)
-                                 except Exception as e:
-                                    pass
+                                 # Usually already buffered by on_chat_model_end (deduplicated by id / content)
+                                 await buffer.add("assistant", msg.content, dedupe_key=getattr(msg, "id", None) or msg.content)
+                    await buffer.step_done()
 
                 # 4. Tool Execution Complete
                 elif kind == "on_chain_end" and name == "tools":
@@ -258,17 +212,10 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
                                     "output": msg.content
                                 })
                                 
-                                try:
-                                    await ChatHistoryService.add_message(
-                                        db_session, 
-                                        conversation_id, 
-                                        "tool", 
-                                        msg.content,
-                                        tool_call_id=msg.tool_call_id
-                                    )
-                                except Exception as e:
-                                    pass
+                                await buffer.add("tool", msg.content, tool_call_id=msg.tool_call_id, tool_name=msg.name)
+                    await buffer.step_done()
             
+            await buffer.flush()
             await stream_handler.send({"type": "done"})
 
         except asyncio.CancelledError:
@@ -279,3 +226,8 @@ async def run_agent_graph(stream_handler, conversation_id: str, last_user_messag
         except Exception as e:
             logger.exception(f"Graph Execution Error: {e}")
             await stream_handler.send({"type": "error", "content": str(e)})
+        finally:
+            # Completion, failure or cancellation: whatever is still buffered is written now
+            await buffer.flush()
+            if buffer.pending:
+                logger.error(f"Lost {buffer.pending} unpersisted messages for Conversation {conversation_id}")
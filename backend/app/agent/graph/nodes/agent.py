@@ -9,24 +9,37 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-async def agent_node(state: AgentState):
-    """
-    Invokes the LLM with the current state messages and bound tools.
-    """
-    config = LLMConfigManager.get_config()
-    
-    if not config.api_key:
-        return {"messages": [SystemMessage(content="❌ **Error**: OpenAI API Key is missing. Please configure it in System Settings.")]}
-        
-    llm = ChatOpenAI(
-        model=config.model_name or "gpt-4-turbo", 
-        api_key=config.api_key, 
-        base_url=config.base_url,
-        temperature=0.1
-    )
+# Cached across graph steps and investigations so the provider connection pool stays warm.
+# (api_key, base_url, model_name) -> ChatOpenAI
+_llm_cache: dict = {}
+# (api_key, base_url, model_name, tools_schema_version) -> model with tools bound
+_bound_cache: dict = {}
+
+def get_llm(config) -> ChatOpenAI:
+    """Return the shared ChatOpenAI client for `config` (no tools bound)."""
+    llm_key = (config.api_key, config.base_url, config.model_name)
+    llm = _llm_cache.get(llm_key)
+    if llm is None:
+        # Config changed: drop clients built for the old key
+        _llm_cache.clear()
+        llm = ChatOpenAI(
+            model=config.model_name or "gpt-4-turbo", 
+            api_key=config.api_key, 
+            base_url=config.base_url,
+            temperature=0.1
+        )
+        _llm_cache[llm_key] = llm
+    return llm
+
+def get_bound_model(config):
+    """Return the ChatOpenAI for `config` with the current plugin tools bound, building it only when needed."""
+    bound_key = (config.api_key, config.base_url, config.model_name, plugin_manager.tools_schema_version)
+    model_with_tools = _bound_cache.get(bound_key)
+    if model_with_tools is not None:
+        return model_with_tools
+
+    llm = get_llm(config)
 
-    messages = state["messages"]
-    
     # Get tools from enabled plugins
     tools_schema = plugin_manager.get_all_tools_schema()
     
@@ -36,6 +49,24 @@ async def agent_node(state: AgentState):
         model_with_tools = llm.bind_tools(tools_schema)
     else:
         model_with_tools = llm
+
+    _bound_cache.clear()
+    _bound_cache[bound_key] = model_with_tools
+    logger.info(f"Built LLM binding: model={config.model_name}, tools={len(tools_schema)}, "
+                f"tools_schema_version={plugin_manager.tools_schema_version}")
+    return model_with_tools
+
+async def agent_node(state: AgentState):
+    """
+    Invokes the LLM with the current state messages and bound tools.
+    """
+    config = LLMConfigManager.get_config()
+    
+    if not config.api_key:
+        return {"messages": [SystemMessage(content="❌ **Error**: OpenAI API Key is missing. Please configure it in System Settings.")]}
+
+    messages = state["messages"]
+    model_with_tools = get_bound_model(config)
     
     # Invoke the model asynchronously
     try:
@@ -1,7 +1,8 @@
 import asyncio
 import json
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,48 +16,146 @@ class StreamHandler(ABC):
     async def send(self, data: Dict[str, Any]):
         pass
 
-class BroadcastStreamHandler(StreamHandler):
+class CoalescingStreamHandler(StreamHandler):
+    """
+    StreamHandler that numbers every frame (`seq`) and, when enabled, coalesces consecutive
+    "token" events into one frame flushed every STREAM_FLUSH_INTERVAL_MS or once
+    STREAM_FLUSH_MAX_BYTES of text are pending.
+    Any other event (tool_start, tool_result, done, error ...) first flushes pending tokens,
+    so clients see events in the order the agent produced them.
+    Subclasses implement _emit() to deliver a finished frame.
+    """
+    def __init__(self, coalesce: Optional[bool] = None):
+        from app.core.config import settings
+        self.coalesce = settings.STREAM_COALESCE_TOKENS if coalesce is None else coalesce
+        self.flush_interval = settings.STREAM_FLUSH_INTERVAL_MS / 1000
+        self.max_bytes = settings.STREAM_FLUSH_MAX_BYTES
+        self.seq = 0
+        self._tokens: List[str] = []
+        self._pending_bytes = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+
+    @abstractmethod
+    async def _emit(self, frame: Dict[str, Any]):
+        pass
+
+    async def send(self, data: Dict[str, Any]):
+        if self.coalesce and isinstance(data, dict) and data.get("type") == "token":
+            content = data.get("content") or ""
+            self._tokens.append(content)
+            self._pending_bytes += len(content.encode("utf-8"))
+            if self._pending_bytes >= self.max_bytes:
+                await self.flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._on_timer)
+            return
+
+        async with self._lock:
+            await self._flush_tokens()
+            await self._emit_next(data)
+
+    async def flush(self):
+        """Emit pending tokens now."""
+        async with self._lock:
+            await self._flush_tokens()
+
+    def _on_timer(self):
+        self._timer = None
+        asyncio.ensure_future(self.flush())
+
+    async def _flush_tokens(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._tokens:
+            return
+        tokens, self._tokens = self._tokens, []
+        self._pending_bytes = 0
+        await self._emit_next({"type": "token", "content": "".join(tokens), "count": len(tokens)})
+
+    async def _emit_next(self, data: Dict[str, Any]):
+        self.seq += 1
+        frame = {**data, "seq": self.seq} if isinstance(data, dict) else data
+        await self._emit(frame)
+
+class BroadcastStreamHandler(CoalescingStreamHandler):
     """
     Broadcasts events to multiple listeners (WebSockets).
-    Supports late-joining listeners by buffering recent critical events (optional, for now just realtime).
+
+    - Every listener gets a bounded queue (STREAM_LISTENER_QUEUE_SIZE). When a slow consumer's
+      queue is full, STREAM_SLOW_CONSUMER_POLICY decides:
+        "resync":      its queue is cleared and replaced by one {"type": "resync", "last_seq": N} frame;
+                       the reader re-subscribes from N and catches up from the replay buffer.
+        "drop_oldest": the oldest queued frame is dropped.
+    - The last STREAM_REPLAY_BUFFER_SIZE frames are kept in a ring buffer, so late joiners and
+      reconnecting clients can resume with subscribe(last_seq) instead of reloading history.
     """
-    def __init__(self):
+    def __init__(self, coalesce: Optional[bool] = None, conversation_id: Optional[str] = None):
+        super().__init__(coalesce)
+        from app.core.config import settings
+        # Set when frames should also reach other workers (see StreamBroker)
+        self.conversation_id = conversation_id
+        self.run_id: Optional[str] = None
         self.listeners: List[asyncio.Queue] = []
-        self._buffer: List[Dict[str, Any]] = [] # Optional: Keep last N events?
+        self.queue_size = max(2, settings.STREAM_LISTENER_QUEUE_SIZE)
+        self.slow_consumer_policy = settings.STREAM_SLOW_CONSUMER_POLICY
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=settings.STREAM_REPLAY_BUFFER_SIZE)
+        self.dropped_total = 0
+        self.resyncs_total = 0
     
-    async def subscribe(self) -> asyncio.Queue:
+    async def subscribe(self, last_seq: Optional[int] = None) -> asyncio.Queue:
         """
         Creates a new queue for a listener and registers it.
+        With `last_seq`, frames after it that are still in the replay buffer are queued first.
         """
-        queue = asyncio.Queue()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if last_seq is not None:
+            oldest = self._buffer[0]["seq"] if self._buffer else self.seq + 1
+            if last_seq + 1 < oldest:
+                # Part of the gap has already left the ring buffer
+                queue.put_nowait({"type": "gap", "from_seq": last_seq + 1, "to_seq": oldest - 1})
+            for frame in self._buffer:
+                if frame["seq"] <= last_seq:
+                    continue
+                if queue.qsize() >= self.queue_size - 1:
+                    # Replay more than fits: hand over the rest through a resync
+                    queue.put_nowait({"type": "resync", "last_seq": frame["seq"] - 1})
+                    break
+                queue.put_nowait(frame)
         self.listeners.append(queue)
-        
-        # Optional: Replay history if needed?
-        # For now, we rely on DB history fetch for past events.
-        # This handler is strictly for REAL-TIME events.
         return queue
     
     def unsubscribe(self, queue: asyncio.Queue):
         if queue in self.listeners:
             self.listeners.remove(queue)
     
-    async def send(self, data: Dict[str, Any]):
+    async def _emit(self, frame: Dict[str, Any]):
         """
-        Broadcast data to all active listeners.
+        Broadcast a frame to all active listeners.
         """
-        # Prune closed listeners (if any)
-        # Actually unsubscribe should handle it.
-        
-        msg = json.dumps(data) if not isinstance(data, str) else data
-        
-        # Buffer (limit 50?)
-        # self._buffer.append(data)
-        # if len(self._buffer) > 50: self._buffer.pop(0)
-        
+        self._buffer.append(frame)
+        if self.conversation_id:
+            from app.services.stream_broker import stream_broker
+            await stream_broker.publish(self.conversation_id, frame, self.run_id)
         for queue in self.listeners:
             try:
                 # Non-blocking put
-                queue.put_nowait(data)
+                queue.put_nowait(frame)
             except asyncio.QueueFull:
-                logger.warning("Listener queue full, dropping message")
-                pass
+                self._on_slow_consumer(queue, frame)
+
+    def _on_slow_consumer(self, queue: asyncio.Queue, frame: Dict[str, Any]):
+        if self.slow_consumer_policy == "drop_oldest":
+            queue.get_nowait()
+            queue.put_nowait(frame)
+            self.dropped_total += 1
+            return
+        # resync: the reader has received everything before the oldest frame still queued
+        first = queue.get_nowait()
+        while not queue.empty():
+            queue.get_nowait()
+        last_seq = first["seq"] - 1 if "seq" in first else first.get("last_seq", frame["seq"] - 1)
+        queue.put_nowait({"type": "resync", "last_seq": last_seq})
+        self.resyncs_total += 1
+        logger.warning(f"Slow stream listener, resync from seq {last_seq}")
@@ -61,15 +61,32 @@ async def get_conversation_messages(conversation_id: str):
         if not conv:
             raise HTTPException(status_code=404, detail="Conversation not found")
 
-        messages = await ChatHistoryService.get_recent_messages(session, conversation_id, limit=100)
+        messages = await ChatHistoryService.get_recent_messages(session, conversation_id, limit=None)
         return [
             MessageItem(
                 role=m.role,
-                content=m.content,
+                # Placeholder for UI visibility of assistant turns that only call tools
+                content=m.content or ("🤖 [Thinking/Tool Use]" if m.tool_calls else m.content),
                 created_at=m.created_at.isoformat()
             ) for m in messages
         ]
 
+class ContextBudgetRequest(BaseModel):
+    token_budget: int | None = None # None resets to AGENT_CONTEXT_TOKEN_BUDGET
+
+@router.put("/conversations/{conversation_id}/context")
+async def set_conversation_context_budget(conversation_id: str, request: ContextBudgetRequest):
+    """Set the token budget of the context sent to the LLM for this conversation."""
+    from app.db.session import AsyncSessionLocal
+    from app.services.chat_history import ChatHistoryService
+    
+    if request.token_budget is not None and request.token_budget < 1000:
+        raise HTTPException(status_code=400, detail="token_budget must be at least 1000")
+    async with AsyncSessionLocal() as session:
+        if not await ChatHistoryService.set_token_budget(session, conversation_id, request.token_budget):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return {"status": "updated", "id": conversation_id, "token_budget": request.token_budget}
+
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """Delete a conversation."""
@@ -17,9 +17,15 @@ router = APIRouter()
 active_executions: Dict[str, Tuple[asyncio.Task, BroadcastStreamHandler]] = {}
 
 @router.websocket("/chat/ws")
-async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None = None):
+async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None = None, last_seq: int | None = None):
+    """
+    `last_seq`: seq of the last stream frame the client received before reconnecting.
+    If the investigation is still running, frames after it are replayed from the handler's buffer
+    (or the stream broker). The client is told with {"type": "resume", "running": bool}; when the
+    run is over it reloads the history instead.
+    """
     await websocket.accept()
-    logger.info(f"WebSocket connected. Request Conversation ID: {conversation_id}")
+    logger.info(f"WebSocket connected. Request Conversation ID: {conversation_id} (last_seq: {last_seq})")
     
     # Register connection for global broadcasting (e.g. Alerts)
     from app.services.connection_manager import manager
@@ -30,9 +36,13 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None =
     from app.db.session import AsyncSessionLocal
     from app.services.chat_history import ChatHistoryService
     
+    from app.services.stream_broker import stream_broker
+    
     # State for this connection
     current_queue: Optional[asyncio.Queue] = None
     current_handler: Optional[BroadcastStreamHandler] = None
+    # Queue from the stream broker when the run lives in another worker
+    remote_queue: Optional[asyncio.Queue] = None
     
     async with AsyncSessionLocal() as session:
         try:
@@ -51,11 +61,19 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None =
                     task, handler = active_executions[conversation_id]
                     if not task.done():
                         current_handler = handler
-                        current_queue = await handler.subscribe()
+                        current_queue = await handler.subscribe(last_seq)
                     else:
                         # Task finished but not cleaned up? Clean up.
                         del active_executions[conversation_id]
+                elif await stream_broker.is_running_elsewhere(conversation_id):
+                    # Running in another worker: follow it through the broker
+                    logger.info(f"Following {conversation_id} from another worker")
+                    remote_queue = await stream_broker.subscribe(conversation_id, last_seq)
+                    current_queue = remote_queue
                 
+                if last_seq is not None:
+                    await websocket.send_json({"type": "resume", "running": current_queue is not None})
+
                 # Notify frontend of ID if changed
                 if requested_id and requested_id != conversation_id:
                     await websocket.send_json({
@@ -94,6 +112,8 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None =
                             if conversation_id in active_executions:
                                 bg_task, _ = active_executions[conversation_id]
                                 bg_task.cancel()
+                            elif conversation_id:
+                                await stream_broker.request_cancel(conversation_id)
                             continue
                             
                         # USER MESSAGE
@@ -119,9 +139,14 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None =
                             old_task, old_handler = active_executions[conversation_id]
                             if not old_task.done():
                                 old_task.cancel()
+                        elif remote_queue is not None:
+                            await stream_broker.request_cancel(conversation_id)
+                        if remote_queue is not None:
+                            stream_broker.unsubscribe(remote_queue)
+                            remote_queue = None
                         
                         # 2. Create New Handler & Task
-                        new_handler = BroadcastStreamHandler()
+                        new_handler = BroadcastStreamHandler(conversation_id=conversation_id)
                         current_handler = new_handler
                         current_queue = await new_handler.subscribe()
                         # If we had a queue task waiting on old queue, cancel it
@@ -131,6 +156,8 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None =
                         
                         # Define the task wrapper to clean up self
                         async def background_wrapper(cid, h, msg):
+                            # Announce the run so other workers can follow and stop it
+                            h.run_id = await stream_broker.register_execution(cid, asyncio.current_task().cancel)
                             try:
                                 # Create a separate session for the background task since the WS session might close
                                 async with AsyncSessionLocal() as bg_session:
@@ -141,6 +168,8 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None =
                             except Exception as e:
                                 logger.error(f"Task {cid} error: {e}")
                             finally:
+                                await h.flush()
+                                await stream_broker.unregister_execution(cid, h.run_id)
                                 if cid in active_executions:
                                     # Only delete if it's still us (not replaced)
                                     if active_executions.get(cid) == (asyncio.current_task(), h):
@@ -164,6 +193,11 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None =
                     try:
                         msg = queue_task.result()
                         queue_task = None # Ready for next
+                        if msg.get("type") == "resync" and current_handler and current_queue is not remote_queue:
+                            # We fell behind: continue from the replay buffer at our own pace
+                            current_handler.unsubscribe(current_queue)
+                            current_queue = await current_handler.subscribe(msg["last_seq"])
+                            continue
                         await websocket.send_json(msg)
                     except asyncio.CancelledError:
                         queue_task = None
@@ -183,8 +217,12 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str | None =
             # Unsubscribe from handler
             if current_handler and current_queue:
                 current_handler.unsubscribe(current_queue)
+            if remote_queue is not None:
+                stream_broker.unsubscribe(remote_queue)
                 
         except Exception as e:
             logger.exception(f"WebSocket Error: {e}")
+            if remote_queue is not None:
+                stream_broker.unsubscribe(remote_queue)
             try: await websocket.send_json({"type": "error", "content": str(e)})
             except: pass
@@ -1,22 +1,52 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import HTMLResponse
 from app.features.patrol.patrol_service import patrol_service
+from app.features.patrol.report_store import patrol_report_store
 
 router = APIRouter()
 
 @router.post("/run")
-async def run_patrol():
+async def run_patrol(full: bool = False):
     """
     Trigger immediate patrol (Patrol 2.0)
+    `full=true` re-evaluates every pod, changed or not, instead of only those changed since the last run.
     """
-    return await patrol_service.run_patrol()
+    from app.features.patrol.scheduler import patrol_scheduler
+    # Runs in the leader worker (which owns the run lock, dispatcher and findings baseline)
+    return await patrol_scheduler.request_run(incremental=False if full else None)
 
 @router.get("/visualize/{report_id}", response_class=HTMLResponse)
 async def get_visualization(report_id: str):
     """
     Get the interactive HTML visualization for a specific report
     """
-    html = patrol_service.report_cache.get(report_id)
-    if not html:
+    report = await patrol_report_store.get(report_id)
+    if not report:
         return "<h1>Report not found or expired</h1>"
-    return html
+    return patrol_service.render_html(report["data"])
+
+@router.get("/reports")
+async def list_reports(limit: int = 50):
+    """
+    Recent patrol reports, newest first (metadata only)
+    """
+    return {"reports": await patrol_report_store.list(min(limit, 500)), "cache": patrol_report_store.stats()}
+
+@router.get("/reports/{report_id}")
+async def get_report(report_id: str):
+    """
+    A stored patrol report: {"data", "markdown"}
+    """
+    report = await patrol_report_store.get(report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return {"id": report_id, **report}
+
+@router.get("/scheduler")
+async def get_scheduler_status():
+    """
+    Periodic patrol schedule, last run, the investigation dispatcher's load and the findings baseline,
+    as published by the leader worker (which runs every patrol); `worker` is the lease of the worker answering.
+    """
+    from app.features.patrol.scheduler import patrol_scheduler
+    return await patrol_scheduler.status()
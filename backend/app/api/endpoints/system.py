@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.services.k8s_client import k8s_client
+from app.services.health_monitor import health_monitor
 
 router = APIRouter()
 
@@ -7,8 +7,61 @@ router = APIRouter()
 async def get_system_status():
     """
     Get current system status, including Kubernetes connection.
+    Served from the background health monitor's snapshot.
     """
-    k8s_status = k8s_client.check_connection()
     return {
-        "kubernetes": k8s_status
+        "kubernetes": health_monitor.kubernetes(),
+        "components": health_monitor.snapshot()
     }
+
+@router.get("/alert-queue")
+async def get_alert_queue_stats():
+    """
+    Live alert queue depth and in-flight investigation counts (for sizing the worker pool).
+    """
+    from app.services.alert_queue import AlertQueueService
+    from app.services.leader_lease import leader_lease
+    return {**AlertQueueService().stats(), "leader": leader_lease.status()}
+
+@router.get("/tools")
+async def get_tool_stats():
+    """
+    Tool execution pool usage and result cache hit/miss counters.
+    """
+    from app.services.tool_executor import tool_executor
+    from app.services.tool_cache import tool_cache
+    return {"executor": tool_executor.stats(), "cache": tool_cache.stats()}
+
+@router.get("/tools/usage")
+async def get_tool_usage(conversation_id: str | None = None):
+    """
+    Tool call counts by tool name, across all conversations (or one).
+    """
+    from app.db.session import AsyncSessionLocal
+    from app.services.chat_history import ChatHistoryService
+    async with AsyncSessionLocal() as session:
+        return await ChatHistoryService.get_tool_usage(session, conversation_id)
+
+@router.get("/stream-broker")
+async def get_stream_broker_stats():
+    """
+    Cross-process stream broker state: backend, runs owned by this worker, local subscribers.
+    """
+    from app.services.stream_broker import stream_broker
+    return stream_broker.stats()
+
+@router.get("/connections")
+async def get_connection_stats():
+    """
+    Broadcast WebSocket connections of this worker: pending frames, sent and evicted counts.
+    """
+    from app.services.connection_manager import manager
+    return manager.stats()
+
+@router.get("/cluster-cache")
+async def get_cluster_cache_stats():
+    """
+    Watch cache of pods / nodes / events / deployments: sync state, object counts, resourceVersion, relists.
+    """
+    from app.services.cluster_cache import cluster_cache
+    return cluster_cache.stats()
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import JSONResponse
+from app.core.config import settings
 from app.schemas.alert import AlertmanagerPayload
 from app.services.alert_queue import AlertQueueService
 import logging
@@ -13,17 +15,35 @@ alert_queue = AlertQueueService()
 async def receive_alert(payload: AlertmanagerPayload):
     """
     Receive webhook from Prometheus Alertmanager.
+    Returns 503 + Retry-After when the queue is full so Alertmanager retries later.
     """
     try:
-        # Lazy Start Worker
-        if not alert_queue.is_running:
-             import asyncio
-             asyncio.create_task(alert_queue.process_queue())
-             logger.info("Started AlertQueueService worker lazily.")
+        # Lazy Start Worker (no-op if already started; in journal mode only the leader consumes)
+        alert_queue.start()
 
         logger.info(f"Received webhook from Alertmanager: {len(payload.alerts)} alerts")
-        await alert_queue.enqueue(payload)
-        return {"status": "queued", "alert_count": len(payload.alerts)}
+        result = await alert_queue.enqueue(payload)
     except Exception as e:
         logger.error(f"Failed to process webhook: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+    if result["rejected"]:
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": str(settings.ALERT_QUEUE_RETRY_AFTER_SECONDS)},
+            content={
+                "status": "overloaded",
+                "alert_count": len(payload.alerts),
+                "accepted": result["accepted"],
+                "rejected": result["rejected"],
+                "coalesced": result["coalesced"],
+                "correlated": result["correlated"],
+            }
+        )
+    return {
+        "status": "queued",
+        "alert_count": len(payload.alerts),
+        "accepted": result["accepted"],
+        "coalesced": result["coalesced"],
+        "correlated": result["correlated"],
+    }
@@ -21,6 +21,36 @@ class Settings(BaseSettings):
     # 如果在集群内运行，通常不需要配置 KUBECONFIG，使用 ServiceAccount
     KUBE_IN_CLUSTER: bool = Field(True, env="KUBE_IN_CLUSTER")
     KUBECONFIG: str | None = Field(None, env="KUBECONFIG")
+    # K8s API 调用专用线程池大小 (同时也是 HTTP 连接池大小) 与单次请求超时
+    K8S_CLIENT_THREADS: int = Field(16, env="K8S_CLIENT_THREADS")
+    K8S_REQUEST_TIMEOUT_SECONDS: float = Field(30.0, env="K8S_REQUEST_TIMEOUT_SECONDS")
+    # 常见只读 kubectl 命令 (get/describe/logs/top) 直接走 API 客户端，不再每次启动 kubectl 子进程
+    KUBECTL_IN_PROCESS: bool = Field(True, env="KUBECTL_IN_PROCESS")
+    # Pod / Node / Event / Deployment 的 Watch 内存缓存 (List+Watch)，读取不再访问 apiserver
+    CLUSTER_CACHE_ENABLED: bool = Field(True, env="CLUSTER_CACHE_ENABLED")
+    # 每个运行缓存的 Worker 都持有一份完整副本并保持 4 个 Watch，默认只在 Leader Worker 中运行
+    CLUSTER_CACHE_ALL_WORKERS: bool = Field(False, env="CLUSTER_CACHE_ALL_WORKERS")
+    # 超过该时间未收到 apiserver 的任何响应 (Watch 持续失败) 视为过期，读取回退到 apiserver
+    CLUSTER_CACHE_MAX_STALENESS_SECONDS: int = Field(120, env="CLUSTER_CACHE_MAX_STALENESS_SECONDS")
+    # 全量 List 分页大小 (limit + continue)
+    CLUSTER_CACHE_PAGE_SIZE: int = Field(500, env="CLUSTER_CACHE_PAGE_SIZE")
+    # 巡检分页扫描每页 Pod 数 (limit + continue)
+    PATROL_PAGE_SIZE: int = Field(500, env="PATROL_PAGE_SIZE")
+    # 增量巡检: 只重新评估上次巡检后发生变化的 Pod，已有调查进行中的 Pod 不重复派发
+    PATROL_INCREMENTAL: bool = Field(True, env="PATROL_INCREMENTAL")
+    # 定时巡检 (仅 Leader Worker)：间隔 + 0..N 秒随机抖动，默认 0 = 关闭 (开启后发现异常会自动发起 LLM 调查)；
+    # 单次巡检截止时间，超时记为失败。手动巡检也统一交给 Leader 执行
+    PATROL_INTERVAL_SECONDS: int = Field(0, env="PATROL_INTERVAL_SECONDS")
+    PATROL_JITTER_SECONDS: int = Field(30, env="PATROL_JITTER_SECONDS")
+    PATROL_RUN_DEADLINE_SECONDS: int = Field(120, env="PATROL_RUN_DEADLINE_SECONDS")
+    # 巡检触发的 Agent 调查: 并发上限、排队上限、单次调查超时
+    PATROL_MAX_INVESTIGATIONS: int = Field(3, env="PATROL_MAX_INVESTIGATIONS")
+    PATROL_MAX_PENDING_INVESTIGATIONS: int = Field(20, env="PATROL_MAX_PENDING_INVESTIGATIONS")
+    PATROL_INVESTIGATION_TIMEOUT_SECONDS: int = Field(900, env="PATROL_INVESTIGATION_TIMEOUT_SECONDS")
+    # 巡检报告: 数据库保留最近 N 份 (zlib 压缩)，每个 Worker 内存 LRU 缓存大小与 TTL
+    PATROL_REPORT_RETENTION: int = Field(1000, env="PATROL_REPORT_RETENTION")
+    PATROL_REPORT_CACHE_SIZE: int = Field(64, env="PATROL_REPORT_CACHE_SIZE")
+    PATROL_REPORT_CACHE_TTL_SECONDS: int = Field(3600, env="PATROL_REPORT_CACHE_TTL_SECONDS")
 
     # Database
     DATABASE_URL: str = Field("sqlite+aiosqlite:///./app.db", env="DATABASE_URL")
@@ -30,6 +60,85 @@ class Settings(BaseSettings):
     OPENAI_BASE_URL: str | None = Field("https://api.openai.com/v1", env="OPENAI_BASE_URL")
     MODEL_NAME: str | None = Field("gpt-4-turbo", env="MODEL_NAME")
 
+    # Streaming (WebSocket)
+    # 合并 LLM Token 帧: 每 N 毫秒或累计 N 字节发送一次，非 Token 事件会先冲刷已缓存的 Token
+    STREAM_COALESCE_TOKENS: bool = Field(True, env="STREAM_COALESCE_TOKENS")
+    STREAM_FLUSH_INTERVAL_MS: int = Field(50, env="STREAM_FLUSH_INTERVAL_MS")
+    STREAM_FLUSH_MAX_BYTES: int = Field(2048, env="STREAM_FLUSH_MAX_BYTES")
+    # 每个 WebSocket 监听者的队列上限；慢消费者策略: resync (清空后从回放缓冲区追赶) / drop_oldest
+    STREAM_LISTENER_QUEUE_SIZE: int = Field(1000, env="STREAM_LISTENER_QUEUE_SIZE")
+    STREAM_SLOW_CONSUMER_POLICY: str = Field("resync", env="STREAM_SLOW_CONSUMER_POLICY")
+    # 最近事件回放缓冲区 (断线重连时通过 last_seq 续传)
+    STREAM_REPLAY_BUFFER_SIZE: int = Field(2000, env="STREAM_REPLAY_BUFFER_SIZE")
+    # 广播 (告警/巡检流) 的每连接发送队列与单帧发送超时；队列溢出或超时的连接会被剔除并关闭
+    WS_OUTBOUND_QUEUE_SIZE: int = Field(1000, env="WS_OUTBOUND_QUEUE_SIZE")
+    WS_SEND_TIMEOUT_SECONDS: float = Field(5.0, env="WS_SEND_TIMEOUT_SECONDS")
+
+    # 流事件 / 停止指令的跨 Worker 分发: memory (单进程) / sqlite (同一 Pod 内多个 gunicorn Worker 共享本地文件)
+    STREAM_BROKER: str = Field("sqlite", env="STREAM_BROKER")
+    STREAM_BROKER_PATH: str = Field("./stream_broker.db", env="STREAM_BROKER_PATH")
+    STREAM_BROKER_POLL_MS: int = Field(50, env="STREAM_BROKER_POLL_MS")
+    STREAM_BROKER_RETENTION_SECONDS: int = Field(600, env="STREAM_BROKER_RETENTION_SECONDS")
+
+    # Health Monitor (K8s API / Prometheus / Loki / LLM)
+    # 后台周期探测依赖健康状态，Agent 构建 Prompt 与状态接口只读取缓存快照
+    HEALTH_CHECK_INTERVAL_SECONDS: float = Field(15.0, env="HEALTH_CHECK_INTERVAL_SECONDS")
+    HEALTH_CHECK_MAX_BACKOFF_SECONDS: float = Field(120.0, env="HEALTH_CHECK_MAX_BACKOFF_SECONDS")
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = Field(3.0, env="HEALTH_CHECK_TIMEOUT_SECONDS")
+    # 连续失败 N 次才判定为不可用 (避免集群抖动时 Prompt 来回切换)
+    HEALTH_FAILURE_THRESHOLD: int = Field(2, env="HEALTH_FAILURE_THRESHOLD")
+
+    # Agent Context Window
+    # 每个会话发送给 LLM 的上下文 Token 上限 (可在会话上单独覆盖)，超出部分滚动摘要后持久化
+    AGENT_CONTEXT_TOKEN_BUDGET: int = Field(24000, env="AGENT_CONTEXT_TOKEN_BUDGET")
+    # 超出预算时裁剪到预算的该比例，避免每一轮都触发摘要
+    AGENT_CONTEXT_TARGET_RATIO: float = Field(0.6, env="AGENT_CONTEXT_TARGET_RATIO")
+    AGENT_SUMMARY_MAX_TOKENS: int = Field(800, env="AGENT_SUMMARY_MAX_TOKENS")
+    # 单次最多从数据库加载的历史消息条数 (摘要之后的部分)
+    AGENT_HISTORY_MAX_MESSAGES: int = Field(400, env="AGENT_HISTORY_MAX_MESSAGES")
+
+    # 会话消息写入策略: message (逐条提交) / step (每个 Graph 步骤一次事务) / end (运行结束时一次提交)
+    CHAT_PERSIST_DURABILITY: str = Field("step", env="CHAT_PERSIST_DURABILITY")
+
+    # Alert Queue (Active Monitoring)
+    # Workers: 并发消费队列的协程数量
+    ALERT_QUEUE_WORKERS: int = Field(4, env="ALERT_QUEUE_WORKERS")
+    # 全局同时进行中的调查上限 (LLM 调用成本控制)
+    ALERT_MAX_CONCURRENT_INVESTIGATIONS: int = Field(4, env="ALERT_MAX_CONCURRENT_INVESTIGATIONS")
+    # 单个 Namespace 同时进行中的调查上限 (防止单个业务告警风暴占满所有 Worker)
+    ALERT_MAX_INVESTIGATIONS_PER_NAMESPACE: int = Field(2, env="ALERT_MAX_INVESTIGATIONS_PER_NAMESPACE")
+    # 队列容量上限，满了之后优先丢弃低级别告警，并向 Alertmanager 返回 503
+    ALERT_QUEUE_MAXSIZE: int = Field(1000, env="ALERT_QUEUE_MAXSIZE")
+    ALERT_QUEUE_RETRY_AFTER_SECONDS: int = Field(30, env="ALERT_QUEUE_RETRY_AFTER_SECONDS")
+    # 相同指纹 (labels) 的告警在该滑动窗口内只触发一次调查，重复告警挂到进行中的调查上
+    ALERT_DEDUP_WINDOW_SECONDS: int = Field(300, env="ALERT_DEDUP_WINDOW_SECONDS")
+    # 拓扑关联: 同一节点 / 同一 Owner (Deployment/StatefulSet) / 同一 Namespace 的告警在窗口内合并为一次调查
+    ALERT_CORRELATION_WINDOW_SECONDS: int = Field(120, env="ALERT_CORRELATION_WINDOW_SECONDS")
+    TOPOLOGY_REFRESH_SECONDS: int = Field(60, env="TOPOLOGY_REFRESH_SECONDS")
+    # 队列模式: memory (进程内, 重启丢失) / journal (本地 SQLite WAL 日志, 重启后重放未确认的告警)
+    # gunicorn 多 Worker 部署时使用 journal: Follower Worker 只写日志，由 Leader Worker 统一消费
+    ALERT_QUEUE_MODE: str = Field("journal", env="ALERT_QUEUE_MODE")
+    ALERT_JOURNAL_PATH: str = Field("./alert_journal.db", env="ALERT_JOURNAL_PATH")
+    # 批量提交间隔 (group commit)，并发的 Webhook 共享一次 fsync
+    ALERT_JOURNAL_FLUSH_INTERVAL_MS: int = Field(20, env="ALERT_JOURNAL_FLUSH_INTERVAL_MS")
+    # Leader 轮询 Follower 写入的新告警的间隔
+    ALERT_JOURNAL_POLL_INTERVAL_MS: int = Field(200, env="ALERT_JOURNAL_POLL_INTERVAL_MS")
+
+    # Tool Execution (Agent)
+    # 同步工具 (kubectl / k8sgpt / 知识库) 在独立线程池中执行，不阻塞事件循环
+    TOOL_EXECUTOR_THREADS: int = Field(16, env="TOOL_EXECUTOR_THREADS")
+    # 单个工具在整个进程内的并发上限，格式: "run_kubectl=8,save_insight=1"
+    TOOL_DEFAULT_CONCURRENCY: int = Field(4, env="TOOL_DEFAULT_CONCURRENCY")
+    TOOL_CONCURRENCY_LIMITS: str = Field("run_kubectl=8,run_k8sgpt=2,save_insight=1", env="TOOL_CONCURRENCY_LIMITS")
+    # 只读工具 (kubectl get/describe/logs, PromQL, LogQL ...) 的结果缓存，跨调查共享
+    TOOL_CACHE_TTL_SECONDS: float = Field(30.0, env="TOOL_CACHE_TTL_SECONDS")
+    TOOL_CACHE_MAX_ENTRIES: int = Field(512, env="TOOL_CACHE_MAX_ENTRIES")
+
+    # Leader Election (gunicorn workers in one pod)
+    # 告警消费 / 定时巡检等后台单例任务只在持有该文件锁的 Worker 中运行
+    LEADER_LOCK_PATH: str = Field("./aiops_leader.lock", env="LEADER_LOCK_PATH")
+    LEADER_RETRY_INTERVAL_SECONDS: float = Field(5.0, env="LEADER_RETRY_INTERVAL_SECONDS")
+
     class Config:
         # Prioritize root .env, then backend/.env
         env_file = [
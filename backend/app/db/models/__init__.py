@@ -1,5 +1,6 @@
-from app.db.models.chat import Conversation, Message
+from app.db.models.chat import Conversation, Message, ToolCall
 from app.db.models.plugin import PluginState
 from app.db.models.alert import Alert
 from app.db.models.automation import AutomationHistory
+from app.db.models.patrol import PatrolReport, PatrolState, PatrolRunRequest
 from app.models.setting import SystemSetting
@@ -14,6 +14,10 @@ class Conversation(Base):
     title = Column(String, nullable=True)
     type = Column(String, default="chat", index=True) # chat, alert
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Rolling summary of the history that no longer fits the context window
+    summary = Column(Text, nullable=True)
+    summary_upto_id = Column(Integer, nullable=True) # Last Message.id folded into summary
+    token_budget = Column(Integer, nullable=True) # Per-conversation override of AGENT_CONTEXT_TOKEN_BUDGET
     
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
 
@@ -25,6 +29,24 @@ class Message(Base):
     role = Column(String, nullable=False) # user, assistant, system, tool
     content = Column(Text, nullable=True)
     tool_call_id = Column(String, nullable=True) # For tool outputs
+    tool_name = Column(String, nullable=True) # For tool outputs
     created_at = Column(DateTime, default=datetime.utcnow)
 
     conversation = relationship("Conversation", back_populates="messages")
+    # Tool calls requested by an assistant message (loaded with the message)
+    tool_calls = relationship("ToolCall", back_populates="message", cascade="all, delete-orphan",
+                              order_by="ToolCall.position", lazy="selectin")
+
+class ToolCall(Base):
+    __tablename__ = "tool_calls"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"), nullable=False, index=True)
+    conversation_id = Column(String, nullable=False, index=True)
+    call_id = Column(String, nullable=False, index=True) # Matches Message.tool_call_id of the result
+    name = Column(String, nullable=False, index=True)
+    args = Column(Text, nullable=True) # JSON
+    position = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    message = relationship("Message", back_populates="tool_calls")
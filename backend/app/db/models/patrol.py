@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, LargeBinary
+from datetime import datetime
+from app.db.base import Base
+
+class PatrolReport(Base):
+    __tablename__ = "patrol_reports"
+
+    id = Column(String, primary_key=True) # UUID
+    status = Column(String) # success, warning, failed
+    mode = Column(String, nullable=True) # full, incremental
+    issue_count = Column(Integer, default=0)
+    payload = Column(LargeBinary) # zlib-compressed JSON: {"data": ..., "markdown": ...}
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class PatrolState(Base):
+    __tablename__ = "patrol_state"
+
+    key = Column(String, primary_key=True) # e.g. "findings"
+    payload = Column(LargeBinary) # zlib-compressed JSON
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PatrolRunRequest(Base):
+    __tablename__ = "patrol_run_requests"
+
+    id = Column(String, primary_key=True) # UUID
+    incremental = Column(Boolean, nullable=True) # None: PATROL_INCREMENTAL
+    status = Column(String, default="pending") # pending, done, expired
+    report_id = Column(String, nullable=True) # None when the run was skipped
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+InvestigationKey = Tuple[str, str, str]  # (namespace, pod, container)
+
+class PatrolDispatcher:
+    """
+    Runs patrol investigations as tracked background tasks.
+
+    - At most `max_concurrent` agent runs at a time; up to `max_pending` more wait for a slot.
+      Beyond that, submissions are refused (the finding is retried on a later patrol).
+    - A pod/container that already has a queued or running investigation is refused.
+    - Each run is limited to `timeout` seconds.
+    """
+    def __init__(self, max_concurrent: int, max_pending: int, timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: Dict[InvestigationKey, asyncio.Task] = {}
+        self._running = 0
+        self.started_total = 0
+        self.refused_total = 0
+        self.timed_out_total = 0
+
+    def is_active(self, key: InvestigationKey) -> bool:
+        return key in self._tasks
+
+    def submit(self, key: InvestigationKey, conversation_id: str, prompt: str,
+               on_done: Optional[Callable[[], None]] = None) -> bool:
+        """Queue an investigation; False when it is a duplicate or the dispatcher is full."""
+        if key in self._tasks:
+            self.refused_total += 1
+            return False
+        if len(self._tasks) >= self.max_concurrent + self.max_pending:
+            self.refused_total += 1
+            logger.warning(f"Patrol dispatcher full ({len(self._tasks)} investigations), deferring {key[0]}/{key[1]}")
+            return False
+
+        task = asyncio.create_task(self._run(key, conversation_id, prompt))
+        self._tasks[key] = task
+
+        def finished(_):
+            self._tasks.pop(key, None)
+            if on_done:
+                on_done()
+        task.add_done_callback(finished)
+        return True
+
+    async def _run(self, key: InvestigationKey, conversation_id: str, prompt: str):
+        from app.agent.executor import run_agent_graph
+        from app.services.alert_queue import AlertStreamHandler
+        from app.services.stream_broker import stream_broker
+
+        async with self._semaphore:
+            self._running += 1
+            self.started_total += 1
+            stream_handler = AlertStreamHandler(conversation_id)
+            # Announce the run so UI clients (on any worker) can follow and stop it
+            stream_handler.run_id = await stream_broker.register_execution(conversation_id, asyncio.current_task().cancel)
+            try:
+                await asyncio.wait_for(run_agent_graph(
+                    stream_handler=stream_handler,
+                    conversation_id=conversation_id,
+                    last_user_message=prompt,
+                    session=None,
+                    conversation_type="patrol"
+                ), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self.timed_out_total += 1
+                logger.warning(f"Patrol investigation {conversation_id} ({key[0]}/{key[1]}) exceeded {self.timeout}s")
+            except Exception as e:
+                logger.error(f"Patrol investigation {conversation_id} failed: {e}")
+            finally:
+                self._running -= 1
+                await stream_handler.flush()
+                await stream_broker.unregister_execution(conversation_id, stream_handler.run_id)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "pending": len(self._tasks) - self._running,
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+            "started_total": self.started_total,
+            "refused_total": self.refused_total,
+            "timed_out_total": self.timed_out_total,
+        }
+
+# 全局单例
+patrol_dispatcher = PatrolDispatcher(
+    settings.PATROL_MAX_INVESTIGATIONS,
+    settings.PATROL_MAX_PENDING_INVESTIGATIONS,
+    settings.PATROL_INVESTIGATION_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+Key = Tuple[str, str]  # (namespace, pod)
+
+class PatrolFindings:
+    """
+    What patrol already knows, kept between runs for incremental patrol.
+
+    - Per pod: the resourceVersion last evaluated and its findings (container -> reason).
+      A pod whose resourceVersion did not change is not re-evaluated; a finding only triggers
+      an investigation the first time it appears, not on every run while it persists.
+    - Pods with an investigation still running are not dispatched again.
+    - `deferred`: pods whose investigation could not be dispatched (dispatcher full); they are
+      re-evaluated on the next run even if unchanged, with all their findings treated as new.
+    - `pending`: pods last seen Pending; re-evaluated on every run since their age alone can flag them.
+    - `cursor`: where the next incremental run resumes, ("cache", informer generation) or
+      ("api", list/watch resourceVersion). None until a complete full scan.
+
+    `to_state`/`from_state` persist the baseline (see PatrolReportStore.save_state) so a restarted
+    or newly elected leader does not re-report and re-dispatch what was already flagged.
+    Open investigations are not persisted: they ended with the process that ran them.
+    """
+    def __init__(self):
+        self.pods: Dict[Key, Tuple[Optional[str], Dict[str, str]]] = {}
+        self.open_investigations: Dict[Key, str] = {}
+        self.deferred: Set[Key] = set()
+        self.pending: Set[Key] = set()
+        self.cursor: Optional[Tuple[str, Any]] = None
+
+    def to_state(self) -> dict:
+        return {
+            "pods": [[ns, name, rv, found] for (ns, name), (rv, found) in self.pods.items()],
+            "deferred": [list(key) for key in self.deferred],
+            "pending": [list(key) for key in self.pending],
+            # An informer generation only means something inside the process that produced it
+            "cursor": list(self.cursor) if self.cursor and self.cursor[0] == "api" else None,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "PatrolFindings":
+        findings = cls()
+        findings.pods = {(ns, name): (rv, found) for ns, name, rv, found in state.get("pods", [])}
+        findings.deferred = {tuple(key) for key in state.get("deferred", [])}
+        findings.pending = {tuple(key) for key in state.get("pending", [])}
+        findings.cursor = tuple(state["cursor"]) if state.get("cursor") else None
+        return findings
+
+    def unchanged(self, key: Key, resource_version: Optional[str]) -> bool:
+        if key in self.deferred or key in self.pending:
+            return False
+        previous = self.pods.get(key)
+        return previous is not None and resource_version is not None and previous[0] == resource_version
+
+    def update(self, key: Key, resource_version: Optional[str], findings: Dict[str, str]) -> List[str]:
+        """Record the pod's findings; returns the containers that were not flagged before."""
+        previous = self.pods.get(key, (None, {}))[1]
+        self.pods[key] = (resource_version, findings)
+        if key in self.deferred:
+            self.deferred.discard(key)
+            return list(findings)
+        return [container for container in findings if container not in previous]
+
+    def defer(self, key: Key):
+        self.deferred.add(key)
+
+    def recheck(self, key: Key, pending: bool):
+        if pending:
+            self.pending.add(key)
+        else:
+            self.pending.discard(key)
+
+    def forget(self, key: Key):
+        self.pods.pop(key, None)
+        self.deferred.discard(key)
+        self.pending.discard(key)
+
+    def retain(self, keys: Set[Key]):
+        """Drop pods that no longer exist (after a complete full scan)."""
+        for key in [k for k in self.pods if k not in keys]:
+            self.forget(key)
+
+    def open(self, key: Key, conversation_id: str):
+        self.open_investigations[key] = conversation_id
+
+    def close(self, key: Key, conversation_id: str):
+        if self.open_investigations.get(key) == conversation_id:
+            del self.open_investigations[key]
+
+    def issues(self) -> List[dict]:
+        return [
+            {"pod": name, "namespace": namespace, "container": container, "reason": reason}
+            for (namespace, name), (_, findings) in sorted(self.pods.items())
+            for container, reason in findings.items()
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "pods": len(self.pods),
+            "flagged_pods": sum(1 for _, findings in self.pods.values() if findings),
+            "open_investigations": len(self.open_investigations),
+            "deferred": len(self.deferred),
+            "pending": len(self.pending),
+            "cursor": self.cursor[0] if self.cursor else None,
+        }
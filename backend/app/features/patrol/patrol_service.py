@@ -1,99 +1,326 @@
 import logging
 import asyncio
+import time
+from html import escape
 from datetime import datetime
 from typing import Dict, Any, List
 # Re-import checks (Assuming simple checks were deleted, I need to recreate them or inline simplified versions)
 # The user deleted checks/*.py, so I will inline simplified logic or recreate them quickly.
 from app.services.k8s_client import k8s_client
+from app.features.patrol.scanner import pod_scanner
+from app.features.patrol.findings import PatrolFindings
+from app.features.patrol.rules import ContainerTable, rule_engine
+from app.features.patrol.dispatcher import patrol_dispatcher
+from app.features.patrol.report_store import patrol_report_store
+from app.core.config import settings
 from app.services.log_forensics import LogForensicsService
 
 logger = logging.getLogger(__name__)
 
 class PatrolService:
     def __init__(self):
-        self.report_cache = {} # In-memory cache for HTML reports (ID -> HTML)
+        # Per-pod findings and open investigations, kept between runs (incremental patrol)
+        # and persisted in the report store, so a restart or a new leader keeps the baseline
+        self.findings = PatrolFindings()
+        self._findings_loaded = False
+        self._running = False
 
-    async def run_patrol(self) -> Dict[str, Any]:
-        logger.info("Running Patrol 2.0...")
+    async def _load_findings(self):
+        if self._findings_loaded:
+            return
+        try:
+            state = await patrol_report_store.load_state("findings")
+            if state:
+                self.findings = PatrolFindings.from_state(state)
+                logger.info(f"Patrol baseline restored: {len(self.findings.pods)} pods")
+            self._findings_loaded = True
+        except Exception as e:
+            logger.error(f"Failed to load patrol baseline: {e}")
+
+    async def _save_findings(self):
+        try:
+            await patrol_report_store.save_state("findings", self.findings.to_state())
+        except Exception as e:
+            logger.error(f"Failed to save patrol baseline: {e}")
+
+    async def run_patrol(self, incremental: bool = None) -> Dict[str, Any]:
+        """
+        `incremental`: only re-evaluate pods that changed since the previous run
+        (default PATROL_INCREMENTAL); the first run, or one after the change history was lost, is a full scan.
+        A call while another patrol is in progress is skipped (status "skipped"), not queued.
+        Returns {"id", "data", "markdown"}; the report is stored under `id` (None for skipped runs).
+        """
+        if incremental is None:
+            incremental = settings.PATROL_INCREMENTAL
         report_data = {
             "timestamp": datetime.now().isoformat(),
             "status": "success",
             "checks": []
         }
+        if self._running:
+            logger.info("Patrol already in progress, skipping this run")
+            report_data["status"] = "skipped"
+            return {"id": None, "data": report_data, "markdown": self._generate_markdown(report_data)}
 
+        self._running = True
+        logger.info(f"Running Patrol 2.0 ({'incremental' if incremental else 'full'})...")
         try:
-            # 1. Health Check (Simplified Inline)
-            health_data = await self._check_health()
+            await self._load_findings()
+            # 1. Health Check (Simplified Inline) and 2. Diagnosis with Log Forensics
+            # Independent API calls: run them concurrently on the K8s executor
+            health_data, diag_data = await asyncio.wait_for(
+                asyncio.gather(self._check_health(), self._diagnose_logs(incremental)),
+                timeout=settings.PATROL_RUN_DEADLINE_SECONDS
+            )
             report_data["checks"].append({"name": "Cluster Health", "data": health_data})
-
-            # 2. Diagnosis with Log Forensics
-            diag_data = await self._diagnose_logs()
             report_data["checks"].append({"name": "AI Diagnosis", "data": diag_data})
             
             if diag_data.get("issues"):
                 report_data["status"] = "warning"
 
+        except asyncio.TimeoutError:
+            logger.error(f"Patrol exceeded its {settings.PATROL_RUN_DEADLINE_SECONDS}s deadline")
+            report_data["status"] = "failed"
+            report_data["error"] = f"Deadline of {settings.PATROL_RUN_DEADLINE_SECONDS}s exceeded"
         except Exception as e:
             logger.error(f"Patrol failed: {e}")
             report_data["status"] = "failed"
             report_data["error"] = str(e)
+        finally:
+            if self._findings_loaded:  # Never overwrite a baseline we could not read
+                await self._save_findings()
+            self._running = False
 
         # Generate Markdown
         markdown = self._generate_markdown(report_data)
+        report = {"data": report_data, "markdown": markdown}
 
-        return {
-            "data": report_data,
-            "markdown": markdown
-        }
+        report_id = None
+        try:
+            report_id = await patrol_report_store.save(report)
+        except Exception as e:
+            logger.error(f"Failed to store patrol report: {e}")
+
+        return {"id": report_id, **report}
 
     async def _check_health(self):
         if not k8s_client.connected: return {"status": "error", "message": "K8s Disconnected"}
-        v1 = k8s_client.v1
         try:
-            nodes = v1.list_node().items
+            nodes = await k8s_client.list_resources("nodes")
             not_ready = [n.metadata.name for n in nodes if not any(c.status == "True" and c.type == "Ready" for c in n.status.conditions)]
             return {"status": "healthy" if not not_ready else "warning", "not_ready_nodes": not_ready}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
-    async def _diagnose_logs(self):
+    async def _diagnose_logs(self, incremental: bool = True):
         """
         New Logic: Identify candidates and dispatch Agent tasks.
+        Only findings that are new for a pod trigger an investigation, and only when none is open for it.
+        A full run (`incremental=False`) re-evaluates every pod, including unchanged ones, since
+        time-based rules (recent restarts/OOMKills, node pressure) change without a pod update.
         """
-        issues = []
         if not k8s_client.connected: return {"issues": []}
-        
-        # Find CrashLoopBackOff - This part identifies "Targets"
+        findings = self.findings
+        triggered = set()
         try:
-            pods = k8s_client.v1.list_pod_for_all_namespaces(limit=50).items
-            for pod in pods:
-                if not pod.status.container_statuses: continue
-                
-                for cs in pod.status.container_statuses:
-                    if (cs.state.waiting and cs.state.waiting.reason == "CrashLoopBackOff") or (cs.restart_count > 5):
-                        
-                        # TRIGGER AGENT
-                        await self._dispatch_agent_investigation(pod, cs)
-
-                        issues.append({
-                            "pod": pod.metadata.name,
-                            "namespace": pod.metadata.namespace,
-                            "status": "Investigation Triggered"
-                        })
+            nodes = await k8s_client.list_resources("nodes")
         except Exception as e:
-            logger.error(f"Diagnosis triggering failed: {e}")
-            
-        return {"issues": issues}
+            logger.warning(f"Patrol: node status unavailable, node rules skipped: {e}")
+            nodes = []
+        # Node conditions are joined onto every batch; extract them once per run
+        pressure = ContainerTable.node_pressure(nodes)
 
-    async def _dispatch_agent_investigation(self, pod, container_status):
-        from app.agent.executor import run_agent_graph
+        # Changed pods are collected and evaluated a batch at a time by the vectorized rule engine
+        batch = []
+        async def visit(pod):
+            key = (pod.metadata.namespace, pod.metadata.name)
+            if incremental and findings.unchanged(key, pod.metadata.resource_version): return
+            batch.append(pod)
+            if len(batch) >= settings.PATROL_PAGE_SIZE:
+                await evaluate()
+
+        async def evaluate():
+            if not batch: return
+            pods = batch[:]
+            batch.clear()
+            table = ContainerTable.from_pods(pods, pressure=pressure)
+            for pod, found in zip(pods, rule_engine.pod_findings(table)):
+                key = (pod.metadata.namespace, pod.metadata.name)
+                new_containers = findings.update(key, pod.metadata.resource_version, found)
+                # "Pending too long" becomes true without the pod changing
+                findings.recheck(key, pod.status is not None and pod.status.phase == "Pending")
+                if not new_containers or key in findings.open_investigations: continue
+
+                # TRIGGER AGENT
+                container = new_containers[0]
+                if patrol_dispatcher.is_active((key[0], key[1], container)): continue
+                conversation_id = await self._dispatch_agent_investigation(pod, container, found[container])
+                if conversation_id:
+                    triggered.add(key)
+                else:
+                    # Dispatcher full: try again on the next run
+                    findings.defer(key)
+
+        scan = None
+        if incremental and findings.cursor:
+            scan = await self._scan_changes(visit, evaluate)
+        if scan is None:
+            scan = await self._scan_full(visit, evaluate)
+        logger.info(f"Patrol ({scan['mode']}) evaluated {scan['pods']} pods in {scan['seconds']}s "
+                    f"({scan['pods_per_second']} pods/s, source: {scan['source']})")
+
+        issues = []
+        for issue in findings.issues():
+            key = (issue["namespace"], issue["pod"])
+            if key in triggered:
+                issue["status"] = "Investigation Triggered"
+            elif key in findings.open_investigations:
+                issue["status"] = "Investigation Open"
+            else:
+                issue["status"] = "Known Issue"
+            issues.append(issue)
+        return {"issues": issues, "scan": scan}
+
+    async def _scan_full(self, visit, flush):
+        """Evaluate every pod; a complete scan becomes the baseline for incremental runs."""
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        try:
+            informer = cluster_cache.informer("pods")
+            generation = informer.generation
+        except Unanswerable:
+            generation = None
+
+        seen = set()
+        async def visit_all(pod):
+            seen.add((pod.metadata.namespace, pod.metadata.name))
+            await visit(pod)
+
+        scan = await pod_scanner.scan(visit_all, flush)
+        await flush()  # Pods visited before an aborted page
+        scan["mode"] = "full"
+        if scan["complete"]:
+            self.findings.retain(seen)
+            if scan["source"] == "cache" and generation is not None:
+                self.findings.cursor = ("cache", generation)
+            elif scan["source"] == "api" and scan["resource_version"]:
+                self.findings.cursor = ("api", scan["resource_version"])
+        return scan
+
+    async def _scan_changes(self, visit, flush):
+        """
+        Evaluate only pods changed since the cursor: from the watch cache's change journal, or by
+        watching from the last resourceVersion. None when that history is gone (full scan instead).
+        """
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        source, position = self.findings.cursor
+        started = time.monotonic()
+        evaluated = 0
+        visited = set()
+
+        if source == "cache":
+            try:
+                informer = cluster_cache.informer("pods")
+                changes = informer.changes_since(position)
+            except Unanswerable:
+                changes = None
+            if changes is None:
+                return None
+            keys, generation = changes
+            for key in keys:
+                pod = informer.get(*key)
+                if pod is None:
+                    self.findings.forget(key)
+                    continue
+                await visit(pod)
+                visited.add(key)
+                evaluated += 1
+            cursor = ("cache", generation)
+        else:
+            try:
+                events, resource_version = await k8s_client.run(self._watch_changes, position)
+            except Exception as e:
+                # 410 Gone (history compacted) or any watch failure: fall back to a full scan
+                logger.info(f"Patrol: incremental watch unavailable ({e}), running a full scan")
+                return None
+            for kind, pod in events:
+                key = (pod.metadata.namespace, pod.metadata.name)
+                if kind == "DELETED":
+                    self.findings.forget(key)
+                    continue
+                await visit(pod)
+                visited.add(key)
+                evaluated += 1
+            cursor = ("api", resource_version)
+
+        # Pods whose investigation was deferred, or that are still pending, are re-evaluated even if they did not change
+        recheck = [key for key in self.findings.deferred | self.findings.pending if key not in visited]
+        pods = await asyncio.gather(*[self._read_pod(*key) for key in recheck])
+        for key, pod in zip(recheck, pods):
+            if pod is None:
+                self.findings.forget(key)
+                continue
+            await visit(pod)
+            evaluated += 1
+        await flush()
+        # Only once every change is evaluated: a run cut short (deadline) resumes from the old cursor
+        self.findings.cursor = cursor
+
+        seconds = time.monotonic() - started
+        return {
+            "mode": "incremental",
+            "pods": evaluated,
+            "pages": 0,
+            "source": source,
+            "resource_version": self.findings.cursor[1] if source == "api" else None,
+            "complete": True,
+            "error": None,
+            "seconds": round(seconds, 3),
+            "pods_per_second": round(evaluated / seconds, 1) if seconds > 0 else None,
+        }
+
+    @staticmethod
+    async def _read_pod(namespace: str, name: str):
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        from kubernetes.client.exceptions import ApiException
+        try:
+            return cluster_cache.get("pods", namespace, name)
+        except Unanswerable:
+            pass
+        try:
+            return await k8s_client.call(k8s_client.v1.read_namespaced_pod, name, namespace)
+        except ApiException as e:
+            if e.status == 404:
+                return None
+            raise
+
+    @staticmethod
+    def _watch_changes(resource_version: str):
+        """Pod events since `resource_version` (K8s executor thread). Returns ([(type, pod)], new resourceVersion)."""
+        from kubernetes import watch
+        events = {}
+        # The server ends the watch after timeout_seconds; anything later is picked up next run
+        stream = watch.Watch().stream(
+            k8s_client.v1.list_pod_for_all_namespaces,
+            resource_version=resource_version,
+            timeout_seconds=1,
+            allow_watch_bookmarks=True,
+            _request_timeout=(10, 30),
+        )
+        for event in stream:
+            obj = event["object"]
+            if obj.metadata and obj.metadata.resource_version:
+                resource_version = obj.metadata.resource_version
+            if event["type"] != "BOOKMARK":
+                # Only the latest state of each pod matters
+                events[(obj.metadata.namespace, obj.metadata.name)] = (event["type"], obj)
+        return list(events.values()), resource_version
+
+    async def _dispatch_agent_investigation(self, pod, container: str, reason: str):
+        """Hand the investigation to the bounded dispatcher; returns its conversation id, or None if refused."""
         import uuid
-        from app.services.connection_manager import manager as connection_manager
 
         pod_name = pod.metadata.name
         namespace = pod.metadata.namespace
-        container = container_status.name
-        reason = container_status.state.waiting.reason if container_status.state.waiting else "High Restarts"
 
         conversation_id = f"patrol-{uuid.uuid4()}"
         logger.info(f"👮 Patrol dispatching investigation: {conversation_id} for {pod_name}")
@@ -102,7 +329,7 @@ class PatrolService:
 🚨 **主动巡检发现异常 (PATROL ALERT)**
 - **Pod**: {pod_name}
 - **Namespace**: {namespace}
-- **Container**: {container}
+- **Container**: {container or '-'}
 - **Reason**: {reason}
 
 ---
@@ -112,37 +339,78 @@ class PatrolService:
 2. **AI 分析**: 你的工具会自动分析日志并告诉你根因 (Smart Tool)。
 3. **沉淀知识**: 查明原因后，调用 `save_insight` 保存结论。
 """
-        # Mock WebSocket for Background Execution
-        class MockWebSocket:
-            async def send_json(self, data):
-                await connection_manager.broadcast_json(conversation_id, data)
+        key = (namespace, pod_name)
+        if not patrol_dispatcher.submit((namespace, pod_name, container), conversation_id, prompt,
+                                        on_done=lambda: self.findings.close(key, conversation_id)):
+            return None
 
-        try:
-            # Fire and Forget (Background Task)
-            asyncio.create_task(run_agent_graph(
-                websocket=MockWebSocket(),
-                conversation_id=conversation_id,
-                last_user_message=prompt,
-                session=None,
-                conversation_type="patrol"
-            ))
-        except Exception as e:
-            logger.error(f"Failed to dispatch agent: {e}")
+        # The pod counts as under investigation until the agent run ends
+        self.findings.open(key, conversation_id)
+        return conversation_id
 
     def _generate_markdown(self, data):
         # Simplified Report - just showing triggers
         md = f"# 🛡️ Patrol Report 2.0\nTime: {data['timestamp']}\n\n"
+        if len(data['checks']) < 2:
+            # Skipped (another patrol in progress) or failed before the checks completed
+            md += f"## Status: {data['status'].upper()}\n"
+            if data.get('error'):
+                md += f"{data['error']}\n"
+            return md
         h = data['checks'][0]['data']
         md += f"## Cluster Health: {h['status'].upper()}\n"
         
         diag = data['checks'][1]['data']
+        scan = diag.get('scan')
+        if scan:
+            what = "Scanned" if scan['mode'] == "full" else "Re-evaluated changed:"
+            md += f"{what} **{scan['pods']}** pods in {scan['seconds']}s ({scan['pods_per_second']} pods/s)"
+            md += "\n" if scan['complete'] else f" ⚠️ incomplete: {scan['error']}\n"
         md += f"\n## 🧠 AI Diagnosis Triggered\n"
         if not diag['issues']:
             md += "✅ No anomalies detected.\n"
         else:
             for i in diag['issues']:
-                md += f"- **Target**: {i['pod']} ({i['namespace']})\n"
-                md += f"  - Status: *Agent Investigation Started*\n"
+                md += f"- **Target**: {i['pod']} ({i['namespace']}) - {i.get('container')}: {i.get('reason')}\n"
+                md += f"  - Status: *{i.get('status', 'Investigation Triggered')}*\n"
         return md
 
+    def render_html(self, data) -> str:
+        """Standalone HTML page for a stored report (served by /patrol/visualize/{id})."""
+        colors = {"success": "#2e7d32", "healthy": "#2e7d32", "warning": "#ef6c00", "failed": "#c62828", "error": "#c62828"}
+        def badge(status):
+            return f'<span style="color:{colors.get(status, "#555")};font-weight:bold">{escape(str(status).upper())}</span>'
+
+        body = f"<h1>Patrol Report</h1><p>Time: {escape(data['timestamp'])} &middot; Status: {badge(data['status'])}</p>"
+        if data.get('error'):
+            body += f"<p>{escape(data['error'])}</p>"
+        checks = {c['name']: c['data'] for c in data['checks']}
+        health = checks.get("Cluster Health")
+        if health:
+            body += f"<h2>Cluster Health: {badge(health['status'])}</h2>"
+            if health.get('not_ready_nodes'):
+                body += "<p>Not ready: " + ", ".join(escape(n) for n in health['not_ready_nodes']) + "</p>"
+            elif health.get('message'):
+                body += f"<p>{escape(health['message'])}</p>"
+        diag = checks.get("AI Diagnosis")
+        if diag:
+            scan = diag.get('scan')
+            if scan:
+                body += (f"<p>{escape(scan['mode'])} scan: {scan['pods']} pods in {scan['seconds']}s"
+                         f"{'' if scan['complete'] else ' (incomplete: ' + escape(str(scan['error'])) + ')'}</p>")
+            body += f"<h2>Issues ({len(diag['issues'])})</h2>"
+            if diag['issues']:
+                rows = "".join(
+                    f"<tr><td>{escape(i['namespace'])}</td><td>{escape(i['pod'])}</td><td>{escape(str(i.get('container')))}</td>"
+                    f"<td>{escape(str(i.get('reason')))}</td><td>{escape(i.get('status', 'Investigation Triggered'))}</td></tr>"
+                    for i in diag['issues']
+                )
+                body += ("<table><tr><th>Namespace</th><th>Pod</th><th>Container</th><th>Reason</th><th>Status</th></tr>"
+                         f"{rows}</table>")
+            else:
+                body += "<p>No anomalies detected.</p>"
+        style = ("body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}"
+                 "td,th{border:1px solid #ddd;padding:4px 8px;text-align:left}")
+        return f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Patrol Report</title><style>{style}</style></head><body>{body}</body></html>"
+
 patrol_service = PatrolService()
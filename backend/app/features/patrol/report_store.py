@@ -0,0 +1,138 @@
+import json
+import logging
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.db.models.patrol import PatrolReport, PatrolState
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class PatrolReportStore:
+    """
+    Patrol reports persisted in the database and served through a small in-memory cache,
+    plus the state patrol keeps between runs (`save_state`/`load_state`).
+
+    - Each report ({"data", "markdown"}) is stored as zlib-compressed JSON, with status, mode and
+      issue count in plain columns so listings never decompress anything.
+    - The newest `retention` reports are kept; older rows are pruned on save.
+    - Decoded reports are cached per worker: at most `max_entries` (LRU), each for `ttl` seconds.
+      Any worker can serve any report since the database is the source of truth.
+    """
+    def __init__(self, max_entries: int, ttl: float, retention: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.retention = retention
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _encode(report: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(report, ensure_ascii=False, default=str).encode("utf-8"), 6)
+
+    @staticmethod
+    def _decode(payload: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def _remember(self, report_id: str, report: Dict[str, Any]):
+        self._cache[report_id] = (time.monotonic() + self.ttl, report)
+        self._cache.move_to_end(report_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def save(self, report: Dict[str, Any]) -> str:
+        """Persist a report; returns its id."""
+        report_id = str(uuid.uuid4())
+        data = report.get("data", {})
+        diagnosis = next((c["data"] for c in data.get("checks", []) if c.get("name") == "AI Diagnosis"), {})
+        row = PatrolReport(
+            id=report_id,
+            status=data.get("status"),
+            mode=(diagnosis.get("scan") or {}).get("mode"),
+            issue_count=len(diagnosis.get("issues", [])),
+            payload=self._encode(report),
+        )
+        async with AsyncSessionLocal() as session:
+            session.add(row)
+            await session.flush()
+            # Keep only the newest `retention` reports
+            cutoff = await session.execute(
+                select(PatrolReport.created_at).order_by(PatrolReport.created_at.desc()).offset(self.retention).limit(1)
+            )
+            cutoff_at = cutoff.scalar_one_or_none()
+            if cutoff_at is not None:
+                await session.execute(delete(PatrolReport).where(PatrolReport.created_at <= cutoff_at))
+            await session.commit()
+        self._remember(report_id, report)
+        return report_id
+
+    async def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(report_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._cache.move_to_end(report_id)
+                self.hits += 1
+                return entry[1]
+            del self._cache[report_id]
+        self.misses += 1
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(PatrolReport.payload).where(PatrolReport.id == report_id))
+            payload = result.scalar_one_or_none()
+        if payload is None:
+            return None
+        report = self._decode(payload)
+        self._remember(report_id, report)
+        return report
+
+    async def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest reports first, metadata only."""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(PatrolReport.id, PatrolReport.status, PatrolReport.mode, PatrolReport.issue_count, PatrolReport.created_at)
+                .order_by(PatrolReport.created_at.desc()).limit(limit)
+            )
+            return [
+                {"id": r.id, "status": r.status, "mode": r.mode, "issue_count": r.issue_count,
+                 "created_at": r.created_at.isoformat() if r.created_at else None}
+                for r in result.all()
+            ]
+
+    async def save_state(self, key: str, state: Dict[str, Any]):
+        """Persist a piece of patrol state (e.g. the findings baseline), replacing the previous one."""
+        payload = self._encode(state)
+        async with AsyncSessionLocal() as session:
+            await session.merge(PatrolState(key=key, payload=payload))
+            await session.commit()
+
+    async def load_state(self, key: str) -> Optional[Dict[str, Any]]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(PatrolState.payload).where(PatrolState.key == key))
+            payload = result.scalar_one_or_none()
+        return self._decode(payload) if payload is not None else None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cached": len(self._cache),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "retention": self.retention,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+# 全局单例
+patrol_report_store = PatrolReportStore(
+    settings.PATROL_REPORT_CACHE_SIZE,
+    settings.PATROL_REPORT_CACHE_TTL_SECONDS,
+    settings.PATROL_REPORT_RETENTION,
+)
@@ -0,0 +1,226 @@
+"""
+Patrol rule engine.
+
+Pods (and the nodes they run on) are flattened into a columnar table, one row per container,
+and every rule is a vectorized predicate over all rows at once:
+
+    Rule("Image Pull Error", eq("waiting_reason", "ImagePullBackOff", "ErrImagePull"))
+    Rule("Pending Too Long", eq("phase", "Pending") & gt("age_seconds", 600))
+
+Flattening is the only per-object Python work; adding rules costs a few array operations each.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+# Categorical columns are stored as int32 codes; code 0 is "unset"
+CATEGORICAL = ("phase", "node", "waiting_reason", "terminated_reason", "last_terminated_reason")
+PRESSURE = {"MemoryPressure": "node_memory_pressure", "DiskPressure": "node_disk_pressure", "PIDPressure": "node_pid_pressure"}
+
+class ContainerTable:
+    """
+    Columnar view of a batch of pods, one row per container (a pod with no container
+    status yet, e.g. unschedulable, gets one row with container "").
+
+    Columns: phase, node, waiting_reason, terminated_reason, last_terminated_reason (categorical);
+    restart_count, age_seconds, restarts_per_hour, last_terminated_age_seconds (numeric);
+    ready, node_memory_pressure, node_disk_pressure, node_pid_pressure (bool).
+    `pods[pod_index[row]]` and `containers[row]` map a row back to its pod and container.
+    """
+    def __init__(self, pods: List[Any], pod_index: np.ndarray, containers: List[str],
+                 columns: Dict[str, np.ndarray], vocab: Dict[str, Dict[Optional[str], int]]):
+        self.pods = pods
+        self.pod_index = pod_index
+        self.containers = containers
+        self.columns = columns
+        self.vocab = vocab
+
+    def __len__(self) -> int:
+        return len(self.containers)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def isin(self, column: str, values: Iterable[str]) -> np.ndarray:
+        codes = [self.vocab[column][v] for v in values if v in self.vocab[column]]
+        if not codes:
+            return np.zeros(len(self), dtype=bool)
+        if len(codes) == 1:
+            return self.columns[column] == codes[0]
+        return np.isin(self.columns[column], codes)
+
+    @staticmethod
+    def node_pressure(nodes: Iterable[Any]) -> Dict[str, Set[str]]:
+        """Node name -> pressure conditions that are True. Compute once per scan, pass to every from_pods()."""
+        pressure = {}
+        for node in nodes:
+            conditions = (node.status.conditions if node.status else None) or []
+            flags = {c.type for c in conditions if c.type in PRESSURE and c.status == "True"}
+            if flags:
+                pressure[node.metadata.name] = flags
+        return pressure
+
+    @classmethod
+    def from_pods(cls, pods: List[Any], nodes: Iterable[Any] = (), now: Optional[float] = None,
+                  pressure: Optional[Dict[str, Set[str]]] = None) -> "ContainerTable":
+        """`pressure`: node_pressure(nodes), when the same nodes are joined onto many batches."""
+        now = time.time() if now is None else now
+        pressure = cls.node_pressure(nodes) if pressure is None else pressure
+        vocab = {name: {None: 0} for name in CATEGORICAL}
+        phases, node_names, waiting_reasons, terminated_reasons, last_reasons = (vocab[name] for name in CATEGORICAL)
+
+        # Per pod: phase, node and start time (repeated onto its rows at the end). Per container:
+        # name, restarts and readiness. State reasons are stored sparsely, only for containers that
+        # have any: most containers are healthy, so they cost three appends and no dictionary lookups.
+        pod_phase, pod_node, pod_start, pod_rows = [], [], [], []
+        containers, restarts, ready = [], [], []
+        flagged, waiting_codes, terminated_codes, last_codes, last_finished = [], [], [], [], []
+        for pod in pods:
+            status = pod.status
+            phase = status.phase if status else None
+            pod_phase.append(phases.get(phase) or phases.setdefault(phase, len(phases)))
+            node = pod.spec.node_name if pod.spec else None
+            pod_node.append(node_names.get(node) or node_names.setdefault(node, len(node_names)))
+            start = (status.start_time if status else None) or pod.metadata.creation_timestamp
+            pod_start.append(start.timestamp() if start is not None else np.nan)
+            statuses = status.container_statuses if status else None
+            if not statuses:
+                pod_rows.append(1)
+                containers.append("")
+                restarts.append(0)
+                ready.append(False)
+                continue
+            pod_rows.append(len(statuses))
+            for cs in statuses:
+                state, last = cs.state, cs.last_state
+                waiting = state.waiting if state else None
+                terminated = state.terminated if state else None
+                previous = last.terminated if last else None
+                if waiting is not None or terminated is not None or previous is not None:
+                    flagged.append(len(containers))
+                    w = waiting.reason if waiting else None
+                    t = terminated.reason if terminated else None
+                    p = previous.reason if previous else None
+                    finished = previous.finished_at if previous else None
+                    waiting_codes.append(waiting_reasons.get(w) or waiting_reasons.setdefault(w, len(waiting_reasons)))
+                    terminated_codes.append(terminated_reasons.get(t) or terminated_reasons.setdefault(t, len(terminated_reasons)))
+                    last_codes.append(last_reasons.get(p) or last_reasons.setdefault(p, len(last_reasons)))
+                    last_finished.append(finished.timestamp() if finished is not None else np.nan)
+                containers.append(cs.name)
+                restarts.append(cs.restart_count or 0)
+                ready.append(cs.ready)
+
+        count = len(containers)
+        pod_rows = np.array(pod_rows, dtype=np.int64)
+        flagged = np.array(flagged, dtype=np.int64)
+
+        def sparse(values: list, dtype, fill) -> np.ndarray:
+            column = np.full(count, fill, dtype=dtype)
+            column[flagged] = values
+            return column
+
+        columns = {
+            "phase": np.repeat(np.array(pod_phase, dtype=np.int32), pod_rows),
+            "node": np.repeat(np.array(pod_node, dtype=np.int32), pod_rows),
+            "waiting_reason": sparse(waiting_codes, np.int32, 0),
+            "terminated_reason": sparse(terminated_codes, np.int32, 0),
+            "last_terminated_reason": sparse(last_codes, np.int32, 0),
+            "restart_count": np.array(restarts, dtype=np.int32),
+            "ready": np.array(ready, dtype=bool),
+            "age_seconds": now - np.repeat(np.array(pod_start, dtype=np.float64), pod_rows),
+            "last_terminated_age_seconds": now - sparse(last_finished, np.float64, np.nan),
+        }
+        # Averaged over at least an hour so a fresh pod's first restart is not a huge rate
+        columns["restarts_per_hour"] = columns["restart_count"] / np.maximum(np.nan_to_num(columns["age_seconds"]) / 3600, 1.0)
+        # Node conditions, joined onto rows through the node code
+        for condition, column in PRESSURE.items():
+            by_node = np.zeros(len(node_names), dtype=bool)
+            for name, code in node_names.items():
+                by_node[code] = condition in pressure.get(name, ())
+            columns[column] = by_node[columns["node"]]
+        pod_index = np.repeat(np.arange(len(pod_rows), dtype=np.int64), pod_rows)
+        return cls(list(pods), pod_index, containers, columns, vocab)
+
+class Predicate:
+    """A vectorized condition: table -> bool array, one entry per row. Combine with &, |, ~."""
+    def __init__(self, fn: Callable[[ContainerTable], np.ndarray], text: str):
+        self.fn = fn
+        self.text = text
+
+    def __call__(self, table: ContainerTable) -> np.ndarray:
+        return self.fn(table)
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        return Predicate(lambda t: self(t) & other(t), f"({self.text} and {other.text})")
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        return Predicate(lambda t: self(t) | other(t), f"({self.text} or {other.text})")
+
+    def __invert__(self) -> "Predicate":
+        return Predicate(lambda t: ~self(t), f"not {self.text}")
+
+    def __repr__(self) -> str:
+        return self.text
+
+def eq(column: str, *values: str) -> Predicate:
+    """Categorical column equals any of `values`."""
+    return Predicate(lambda t: t.isin(column, values), f"{column} in {list(values)}")
+
+def flag(column: str) -> Predicate:
+    return Predicate(lambda t: t[column], column)
+
+def gt(column: str, value: float) -> Predicate:
+    return Predicate(lambda t: t[column] > value, f"{column} > {value}")
+
+def ge(column: str, value: float) -> Predicate:
+    return Predicate(lambda t: t[column] >= value, f"{column} >= {value}")
+
+def lt(column: str, value: float) -> Predicate:
+    return Predicate(lambda t: t[column] < value, f"{column} < {value}")
+
+@dataclass
+class Rule:
+    name: str  # Reported as the finding's reason
+    when: Predicate
+    description: str = ""
+
+# Earlier rules take precedence when several match the same container
+RULES = [
+    Rule("OOMKilled", eq("terminated_reason", "OOMKilled") |
+         (eq("last_terminated_reason", "OOMKilled") & lt("last_terminated_age_seconds", 3600)),
+         "Container is, or within the last hour was, killed for exceeding its memory limit"),
+    Rule("Image Pull Error", eq("waiting_reason", "ImagePullBackOff", "ErrImagePull", "InvalidImageName", "ErrImageNeverPull"),
+         "Image cannot be pulled"),
+    Rule("CrashLoopBackOff", eq("waiting_reason", "CrashLoopBackOff"), "Container keeps crashing"),
+    Rule("Restart Rate", ge("restart_count", 3) & ge("restarts_per_hour", 3), "3 or more restarts per hour"),
+    Rule("High Restarts", gt("restart_count", 5), "More than 5 restarts"),
+    Rule("Pending Too Long", eq("phase", "Pending") & gt("age_seconds", 600), "Pod pending for more than 10 minutes"),
+    Rule("Node Pressure", ~flag("ready") & (flag("node_memory_pressure") | flag("node_disk_pressure") | flag("node_pid_pressure")),
+         "Container not ready on a node under memory, disk or PID pressure"),
+]
+
+class RuleEngine:
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+
+    def evaluate(self, table: ContainerTable) -> np.ndarray:
+        """Per row: index of the first matching rule, -1 when none match."""
+        matched = np.full(len(table), -1, dtype=np.int16)
+        for i in range(len(self.rules) - 1, -1, -1):
+            matched[self.rules[i].when(table)] = i
+        return matched
+
+    def pod_findings(self, table: ContainerTable) -> List[Dict[str, str]]:
+        """Per pod of the table, in order: container -> reason of its first matching rule."""
+        matched = self.evaluate(table)
+        found = [{} for _ in table.pods]
+        names = [rule.name for rule in self.rules]
+        rows = np.flatnonzero(matched >= 0)
+        for row, pod, rule in zip(rows.tolist(), table.pod_index[rows].tolist(), matched[rows].tolist()):
+            found[pod][table.containers[row]] = names[rule]
+        return found
+
+# 全局单例
+rule_engine = RuleEngine(RULES)
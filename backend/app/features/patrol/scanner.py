@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+from app.core.config import settings
+from app.services.k8s_client import k8s_client
+
+logger = logging.getLogger(__name__)
+
+class PodScanner:
+    """
+    Streams every pod in the cluster to a visitor, one page at a time.
+
+    - Watch cache synced: pages are slices of the cached pod list (no API calls).
+    - Otherwise: `list_pod_for_all_namespaces` paged with `limit`/`continue`; the next page is
+      fetched while the current one is evaluated, so at most two pages are held in memory.
+      An expired continue token (410) resumes from the token the apiserver hands back; without
+      one the scan stops and is reported as incomplete.
+    """
+    def __init__(self, page_size: int):
+        self.page_size = page_size
+        self.source: Optional[str] = None  # "cache" or "api", for the last scan
+        self.resource_version: Optional[str] = None  # list snapshot of the last API scan
+
+    async def _fetch(self, token: Optional[str]) -> Any:
+        from kubernetes.client.exceptions import ApiException
+        try:
+            return await k8s_client.call(k8s_client.v1.list_pod_for_all_namespaces, limit=self.page_size, _continue=token)
+        except ApiException as e:
+            if e.status != 410 or not token:
+                raise
+            # Snapshot compacted mid-scan: continue inconsistently from where the server says
+            try:
+                token = json.loads(e.body).get("metadata", {}).get("continue")
+            except Exception:
+                token = None
+            if not token:
+                raise
+            logger.warning("Patrol scan: continue token expired, resuming from a newer snapshot")
+            return await k8s_client.call(k8s_client.v1.list_pod_for_all_namespaces, limit=self.page_size, _continue=token)
+
+    async def pages(self) -> AsyncIterator[List[Any]]:
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        try:
+            pods = cluster_cache.list("pods")
+        except Unanswerable:
+            pods = None
+        if pods is not None:
+            self.source = "cache"
+            for start in range(0, len(pods), self.page_size):
+                yield pods[start:start + self.page_size]
+                await asyncio.sleep(0)  # Let other tasks run between pages
+            return
+
+        self.source = "api"
+        self.resource_version = None
+        pending: Optional[asyncio.Task] = asyncio.ensure_future(self._fetch(None))
+        try:
+            while pending is not None:
+                resp = await pending
+                if self.resource_version is None:
+                    # Every page of a paginated list belongs to the first page's snapshot
+                    self.resource_version = resp.metadata.resource_version
+                token = resp.metadata._continue
+                pending = asyncio.ensure_future(self._fetch(token)) if token else None
+                yield resp.items
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def scan(self, visit: Callable[[Any], Awaitable[None]],
+                   flush: Optional[Callable[[], Awaitable[None]]] = None) -> dict:
+        """Run `visit(pod)` over all pods, then `flush()` after each page; returns scan statistics for the report."""
+        self.source = None
+        started = time.monotonic()
+        pods = 0
+        pages = 0
+        complete = True
+        error = None
+        try:
+            async for page in self.pages():
+                pages += 1
+                for pod in page:
+                    await visit(pod)
+                if flush:
+                    await flush()
+                pods += len(page)
+        except Exception as e:
+            complete = False
+            error = str(e)
+            logger.error(f"Patrol scan aborted after {pods} pods: {e}")
+        seconds = time.monotonic() - started
+        return {
+            "pods": pods,
+            "pages": pages,
+            "source": self.source,
+            "resource_version": self.resource_version if self.source == "api" else None,
+            "complete": complete,
+            "error": error,
+            "seconds": round(seconds, 3),
+            "pods_per_second": round(pods / seconds, 1) if seconds > 0 else None,
+        }
+
+# 全局单例
+pod_scanner = PodScanner(settings.PATROL_PAGE_SIZE)
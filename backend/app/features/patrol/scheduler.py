@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+
+from app.core.config import settings
+from app.db.models.patrol import PatrolRunRequest
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class PatrolScheduler:
+    """
+    Runs every patrol in the leader worker, so the run lock, the investigation dispatcher and the
+    findings baseline have a single owner.
+
+    - Periodic runs (opt-in, PATROL_INTERVAL_SECONDS > 0): every `interval` seconds plus a random
+      0..`jitter` delay, also applied before the first run, so replicas and restarts do not
+      patrol in lockstep.
+    - Manual runs (`request_run`) requested on any other worker are handed to the leader through the
+      patrol_run_requests table, like follower alerts go through the alert journal; the caller
+      waits for the leader's report.
+    Each run is bounded by PATROL_RUN_DEADLINE_SECONDS (enforced by run_patrol), and a run that
+    finds a patrol still in progress is skipped rather than queued.
+
+    The run counters, the dispatcher's load and the findings baseline only exist in the leader;
+    it publishes them to the report store every STATS_SECONDS (and after each run), so `status()`
+    answers the same on every worker.
+    """
+    POLL_SECONDS = 1.0
+    STATS_SECONDS = 10.0
+
+    def __init__(self, interval: float, jitter: float):
+        self.interval = interval
+        self.jitter = jitter
+        self._started = False
+        self.runs = 0
+        self.skipped = 0
+        self.failed = 0
+        self.requests_served = 0
+        self.last_run_at: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self.next_run_at: Optional[float] = None
+        self._stats_published_at = 0.0
+
+    def start(self):
+        """Campaign for leadership; the leader serves run requests and, if enabled, patrols periodically."""
+        if self._started:
+            return
+        self._started = True
+        from app.services.leader_lease import leader_lease
+        leader_lease.on_elected(self._serve_requests)
+        if self.interval > 0:
+            leader_lease.on_elected(self._loop)
+        leader_lease.start()
+
+    def _delay(self, base: float) -> float:
+        return base + random.uniform(0, self.jitter)
+
+    @staticmethod
+    def _deadline() -> float:
+        # Room for a run that starts just after the current one finishes
+        return 2 * settings.PATROL_RUN_DEADLINE_SECONDS + 10
+
+    async def request_run(self, incremental: Optional[bool] = None) -> Dict[str, Any]:
+        """Run a patrol in the leader and return its result ({"id", "data", "markdown"})."""
+        from app.services.leader_lease import leader_lease
+        from app.features.patrol.patrol_service import patrol_service
+        from app.features.patrol.report_store import patrol_report_store
+        self.start()
+        if leader_lease.is_leader:
+            result = await patrol_service.run_patrol(incremental=incremental)
+            await self._publish_stats()
+            return result
+
+        request_id = str(uuid.uuid4())
+        async with AsyncSessionLocal() as session:
+            session.add(PatrolRunRequest(id=request_id, incremental=incremental))
+            await session.commit()
+        logger.info(f"Patrol run {request_id} handed to the leader worker")
+
+        deadline = time.monotonic() + self._deadline()
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.POLL_SECONDS)
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(PatrolRunRequest.status, PatrolRunRequest.report_id).where(PatrolRunRequest.id == request_id)
+                )
+                row = result.one_or_none()
+            if row is None or row.status == "pending":
+                continue
+            if row.status == "done" and row.report_id:
+                report = await patrol_report_store.get(row.report_id)
+                if report:
+                    return {"id": row.report_id, **report}
+            break
+        # Not served in time (or skipped): never run it later
+        await self._finish_request(request_id, "expired", None, only_pending=True)
+        data = {"timestamp": datetime.now().isoformat(), "status": "skipped", "checks": []}
+        return {"id": None, "data": data, "markdown": patrol_service._generate_markdown(data)}
+
+    @staticmethod
+    async def _finish_request(request_id: str, status: str, report_id: Optional[str], only_pending: bool = False):
+        statement = update(PatrolRunRequest).where(PatrolRunRequest.id == request_id)
+        if only_pending:
+            statement = statement.where(PatrolRunRequest.status == "pending")
+        async with AsyncSessionLocal() as session:
+            await session.execute(statement.values(status=status, report_id=report_id, finished_at=datetime.utcnow()))
+            await session.commit()
+
+    def _leader_stats(self) -> Dict[str, Any]:
+        from app.features.patrol.dispatcher import patrol_dispatcher
+        from app.features.patrol.patrol_service import patrol_service
+        return {
+            **self.stats(),
+            "dispatcher": patrol_dispatcher.stats(),
+            "findings": patrol_service.findings.stats(),
+            "leader_pid": os.getpid(),
+            "updated_at": time.time(),
+        }
+
+    async def _publish_stats(self):
+        from app.features.patrol.report_store import patrol_report_store
+        self._stats_published_at = time.monotonic()
+        try:
+            await patrol_report_store.save_state("leader_stats", self._leader_stats())
+        except Exception as e:
+            logger.warning(f"Failed to publish patrol stats: {e}")
+
+    async def status(self) -> Dict[str, Any]:
+        """Scheduler, dispatcher and findings stats as seen by the leader, plus this worker's lease."""
+        from app.services.leader_lease import leader_lease
+        from app.features.patrol.report_store import patrol_report_store
+        if leader_lease.is_leader:
+            status = self._leader_stats()
+        else:
+            try:
+                status = await patrol_report_store.load_state("leader_stats")
+            except Exception as e:
+                logger.warning(f"Failed to load patrol stats: {e}")
+                status = None
+            # Nothing published yet (no leader so far): only the configuration is known
+            status = status or {**self.stats(), "dispatcher": None, "findings": None, "leader_pid": None, "updated_at": None}
+        return {**status, "worker": leader_lease.status()}
+
+    @staticmethod
+    async def _finish_requests(request_ids: List[str], report_id: Optional[str]):
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(PatrolRunRequest).where(PatrolRunRequest.id.in_(request_ids), PatrolRunRequest.status == "pending")
+                .values(status="done", report_id=report_id, finished_at=datetime.utcnow())
+            )
+            await session.commit()
+
+    async def _serve_requests(self):
+        """
+        Leader only: serve the patrols requested by other workers. Requests that pile up while a
+        patrol runs are answered together by a single run instead of one run each.
+        """
+        from app.features.patrol.patrol_service import patrol_service
+        while True:
+            try:
+                cutoff = datetime.utcnow() - timedelta(seconds=self._deadline())
+                async with AsyncSessionLocal() as session:
+                    # Requests nobody waits for any more are dropped, finished ones pruned
+                    await session.execute(
+                        update(PatrolRunRequest)
+                        .where(PatrolRunRequest.status == "pending", PatrolRunRequest.created_at < cutoff)
+                        .values(status="expired", finished_at=datetime.utcnow())
+                    )
+                    await session.execute(delete(PatrolRunRequest).where(
+                        PatrolRunRequest.status != "pending", PatrolRunRequest.created_at < cutoff - timedelta(hours=1)
+                    ))
+                    result = await session.execute(
+                        select(PatrolRunRequest.id, PatrolRunRequest.incremental)
+                        .where(PatrolRunRequest.status == "pending").order_by(PatrolRunRequest.created_at)
+                    )
+                    pending = result.all()
+                    await session.commit()
+                if pending:
+                    # One run answers every request waiting now; a full run also covers incremental ones
+                    if any(request.incremental is False for request in pending):
+                        incremental = False
+                    else:
+                        incremental = True if any(request.incremental for request in pending) else None
+                    result = await patrol_service.run_patrol(incremental=incremental)
+                    self.requests_served += len(pending)
+                    await self._finish_requests([request.id for request in pending], result["id"])
+                    await self._publish_stats()
+            except Exception as e:
+                logger.error(f"Patrol run requests failed: {e}")
+            if time.monotonic() - self._stats_published_at >= self.STATS_SECONDS:
+                await self._publish_stats()
+            await asyncio.sleep(self.POLL_SECONDS)
+
+    async def _loop(self):
+        from app.features.patrol.patrol_service import patrol_service
+        delay = self._delay(0)
+        logger.info(f"Patrol scheduler started: every {self.interval}s (+0..{self.jitter}s jitter)")
+        while True:
+            self.next_run_at = time.time() + delay
+            await asyncio.sleep(delay)
+            started = time.monotonic()
+            try:
+                result = await patrol_service.run_patrol()
+                status = result["data"]["status"]
+            except Exception as e:
+                logger.error(f"Scheduled patrol failed: {e}")
+                status = "failed"
+            if status == "skipped":
+                self.skipped += 1
+            else:
+                self.runs += 1
+                self.failed += status == "failed"
+                self.last_run_at = time.time()
+                self.last_duration = round(time.monotonic() - started, 3)
+            self.last_status = status
+            await self._publish_stats()
+            delay = self._delay(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.interval > 0,
+            "interval_seconds": self.interval,
+            "jitter_seconds": self.jitter,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "requests_served": self.requests_served,
+            "last_run_at": self.last_run_at,
+            "last_status": self.last_status,
+            "last_duration_seconds": self.last_duration,
+            "next_run_at": self.next_run_at,
+        }
+
+# 全局单例
+patrol_scheduler = PatrolScheduler(settings.PATROL_INTERVAL_SECONDS, settings.PATROL_JITTER_SECONDS)
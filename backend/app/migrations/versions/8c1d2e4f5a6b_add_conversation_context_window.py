@@ -0,0 +1,30 @@
+"""add_conversation_context_window
+
+Revision ID: 8c1d2e4f5a6b
+Revises: 3f83c5d19672
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1d2e4f5a6b'
+down_revision = '3f83c5d19672'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversations') as batch_op:
+        batch_op.add_column(sa.Column('summary', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('summary_upto_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('token_budget', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('conversations') as batch_op:
+        batch_op.drop_column('token_budget')
+        batch_op.drop_column('summary_upto_id')
+        batch_op.drop_column('summary')
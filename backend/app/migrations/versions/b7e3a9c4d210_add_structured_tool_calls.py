@@ -0,0 +1,106 @@
+"""add_structured_tool_calls
+
+Revision ID: b7e3a9c4d210
+Revises: 8c1d2e4f5a6b
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3a9c4d210'
+down_revision = '8c1d2e4f5a6b'
+branch_labels = None
+depends_on = None
+
+MARKER = ":::TOOL_CALLS:::"
+PLACEHOLDER = "🤖 [Thinking/Tool Use]"
+
+
+def upgrade():
+    op.create_table('tool_calls',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('message_id', sa.Integer(), nullable=False),
+        sa.Column('conversation_id', sa.String(), nullable=False),
+        sa.Column('call_id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('args', sa.Text(), nullable=True),
+        sa.Column('position', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tool_calls_id'), 'tool_calls', ['id'], unique=False)
+    op.create_index(op.f('ix_tool_calls_message_id'), 'tool_calls', ['message_id'], unique=False)
+    op.create_index(op.f('ix_tool_calls_conversation_id'), 'tool_calls', ['conversation_id'], unique=False)
+    op.create_index(op.f('ix_tool_calls_call_id'), 'tool_calls', ['call_id'], unique=False)
+    op.create_index(op.f('ix_tool_calls_name'), 'tool_calls', ['name'], unique=False)
+    with op.batch_alter_table('messages') as batch_op:
+        batch_op.add_column(sa.Column('tool_name', sa.String(), nullable=True))
+
+    # Backfill: move "<content>\n:::TOOL_CALLS:::<json>" into tool_calls rows
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, conversation_id, content, created_at FROM messages "
+        "WHERE role = 'assistant' AND content LIKE :pattern"
+    ), {"pattern": f"%{MARKER}%"}).fetchall()
+    names = {}
+    for message_id, conversation_id, content, created_at in rows:
+        visible, _, payload = content.partition(MARKER)
+        try:
+            calls = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+        for position, call in enumerate(calls or []):
+            call_id = call.get("id") or f"call_{message_id}_{position}"
+            names[call_id] = call.get("name", "unknown")
+            conn.execute(sa.text(
+                "INSERT INTO tool_calls (message_id, conversation_id, call_id, name, args, position, created_at) "
+                "VALUES (:message_id, :conversation_id, :call_id, :name, :args, :position, :created_at)"
+            ), {
+                "message_id": message_id,
+                "conversation_id": conversation_id,
+                "call_id": call_id,
+                "name": call.get("name", "unknown"),
+                "args": json.dumps(call.get("args", {}), ensure_ascii=False),
+                "position": position,
+                "created_at": created_at or datetime.utcnow(),
+            })
+        visible = visible.strip()
+        if visible == PLACEHOLDER:
+            visible = ""
+        conn.execute(sa.text("UPDATE messages SET content = :content WHERE id = :id"), {"content": visible, "id": message_id})
+
+    for call_id, name in names.items():
+        conn.execute(sa.text(
+            "UPDATE messages SET tool_name = :name WHERE role = 'tool' AND tool_call_id = :call_id"
+        ), {"name": name, "call_id": call_id})
+
+
+def downgrade():
+    # Fold tool calls back into the content string
+    conn = op.get_bind()
+    calls = {}
+    for message_id, call_id, name, args in conn.execute(sa.text(
+        "SELECT message_id, call_id, name, args FROM tool_calls ORDER BY message_id, position"
+    )).fetchall():
+        calls.setdefault(message_id, []).append({"name": name, "args": json.loads(args or "{}"), "id": call_id})
+    for message_id, message_calls in calls.items():
+        content = conn.execute(sa.text("SELECT content FROM messages WHERE id = :id"), {"id": message_id}).scalar() or PLACEHOLDER
+        conn.execute(sa.text("UPDATE messages SET content = :content WHERE id = :id"), {
+            "content": f"{content}\n{MARKER}{json.dumps(message_calls)}", "id": message_id
+        })
+
+    with op.batch_alter_table('messages') as batch_op:
+        batch_op.drop_column('tool_name')
+    op.drop_index(op.f('ix_tool_calls_name'), table_name='tool_calls')
+    op.drop_index(op.f('ix_tool_calls_call_id'), table_name='tool_calls')
+    op.drop_index(op.f('ix_tool_calls_conversation_id'), table_name='tool_calls')
+    op.drop_index(op.f('ix_tool_calls_message_id'), table_name='tool_calls')
+    op.drop_index(op.f('ix_tool_calls_id'), table_name='tool_calls')
+    op.drop_table('tool_calls')
@@ -0,0 +1,35 @@
+"""add_patrol_reports
+
+Revision ID: d5f1c8a2e6b7
+Revises: b7e3a9c4d210
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f1c8a2e6b7'
+down_revision = 'b7e3a9c4d210'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'patrol_reports',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('mode', sa.String(), nullable=True),
+        sa.Column('issue_count', sa.Integer(), nullable=True),
+        sa.Column('payload', sa.LargeBinary(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_patrol_reports_created_at'), 'patrol_reports', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_patrol_reports_created_at'), table_name='patrol_reports')
+    op.drop_table('patrol_reports')
@@ -0,0 +1,30 @@
+"""add_patrol_state
+
+Revision ID: e2a7c9d4b3f1
+Revises: d5f1c8a2e6b7
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c9d4b3f1'
+down_revision = 'd5f1c8a2e6b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'patrol_state',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('patrol_state')
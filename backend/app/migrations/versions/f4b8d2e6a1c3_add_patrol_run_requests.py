@@ -0,0 +1,35 @@
+"""add_patrol_run_requests
+
+Revision ID: f4b8d2e6a1c3
+Revises: e2a7c9d4b3f1
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2e6a1c3'
+down_revision = 'e2a7c9d4b3f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'patrol_run_requests',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('incremental', sa.Boolean(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('report_id', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_patrol_run_requests_created_at'), 'patrol_run_requests', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_patrol_run_requests_created_at'), table_name='patrol_run_requests')
+    op.drop_table('patrol_run_requests')
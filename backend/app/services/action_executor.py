@@ -1,13 +1,13 @@
 import logging
 import asyncio
-from app.services.k8s_client import K8sClient
+from app.services.k8s_client import k8s_client
 from app.services.safety_gate import SafetyGate
 
 logger = logging.getLogger(__name__)
 
 class ActionExecutor:
     def __init__(self):
-        self.k8s_client = K8sClient()
+        self.k8s_client = k8s_client
         self.safety_gate = SafetyGate()
 
     async def execute(self, action_plan: dict) -> bool:
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+def compute_fingerprint(labels: Dict[str, str]) -> str:
+    """
+    Stable fingerprint of an alert, derived from its label set only
+    (annotations / timestamps change between Alertmanager resends).
+    """
+    canonical = "\x00".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+@dataclass
+class CoalesceEntry:
+    fingerprint: str
+    state: str = "queued"  # queued, running, done
+    conversation_id: Optional[str] = None
+    first_seen: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+    repeat_count: int = 0
+
+class AlertCoalescer:
+    """
+    Suppresses duplicate alert firings in front of the agent.
+
+    An alert is a duplicate if the same fingerprint is queued, under investigation,
+    or was last seen less than `window_seconds` ago (sliding: every repeat extends it).
+    """
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+        # fingerprint -> entry, oldest `last_seen` first
+        self._entries: "OrderedDict[str, CoalesceEntry]" = OrderedDict()
+        self.suppressed_total = 0
+
+    def admit(self, fingerprint: str) -> Optional[CoalesceEntry]:
+        """
+        Register a firing. Returns None if it should be investigated,
+        or the existing entry it was coalesced into.
+        """
+        self._prune()
+        now = time.monotonic()
+        entry = self._entries.get(fingerprint)
+        if entry is not None:
+            entry.last_seen = now
+            entry.repeat_count += 1
+            self._entries.move_to_end(fingerprint)
+            self.suppressed_total += 1
+            return entry
+
+        self._entries[fingerprint] = CoalesceEntry(fingerprint=fingerprint, first_seen=now, last_seen=now)
+        return None
+
+    def forget(self, fingerprint: str):
+        """Drop a fingerprint that never made it into the queue (rejected / shed)."""
+        self._entries.pop(fingerprint, None)
+
+    def mark_running(self, fingerprint: str, conversation_id: str):
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            # Pruned while queued (very long queue wait); track it again
+            entry = CoalesceEntry(fingerprint=fingerprint)
+            self._entries[fingerprint] = entry
+        entry.state = "running"
+        entry.conversation_id = conversation_id
+
+    def mark_done(self, fingerprint: str):
+        entry = self._entries.get(fingerprint)
+        if entry is not None:
+            entry.state = "done"
+            # The window starts counting from the end of the investigation
+            entry.last_seen = time.monotonic()
+            self._entries.move_to_end(fingerprint)
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.window_seconds
+        for fingerprint in list(self._entries.keys()):
+            entry = self._entries[fingerprint]
+            if entry.last_seen >= cutoff:
+                break
+            if entry.state == "done":
+                del self._entries[fingerprint]
+
+    def stats(self) -> Dict[str, int]:
+        states: Dict[str, int] = {"queued": 0, "running": 0, "done": 0}
+        for entry in self._entries.values():
+            states[entry.state] += 1
+        return {"tracked": len(self._entries), "suppressed_total": self.suppressed_total, **states}
@@ -0,0 +1,121 @@
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.topology_index import TopologyIndex
+
+logger = logging.getLogger(__name__)
+
+_IP_PORT_RE = re.compile(r"^[\d.]+(:\d+)?$")
+
+@dataclass
+class Incident:
+    """A group of alerts that share a root (node / owner workload / namespace) and get one investigation."""
+    key: str
+    lead: Any  # AlertWorkItem that gets investigated
+    members: List[Any] = field(default_factory=list)  # correlated AlertWorkItems
+    state: str = "queued"  # queued, running, done
+    conversation_id: Optional[str] = None
+    opened_at: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+
+class AlertCorrelator:
+    """
+    Groups alerts into incidents within a time window, using the topology index:
+
+    1. node/<node>        - node alerts, and pod alerts on a NotReady node or on a node that
+                            already has an open incident
+    2. owner/<ns>/<kind>/<name> - pod alerts of the same Deployment / StatefulSet / DaemonSet ...
+    3. namespace/<ns>/<alertname> - everything else
+
+    An incident stays open while queued or running, and for `window_seconds` after the last
+    alert joined or the investigation finished.
+    """
+    def __init__(self, topology: TopologyIndex, window_seconds: int):
+        self.topology = topology
+        self.window_seconds = window_seconds
+        self._incidents: Dict[str, Incident] = {}
+        self.correlated_total = 0
+
+    @staticmethod
+    def _pod_name(labels: Dict[str, str]) -> Optional[str]:
+        pod = labels.get("pod") or labels.get("pod_name")
+        if pod:
+            return pod
+        instance = labels.get("instance")
+        if instance and not _IP_PORT_RE.match(instance):
+            return instance
+        return None
+
+    def candidate_keys(self, labels: Dict[str, str]) -> Tuple[List[str], Optional[str]]:
+        """Returns (keys in priority order, node key that may absorb this alert)."""
+        namespace = labels.get("namespace", "default")
+        pod = self._pod_name(labels) if labels.get("namespace") else None
+        node = labels.get("node")
+
+        if not pod:
+            if node:
+                return [f"node/{node}"], None
+            return [f"namespace/{namespace}/{labels.get('alertname', 'Unknown Alert')}"], None
+
+        node = node or self.topology.node_of(namespace, pod)
+        keys = []
+        node_key = f"node/{node}" if node else None
+        if node and self.topology.is_node_unhealthy(node):
+            keys.append(node_key)
+        owner = self.topology.owner_of(namespace, pod)
+        if owner:
+            keys.append(f"owner/{namespace}/{owner[0]}/{owner[1]}")
+        else:
+            keys.append(f"namespace/{namespace}/{labels.get('alertname', 'Unknown Alert')}")
+        return keys, node_key
+
+    def correlate(self, item) -> Tuple[Incident, bool]:
+        """
+        Attach the item to an open incident, or open a new one led by it.
+        Returns (incident, is_new).
+        """
+        self._prune()
+        now = time.monotonic()
+        keys, node_key = self.candidate_keys(item.alert.labels)
+
+        # A pod on a node that already has an open incident belongs to the node incident
+        lookup = ([node_key] if node_key and node_key not in keys else []) + keys
+        for key in lookup:
+            incident = self._incidents.get(key)
+            if incident is not None:
+                incident.members.append(item)
+                incident.last_seen = now
+                item.incident = incident
+                self.correlated_total += 1
+                return incident, False
+
+        incident = Incident(key=keys[0], lead=item, opened_at=now, last_seen=now)
+        self._incidents[incident.key] = incident
+        item.incident = incident
+        return incident, True
+
+    def discard(self, incident: Incident):
+        if self._incidents.get(incident.key) is incident:
+            del self._incidents[incident.key]
+
+    def mark_running(self, incident: Incident, conversation_id: str):
+        incident.state = "running"
+        incident.conversation_id = conversation_id
+
+    def mark_done(self, incident: Incident):
+        incident.state = "done"
+        incident.last_seen = time.monotonic()
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.window_seconds
+        for key in [k for k, i in self._incidents.items() if i.state == "done" and i.last_seen < cutoff]:
+            del self._incidents[key]
+
+    def stats(self) -> Dict[str, int]:
+        states: Dict[str, int] = {"queued": 0, "running": 0, "done": 0}
+        for incident in self._incidents.values():
+            states[incident.state] += 1
+        return {"open": len(self._incidents), "correlated_total": self.correlated_total, **states}
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AlertJournal:
+    """
+    Crash-safe local journal for queued alerts (SQLite, WAL mode).
+
+    - append(): group commit. Concurrent webhook calls are batched into a single
+      transaction every `flush_interval_ms` (or `batch_size` rows), and each caller
+      only returns once its rows are durable.
+    - ack(): marks an entry finished. Acks are batched into the same commit loop;
+      a lost ack means the alert is replayed once more after a restart (at-least-once).
+    - load_since(): unacknowledged entries, replayed on startup. The journal is also the
+      hand-off between gunicorn workers: followers only append, the leader tails it.
+      Rows the leader appends with `claim=True` (it queues them itself) are never returned by
+      load_since() in this process; the claim is recorded on the journal thread in the same
+      step as the insert, so the tail cannot race it. Each row also records the pid that wrote
+      it (`owner`, for debugging only: pids are reused across container restarts).
+
+    All SQLite access happens on one dedicated thread so the event loop never blocks on fsync.
+    """
+    def __init__(self, path: str, flush_interval_ms: int = 20, batch_size: int = 256):
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert-journal")
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self._pending_appends: List[Tuple[List[Tuple[str, str]], asyncio.Future, bool]] = []
+        self._claimed: Set[int] = set()  # journal thread only
+        self._pending_acks: List[int] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.appended_total = 0
+        self.acked_total = 0
+        self.commits_total = 0
+
+    # --- Blocking helpers (journal thread only) ---
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: every (batched) commit is fsync'ed, so an acknowledged webhook survives power loss
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS alert_journal ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " fingerprint TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " owner INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL)"
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(alert_journal)")]
+        if "owner" not in columns:
+            conn.execute("ALTER TABLE alert_journal ADD COLUMN owner INTEGER NOT NULL DEFAULT 0")
+        self._conn = conn
+
+    def _commit_batch(self, rows: List[Tuple[str, str]], claims: List[bool], acks: List[int]) -> List[int]:
+        conn = self._conn
+        ids = []
+        now = time.time()
+        owner = os.getpid()
+        # IMMEDIATE takes the write lock up front, so ids are assigned in commit order
+        # (the leader tails by id).
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for fingerprint, payload in rows:
+                cur = conn.execute(
+                    "INSERT INTO alert_journal (fingerprint, payload, owner, created_at) VALUES (?, ?, ?, ?)",
+                    (fingerprint, payload, owner, now)
+                )
+                ids.append(cur.lastrowid)
+            if acks:
+                conn.executemany("DELETE FROM alert_journal WHERE id = ?", [(i,) for i in acks])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._claimed.update(i for i, claim in zip(ids, claims) if claim)
+        return ids
+
+    def _load_since(self, after_id: int) -> List[Tuple[int, str, str, int]]:
+        rows = self._conn.execute(
+            "SELECT id, fingerprint, payload, owner FROM alert_journal WHERE id > ? ORDER BY id",
+            (after_id,)
+        ).fetchall()
+        # Claims at or below the caller's position are never asked about again
+        self._claimed = {i for i in self._claimed if i > after_id}
+        return [row for row in rows if row[0] not in self._claimed]
+
+    def _count_pending(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM alert_journal").fetchone()[0]
+
+    # --- Async API ---
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def open(self):
+        if self._conn is None:
+            await self._run(self._open)
+            logger.info(f"Alert journal opened: {self.path}")
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def append(self, rows: List[Tuple[str, str]], claim: bool = False) -> List[int]:
+        """
+        Durably append (fingerprint, payload_json) rows. Returns their journal ids.
+        claim=True: this process handles the rows itself; its load_since() skips them.
+        """
+        if not rows:
+            return []
+        await self.open()
+        future = asyncio.get_running_loop().create_future()
+        self._pending_appends.append((rows, future, claim))
+        if sum(len(r) for r, _, _ in self._pending_appends) >= self.batch_size:
+            self._wakeup.set()
+        return await future
+
+    def ack(self, journal_id: Optional[int]):
+        """Mark an entry as finished (investigation + notification done, or dropped)."""
+        if journal_id is None:
+            return
+        self._pending_acks.append(journal_id)
+
+    async def load_since(self, after_id: int = 0) -> List[Tuple[int, str, str, int]]:
+        """Unacknowledged (id, fingerprint, payload, owner) rows with id > after_id, except rows claimed by this process."""
+        await self.open()
+        return await self._run(self._load_since, after_id)
+
+    async def count_pending(self) -> int:
+        await self.open()
+        return await self._run(self._count_pending)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending_appends and not self._pending_acks:
+            return
+        appends, self._pending_appends = self._pending_appends, []
+        acks, self._pending_acks = self._pending_acks, []
+        rows = [row for batch, _, _ in appends for row in batch]
+        claims = [claim for batch, _, claim in appends for _ in batch]
+        try:
+            ids = await self._run(self._commit_batch, rows, claims, acks)
+        except Exception as e:
+            logger.error(f"Alert journal commit failed ({len(rows)} rows, {len(acks)} acks): {e}")
+            for _, future, _ in appends:
+                if not future.done():
+                    future.set_exception(e)
+            # Keep the acks; they are retried with the next batch
+            self._pending_acks = acks + self._pending_acks
+            return
+
+        self.commits_total += 1
+        self.appended_total += len(rows)
+        self.acked_total += len(acks)
+        offset = 0
+        for batch, future, _ in appends:
+            if not future.done():
+                future.set_result(ids[offset:offset + len(batch)])
+            offset += len(batch)
+
+    async def close(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "appended_total": self.appended_total,
+            "acked_total": self.acked_total,
+            "commits_total": self.commits_total,
+            "pending_acks": len(self._pending_acks),
+        }
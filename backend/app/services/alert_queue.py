@@ -1,17 +1,232 @@
 import asyncio
+import heapq
+import itertools
 import logging
-from app.schemas.alert import AlertmanagerPayload
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.schemas.alert import AlertmanagerPayload, Alert as AlertSchema
+from app.agent.stream import CoalescingStreamHandler
+from app.services.alert_coalescer import AlertCoalescer, compute_fingerprint
+from app.services.alert_journal import AlertJournal
+from app.services.leader_lease import leader_lease
+from app.services.alert_correlator import AlertCorrelator, Incident
+from app.services.topology_index import topology_index
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class AlertWorkItem:
+    """A single alert from an Alertmanager payload, queued for investigation."""
+    payload: AlertmanagerPayload
+    alert: AlertSchema
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    received_at: float = field(default_factory=time.time)
+    fingerprint: str = ""
+    # Row id in the durable journal (journal mode only)
+    journal_id: Optional[int] = None
+    # Correlated incident this alert leads or belongs to
+    incident: Optional[Any] = None
+
+    def __post_init__(self):
+        if not self.fingerprint:
+            self.fingerprint = compute_fingerprint(self.alert.labels)
+
+    @property
+    def namespace(self) -> str:
+        return self.alert.labels.get('namespace', 'default')
+
+    @property
+    def severity(self) -> str:
+        return self.alert.labels.get('severity', 'info').lower()
+
+    def to_journal(self) -> str:
+        """Serialize as a single-alert Alertmanager payload."""
+        return self.payload.model_copy(update={"alerts": [self.alert]}).model_dump_json()
+
+    @property
+    def priority(self) -> Tuple[int, float]:
+        """Lower sorts first: severity rank, then alert age (oldest firing first)."""
+        rank = SEVERITY_RANK.get(self.severity, DEFAULT_SEVERITY_RANK)
+        return (rank, _parse_timestamp(self.alert.startsAt) or self.received_at)
+
+# Severity label -> priority rank (lower = more urgent)
+SEVERITY_RANK = {
+    "critical": 0,
+    "high": 1,
+    "error": 1,
+    "warning": 2,
+    "medium": 2,
+    "info": 3,
+    "low": 3,
+    "none": 4,
+}
+DEFAULT_SEVERITY_RANK = SEVERITY_RANK["info"]
+
+_FRACTION_RE = re.compile(r"\.(\d{6})\d+")
+
+def _parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Parse Alertmanager's RFC3339 timestamps (nanosecond precision, 'Z' suffix)."""
+    if not value:
+        return None
+    try:
+        value = _FRACTION_RE.sub(r".\1", value.replace("Z", "+00:00"))
+        ts = datetime.fromisoformat(value).timestamp()
+        # Alertmanager uses the zero time for "unset"
+        return ts if ts > 0 else None
+    except ValueError:
+        return None
+
+class AlertPriorityQueue:
+    """
+    Bounded priority queue for alert work items.
+    Ordered by severity then age. When full, low-severity items are shed first:
+    an incoming item evicts the least urgent queued item if it is more urgent,
+    otherwise the incoming item itself is rejected.
+    Consumers take the most urgent item they are able to run (see `get`); the rest stay queued,
+    so items waiting for a busy namespace still count toward the bound and can be shed.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._heap: List[Tuple[Tuple[int, float], int, AlertWorkItem]] = []
+        self._seq = itertools.count()
+        # Set whenever an item arrives or a consumer's eligibility may have changed
+        self._changed = asyncio.Event()
+
+    def qsize(self) -> int:
+        return len(self._heap)
+
+    def full(self) -> bool:
+        return len(self._heap) >= self.maxsize
+
+    def offer(self, item: AlertWorkItem, force: bool = False) -> Tuple[bool, Optional[AlertWorkItem]]:
+        """
+        Try to add an item without blocking.
+        Returns (accepted, shed_item). shed_item is the queued item evicted to make room, if any.
+        force=True ignores the capacity (used for journal replay).
+        """
+        entry = (item.priority, next(self._seq), item)
+        if force or not self.full():
+            heapq.heappush(self._heap, entry)
+            self._changed.set()
+            return True, None
+
+        # Full: find the least urgent queued entry (newest among the lowest severity)
+        worst_idx = max(range(len(self._heap)), key=lambda i: (self._heap[i][0][0], self._heap[i][0][1], self._heap[i][1]))
+        worst = self._heap[worst_idx]
+        if item.priority[0] >= worst[0][0]:
+            # Not more severe than anything we could shed
+            return False, None
+
+        self._heap[worst_idx] = entry
+        heapq.heapify(self._heap)
+        self._changed.set()
+        return True, worst[2]
+
+    def notify(self):
+        """Wake waiting consumers to re-check eligibility (e.g. a namespace slot was freed)."""
+        self._changed.set()
+
+    def _pop(self, eligible: Callable[[AlertWorkItem], bool]) -> Optional[AlertWorkItem]:
+        if not self._heap:
+            return None
+        if eligible(self._heap[0][2]):
+            return heapq.heappop(self._heap)[2]
+        candidates = [i for i, entry in enumerate(self._heap) if eligible(entry[2])]
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda i: self._heap[i][:2])
+        entry = self._heap[best]
+        self._heap[best] = self._heap[-1]
+        self._heap.pop()
+        heapq.heapify(self._heap)
+        return entry[2]
+
+    async def get(self, eligible: Callable[[AlertWorkItem], bool] = lambda item: True) -> AlertWorkItem:
+        """Remove and return the most urgent item accepted by `eligible`, waiting until there is one."""
+        while True:
+            item = self._pop(eligible)
+            if item is not None:
+                return item
+            self._changed.clear()
+            await self._changed.wait()
+
+    def count(self, predicate: Callable[[AlertWorkItem], bool]) -> int:
+        return sum(1 for _, _, item in self._heap if predicate(item))
+
+    def depth_by_severity(self) -> Dict[str, int]:
+        counts: Dict[str, int] = defaultdict(int)
+        for _, _, item in self._heap:
+            counts[item.severity] += 1
+        return dict(counts)
+
+class AlertStreamHandler(CoalescingStreamHandler):
+    """
+    Streams background investigation events to any UI clients watching the conversation.
+    Token frames are coalesced (see CoalescingStreamHandler).
+    """
+    def __init__(self, conversation_id: str):
+        super().__init__()
+        self.conversation_id = conversation_id
+        self.run_id: Optional[str] = None
+
+    async def _emit(self, data: Dict[str, Any]):
+        from app.services.connection_manager import manager as connection_manager
+        # Broadcast to real clients if any (local sockets + other workers via the stream broker)
+        await connection_manager.broadcast_json(self.conversation_id, data, run_id=self.run_id)
+
+        msg_type = data.get("type")
+        if msg_type == "tool_start":
+            logger.info(f"🤖 Agent Tool: {data.get('tool')} ({data.get('args')})")
+        elif msg_type == "tool_result":
+            logger.info(f"🔧 Tool Output: {str(data.get('output'))[:100]}...") # Truncate
+
 class AlertQueueService:
     _instance = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(AlertQueueService, cls).__new__(cls)
-            cls._instance.queue = asyncio.Queue()
+            cls._instance.queue = AlertPriorityQueue(max(1, settings.ALERT_QUEUE_MAXSIZE))
             cls._instance.is_running = False
+            cls._instance._started = False
+            cls._instance.workers: List[asyncio.Task] = []
+
+            # Concurrency limits
+            cls._instance.worker_count = max(1, settings.ALERT_QUEUE_WORKERS)
+            cls._instance.max_concurrent = max(1, settings.ALERT_MAX_CONCURRENT_INVESTIGATIONS)
+            cls._instance.max_per_namespace = max(1, settings.ALERT_MAX_INVESTIGATIONS_PER_NAMESPACE)
+            cls._instance._slots = asyncio.Semaphore(cls._instance.max_concurrent)
+
+            # Live counters (for sizing the pool)
+            cls._instance.in_flight = 0
+            cls._instance.in_flight_by_namespace: Dict[str, int] = defaultdict(int)
+            cls._instance.processed_total = 0
+            cls._instance.failed_total = 0
+            cls._instance.rejected_total = 0
+            cls._instance.shed_total = 0
+
+            # Duplicate suppression (Alertmanager repeat_interval resends / retries)
+            cls._instance.coalescer = AlertCoalescer(settings.ALERT_DEDUP_WINDOW_SECONDS)
+            # Topology correlation: one investigation per incident (node / owner workload / namespace)
+            cls._instance.correlator = AlertCorrelator(topology_index, settings.ALERT_CORRELATION_WINDOW_SECONDS)
+
+            # Durable mode: queued alerts survive restarts and are acked after notification
+            cls._instance.journal = None
+            if settings.ALERT_QUEUE_MODE == "journal":
+                cls._instance.journal = AlertJournal(
+                    settings.ALERT_JOURNAL_PATH,
+                    flush_interval_ms=settings.ALERT_JOURNAL_FLUSH_INTERVAL_MS
+                )
+            # Journal ids queued / in flight in this process, and the tail position (leader only)
+            cls._instance._journal_ids: Set[int] = set()
+            cls._instance._journal_hwm = 0
+            cls._instance._journal_backlog = (0, 0.0) # (pending count, checked_at) for followers
             
             # Setup Debug Logging
             fh = logging.FileHandler("alert_debug.log", mode='a', encoding='utf-8')
@@ -21,78 +236,397 @@ class AlertQueueService:
             
         return cls._instance
 
-    async def enqueue(self, payload: AlertmanagerPayload):
-        """Push an alert payload to the processing queue."""
-        await self.queue.put(payload)
+    async def enqueue(self, payload: AlertmanagerPayload) -> Dict[str, int]:
+        """
+        Push each alert of the payload to the processing queue.
+        Returns accepted/rejected counts; rejected > 0 means the queue is overloaded.
+        """
+        accepted, rejected, coalesced, correlated = 0, 0, 0, 0
+        # Most urgent first, so a full queue keeps the critical alerts of this payload
+        items = sorted((AlertWorkItem(payload=payload, alert=alert) for alert in payload.alerts), key=lambda i: i.priority)
+
+        if self.journal and not self.is_running:
+            # Follower worker: hand off to the leader through the journal
+            return await self._enqueue_follower(items)
+
+        admitted = []
+        for item in items:
+            existing = self.coalescer.admit(item.fingerprint)
+            if existing is not None:
+                coalesced += 1
+                await self._attach_repeat(item, existing)
+                continue
+            admitted.append(item)
+
+        if self.journal and admitted:
+            # Durable before we answer the webhook (group commit with concurrent requests);
+            # claimed, so the journal tail leaves them to us
+            try:
+                ids = await self.journal.append([(item.fingerprint, item.to_journal()) for item in admitted], claim=True)
+            except Exception:
+                for item in admitted:
+                    self.coalescer.forget(item.fingerprint)
+                raise
+            for item, journal_id in zip(admitted, ids):
+                item.journal_id = journal_id
+
+        for item in admitted:
+            if item.journal_id is not None:
+                self._journal_ids.add(item.journal_id)
+            outcome = await self._route(item)
+            if outcome == "rejected":
+                rejected += 1
+                continue
+            accepted += 1
+            if outcome == "correlated":
+                correlated += 1
+
+        self.rejected_total += rejected
+        if rejected:
+            logger.warning(f"Alert queue full ({self.queue.qsize()}/{self.queue.maxsize}), rejected {rejected} alerts")
+        if coalesced:
+            logger.info(f"Coalesced {coalesced} duplicate alerts into existing investigations")
+        if correlated:
+            logger.info(f"Correlated {correlated} alerts into existing incidents")
         logger.info(f"Alert enqueued. Current queue size: {self.queue.qsize()}")
+        return {"accepted": accepted, "rejected": rejected, "coalesced": coalesced, "correlated": correlated}
+
+    async def _route(self, item: AlertWorkItem, force: bool = False) -> str:
+        """
+        Correlate an admitted item: join an open incident, or queue it as the lead of a new one.
+        Returns "queued", "correlated" or "rejected".
+        """
+        incident, is_new = self.correlator.correlate(item)
+        if not is_new:
+            await self._attach_member(incident, item)
+            return "correlated"
+
+        ok, shed = self.queue.offer(item, force=force)
+        if not ok:
+            self.correlator.discard(incident)
+            self._drop(item)
+            return "rejected"
+        if shed:
+            self._drop_incident(shed)
+            self.shed_total += 1
+            logger.warning(f"Alert queue full, shed [{shed.severity}] {shed.alert.labels.get('alertname', 'Unknown Alert')} "
+                           f"for [{item.severity}] {item.alert.labels.get('alertname', 'Unknown Alert')}")
+        return "queued"
+
+    async def _attach_member(self, incident: Incident, item: AlertWorkItem):
+        alert_name = item.alert.labels.get('alertname', 'Unknown Alert')
+        if incident.state == "queued":
+            # Included in the lead's investigation prompt when it starts
+            logger.info(f"🔗 {alert_name} correlated into queued incident {incident.key}")
+        elif incident.state == "running":
+            logger.info(f"🔗 {alert_name} correlated into running incident {incident.key} ({incident.conversation_id})")
+            self.coalescer.mark_running(item.fingerprint, incident.conversation_id)
+            from app.services.connection_manager import manager as connection_manager
+            await connection_manager.broadcast_json(incident.conversation_id, {
+                "type": "alert_correlated",
+                "incident": incident.key,
+                "alertname": alert_name,
+                "labels": item.alert.labels,
+            })
+        else:
+            # Investigated moments ago; nothing left to wait for
+            logger.info(f"🔗 {alert_name} correlated into recently finished incident {incident.key} ({incident.conversation_id})")
+            self.coalescer.mark_done(item.fingerprint)
+            self._ack(item)
+
+    def _drop_incident(self, lead: AlertWorkItem):
+        """Drop a queued lead that was shed, together with the alerts correlated into it."""
+        incident = lead.incident
+        self._drop(lead)
+        if incident is not None:
+            for member in incident.members:
+                self._drop(member)
+            self.correlator.discard(incident)
+
+    def _start_incident(self, item: AlertWorkItem, conversation_id: str):
+        incident = item.incident
+        if incident is None:
+            return
+        self.correlator.mark_running(incident, conversation_id)
+        for member in incident.members:
+            self.coalescer.mark_running(member.fingerprint, conversation_id)
+
+    def _finish_incident(self, item: AlertWorkItem, finished: bool):
+        incident = item.incident
+        if incident is None:
+            return
+        self.correlator.mark_done(incident)
+        for member in incident.members:
+            self.coalescer.mark_done(member.fingerprint)
+            if finished:
+                self._ack(member)
+
+    async def _enqueue_follower(self, items: List[AlertWorkItem]) -> Dict[str, int]:
+        """
+        Append to the journal only; the leader worker tails it, deduplicates and investigates.
+        Backpressure is based on the journal backlog since the leader's queue is not visible here.
+        """
+        count, checked_at = self._journal_backlog
+        now = time.monotonic()
+        if now - checked_at > 1.0:
+            count, checked_at = await self.journal.count_pending(), now
+        room = max(0, self.queue.maxsize - count)
+        admitted = items[:room]
+        rejected = len(items) - len(admitted)
+        await self.journal.append([(item.fingerprint, item.to_journal()) for item in admitted])
+        self._journal_backlog = (count + len(admitted), checked_at)
+
+        self.rejected_total += rejected
+        if rejected:
+            logger.warning(f"Alert journal backlog full ({count}/{self.queue.maxsize}), rejected {rejected} alerts")
+        return {"accepted": len(admitted), "rejected": rejected, "coalesced": 0, "correlated": 0}
+
+    def _ack(self, item: AlertWorkItem):
+        if self.journal and item.journal_id is not None:
+            self.journal.ack(item.journal_id)
+            self._journal_ids.discard(item.journal_id)
+
+    def _drop(self, item: AlertWorkItem):
+        """Forget an item that will not be investigated (rejected or shed)."""
+        self.coalescer.forget(item.fingerprint)
+        self._ack(item)
+
+    async def _tail_journal(self):
+        """
+        Leader only. The first pass replays everything left unacknowledged (crash / restart /
+        rolling deploy / previous leader); after that it picks up what follower workers append,
+        including rows this worker appended before it became leader.
+        Rows enqueue() appended as leader are claimed in the journal and never returned here.
+        """
+        first_pass = True
+        while self.is_running:
+            try:
+                rows = await self.journal.load_since(self._journal_hwm)
+                replayed = 0
+                for journal_id, fingerprint, payload_json, owner in rows:
+                    self._journal_hwm = max(self._journal_hwm, journal_id)
+                    if journal_id in self._journal_ids:
+                        continue
+                    if await self._offer_journal_row(journal_id, fingerprint, payload_json):
+                        replayed += 1
+                if replayed and first_pass:
+                    logger.info(f"♻️ Replayed {replayed} unacknowledged alerts from journal")
+                first_pass = False
+            except Exception as e:
+                logger.error(f"Alert journal tail failed: {e}")
+            await asyncio.sleep(settings.ALERT_JOURNAL_POLL_INTERVAL_MS / 1000)
+
+    async def _offer_journal_row(self, journal_id: int, fingerprint: str, payload_json: str) -> bool:
+        try:
+            payload = AlertmanagerPayload.model_validate_json(payload_json)
+            item = AlertWorkItem(payload=payload, alert=payload.alerts[0], fingerprint=fingerprint, journal_id=journal_id)
+        except Exception as e:
+            logger.error(f"Dropping unreadable journal entry {journal_id}: {e}")
+            self.journal.ack(journal_id)
+            return False
+
+        # Followers don't deduplicate; the leader does it for every worker
+        existing = self.coalescer.admit(fingerprint)
+        if existing is not None:
+            await self._attach_repeat(item, existing)
+            self.journal.ack(journal_id)
+            return False
+
+        self._journal_ids.add(journal_id)
+        # Already accepted (and answered 200) by some worker, so it must not be rejected now
+        await self._route(item, force=True)
+        return True
+
+    def start(self):
+        """
+        Start alert consumption (idempotent).
+        Journal mode: only the elected leader worker consumes; the others hand off via the journal.
+        Memory mode: every process consumes its own in-memory queue.
+        """
+        if self._started:
+            return
+        self._started = True
+        if self.journal:
+            leader_lease.on_elected(self.process_queue)
+            leader_lease.start()
+        else:
+            asyncio.create_task(self.process_queue())
+
+    async def shutdown(self):
+        """Flush pending journal acks on shutdown."""
+        if self.journal:
+            await self.journal.close()
+
+    async def _attach_repeat(self, item: AlertWorkItem, entry):
+        """Attach a repeat firing to the investigation it was coalesced into."""
+        alert_name = item.alert.labels.get('alertname', 'Unknown Alert')
+        if entry.state == "running" and entry.conversation_id:
+            logger.info(f"🔁 Repeat firing of {alert_name} ({item.fingerprint}) attached to {entry.conversation_id} (x{entry.repeat_count})")
+            from app.services.connection_manager import manager as connection_manager
+            await connection_manager.broadcast_json(entry.conversation_id, {
+                "type": "alert_repeat",
+                "fingerprint": item.fingerprint,
+                "alertname": alert_name,
+                "repeat_count": entry.repeat_count,
+            })
+        else:
+            logger.info(f"🔁 Duplicate firing of {alert_name} ({item.fingerprint}) suppressed ({entry.state}, x{entry.repeat_count})")
 
     async def process_queue(self):
-        """Background worker to process alerts."""
+        """Background worker pool to process alerts."""
+        if self.is_running:
+            return
         self.is_running = True
-        logger.info("AlertQueueService worker started.")
-        
+        topology_index.start()
+        logger.info(f"AlertQueueService started with {self.worker_count} workers "
+                    f"(global cap: {self.max_concurrent}, per-namespace cap: {self.max_per_namespace}).")
+
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        if self.journal:
+            self.workers.append(asyncio.create_task(self._tail_journal()))
+        try:
+            await asyncio.gather(*self.workers)
+        finally:
+            self.is_running = False
+
+    async def _worker(self, worker_id: int):
         while self.is_running:
+            # Most urgent item whose namespace has a free slot; items of busy namespaces stay
+            # queued (no head-of-line blocking, and they remain subject to the queue bound)
+            item = await self.queue.get(self._has_namespace_slot)
+
             try:
-                # Wait for an item from the queue
-                payload = await self.queue.get()
-                
-                # Mock Processing Logic (MVP)
-                await self._process_payload(payload)
-                
-                # Mark task as done
-                self.queue.task_done()
-                
+                await self._run_item(item)
             except Exception as e:
-                logger.error(f"Error processing alert: {e}")
+                logger.error(f"[worker-{worker_id}] Error processing alert: {e}")
                 await asyncio.sleep(1) # Prevent tight loop on error
 
-    async def _process_payload(self, payload: AlertmanagerPayload):
+    def _has_namespace_slot(self, item: AlertWorkItem) -> bool:
+        return self.in_flight_by_namespace.get(item.namespace, 0) < self.max_per_namespace
+
+    async def _run_item(self, item: AlertWorkItem):
+        namespace = item.namespace
+        # Reserve the namespace slot synchronously (no await between check and increment)
+        self.in_flight_by_namespace[namespace] += 1
+        try:
+            async with self._slots:
+                self.in_flight += 1
+                finished = True
+                try:
+                    if await self._process_alert(item):
+                        self.processed_total += 1
+                    else:
+                        self.failed_total += 1
+                except asyncio.CancelledError:
+                    # Shutdown mid-investigation: keep it in the journal so it is replayed
+                    finished = False
+                    raise
+                except Exception:
+                    self.failed_total += 1
+                    raise
+                finally:
+                    self.in_flight -= 1
+                    self.coalescer.mark_done(item.fingerprint)
+                    self._finish_incident(item, finished)
+                    # Ack only once investigation + notification are done (or failed for good)
+                    if finished:
+                        self._ack(item)
+        finally:
+            self.in_flight_by_namespace[namespace] -= 1
+            if self.in_flight_by_namespace[namespace] <= 0:
+                del self.in_flight_by_namespace[namespace]
+            # Queued items of this namespace may now be eligible
+            self.queue.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Live queue depth / in-flight counters."""
+        return {
+            "running": self.is_running,
+            "workers": self.worker_count,
+            "max_concurrent": self.max_concurrent,
+            "max_per_namespace": self.max_per_namespace,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "queue_depth_by_severity": self.queue.depth_by_severity(),
+            # Queued but waiting for a slot in their namespace
+            "deferred": self.queue.count(lambda item: not self._has_namespace_slot(item)),
+            "in_flight": self.in_flight,
+            "in_flight_by_namespace": dict(self.in_flight_by_namespace),
+            "processed_total": self.processed_total,
+            "failed_total": self.failed_total,
+            "rejected_total": self.rejected_total,
+            "shed_total": self.shed_total,
+            "coalescer": self.coalescer.stats(),
+            "correlator": self.correlator.stats(),
+            "topology": topology_index.stats(),
+            "mode": "journal" if self.journal else "memory",
+            "role": "consumer" if self.is_running else ("follower" if self.journal else "idle"),
+            "journal": self.journal.stats() if self.journal else None,
+        }
+
+    async def _process_alert(self, item: AlertWorkItem) -> bool:
         """
-        Core logic for handling the alert:
+        Core logic for handling the alert (the lead of a correlated incident):
         1. Parse Alert
         2. Construct Prompt
         3. Trigger Agent (via GraphExecutor)
+        Returns False when the investigation failed (the failure is reported, not raised).
         """
         from app.agent.executor import run_agent_graph
         import uuid
+
+        payload, alert, fingerprint = item.payload, item.alert, item.fingerprint
         
-        for alert in payload.alerts:
-            # 1. Parse Basic Info
-            alert_name = alert.labels.get('alertname', 'Unknown Alert')
-            severity = alert.labels.get('severity', 'info')
-            summary = alert.annotations.get('summary', 'No summary provided')
-            description = alert.annotations.get('description', '')
-            instance = alert.labels.get('instance', 'unknown-instance')
-            namespace = alert.labels.get('namespace', 'default') # Assumption
-            
-            logger.info(f"⚡ PROCESSING ALERT: [{severity.upper()}] {alert_name} - {summary}")
-            
-            # 2. Construct Investigation Prompt
-            # 2. Construct Intelligent Prompt (Goal-Based)
-            
-            # A. Dynamic Context Hints
-            hints = []
-            lower_summary = summary.lower()
-            if "cpu" in lower_summary:
-                hints.append("重点检查 CPU 使用率 (Metrics) 和 Top 消耗进程。")
-            elif "memory" in lower_summary or "oom" in lower_summary:
-                hints.append("怀疑是内存泄漏或 OOMKilled，请检查 Events 和 上一次重启的原因。")
-            elif "network" in lower_summary or "timeout" in lower_summary:
-                hints.append("怀疑是网络问题，请检查 Endpoints 和 Service 状态。")
-            
-            if severity == "critical":
-                hints.append("这是一个严重告警，请优先确认服务可用性。")
-            
-            hint_text = "\n".join([f"- {h}" for h in hints]) if hints else "- 无特定线索，请按标准流程排查。"
+        # 1. Parse Basic Info
+        alert_name = alert.labels.get('alertname', 'Unknown Alert')
+        severity = alert.labels.get('severity', 'info')
+        summary = alert.annotations.get('summary', 'No summary provided')
+        description = alert.annotations.get('description', '')
+        instance = alert.labels.get('instance', 'unknown-instance')
+        namespace = alert.labels.get('namespace', 'default') # Assumption
+        
+        logger.info(f"⚡ PROCESSING ALERT: [{severity.upper()}] {alert_name} - {summary}")
+        
+        # 2. Construct Investigation Prompt
+        # 2. Construct Intelligent Prompt (Goal-Based)
+        
+        # A. Dynamic Context Hints
+        hints = []
+        lower_summary = summary.lower()
+        if "cpu" in lower_summary:
+            hints.append("重点检查 CPU 使用率 (Metrics) 和 Top 消耗进程。")
+        elif "memory" in lower_summary or "oom" in lower_summary:
+            hints.append("怀疑是内存泄漏或 OOMKilled，请检查 Events 和 上一次重启的原因。")
+        elif "network" in lower_summary or "timeout" in lower_summary:
+            hints.append("怀疑是网络问题，请检查 Endpoints 和 Service 状态。")
+        
+        if severity == "critical":
+            hints.append("这是一个严重告警，请优先确认服务可用性。")
 
-            prompt = f"""
+        # B. Correlated Alerts (same node / workload / namespace within the window)
+        related = item.incident.members if item.incident else []
+        related_text = ""
+        if related:
+            lines = []
+            for m in related[:20]:
+                labels = m.alert.labels
+                target = labels.get('pod') or labels.get('instance') or labels.get('node') or '-'
+                lines.append(f"- [{labels.get('severity', 'info')}] {labels.get('alertname', 'Unknown Alert')} ({target})")
+            if len(related) > 20:
+                lines.append(f"- ... 以及另外 {len(related) - 20} 条")
+            related_text = f"\n**关联告警 (Correlated Alerts, {item.incident.key})**:\n" + "\n".join(lines) + "\n"
+            hints.append(f"共有 {len(related) + 1} 条告警被关联到同一事件 ({item.incident.key})，请优先寻找它们的共同根因。")
+        
+        hint_text = "\n".join([f"- {h}" for h in hints]) if hints else "- 无特定线索，请按标准流程排查。"
+
+        prompt = f"""
 🚨 **收到告警 (ALERT RECEIVED)**
 - **名称**: {alert_name}
 - **级别**: {severity}
 - **实例**: {instance}
 - **摘要**: {summary}
 - **描述**: {description}
-
+{related_text}
 ---
 **你的任务 (Mission)**:
 你是一名资深 SRE 专家。你的目标是**自主**查明 `{instance}` 发生 `{alert_name}` 的根本原因，并给出修复建议。
@@ -142,91 +676,86 @@ class AlertQueueService:
 
 现在，请开始行动。记住：**你是专家，请主动积累知识。**
 """
+        
+        # 3. Create Ephemeral Conversation ID
+        conversation_id = f"alert-{uuid.uuid4()}"
+        # Repeat firings of this fingerprint now attach to this conversation
+        self.coalescer.mark_running(fingerprint, conversation_id)
+        self._start_incident(item, conversation_id)
+        
+        # 4. Stream Handler for Background Execution (with Broadcast)
+        stream_handler = AlertStreamHandler(conversation_id)
+        
+        try:
+            # 4. Persist Alert to DB (New)
+            from app.db.session import AsyncSessionLocal
+            from app.db.models.alert import Alert
             
-            # 3. Create Ephemeral Conversation ID
-            conversation_id = f"alert-{uuid.uuid4()}"
-            
-            # 4. Mock WebSocket for Background Execution (with Broadcast)
-            from app.services.connection_manager import manager as connection_manager
-            
-            class MockWebSocket:
-                async def send_json(self, data):
-                    # Broadcast to real clients if any
-                    await connection_manager.broadcast_json(conversation_id, data)
-                    
-                    # Original Logging Logic
-                    msg_type = data.get("type")
-                    if msg_type == "tool_start":
-                        logger.info(f"🤖 Agent Tool: {data.get('tool')} ({data.get('args')})")
-                    elif msg_type == "tool_result":
-                        logger.info(f"🔧 Tool Output: {data.get('output')[:100]}...") # Truncate
-                    elif msg_type == "token":
-                        pass # Ignore tokens
-            
-            mock_ws = MockWebSocket()
+            async with AsyncSessionLocal() as db:
+                new_alert = Alert(
+                    id=conversation_id,
+                    fingerprint=fingerprint,
+                    title=alert_name,
+                    severity=severity,
+                    status="active",
+                    source=instance,
+                    summary=summary,
+                    conversation_id=conversation_id
+                )
+                db.add(new_alert)
+                await db.commit()
+                logger.info(f"💾 Alert persisted to DB: {conversation_id}")
+
+            # 5. Run Agent
+            logger.info(f"🚀 Triggering Agent Investigation for {conversation_id}")
             
+            # Announce the run so UI clients on other workers can follow it (not stoppable from the UI)
+            from app.services.stream_broker import stream_broker
+            stream_handler.run_id = await stream_broker.register_execution(conversation_id)
             try:
-                # 4. Persist Alert to DB (New)
-                from app.db.session import AsyncSessionLocal
-                from app.db.models.alert import Alert
-                
-                async with AsyncSessionLocal() as db:
-                    new_alert = Alert(
-                        id=conversation_id,
-                        fingerprint=None, # Simplify for MVP
-                        title=alert_name,
-                        severity=severity,
-                        status="active",
-                        source=instance,
-                        summary=summary,
-                        conversation_id=conversation_id
-                    )
-                    db.add(new_alert)
-                    await db.commit()
-                    logger.info(f"💾 Alert persisted to DB: {conversation_id}")
-
-                # 5. Run Agent
-                logger.info(f"🚀 Triggering Agent Investigation for {conversation_id}")
-                
                 result = await run_agent_graph(
-                    websocket=mock_ws,
+                    stream_handler=stream_handler,
                     conversation_id=conversation_id,
                     last_user_message=prompt,
                     session=None,
                     conversation_type="alert"
                 )
-                logger.info(f"✅ Investigation Complete for {conversation_id}")
+            finally:
+                await stream_handler.flush()
+                await stream_broker.unregister_execution(conversation_id, stream_handler.run_id)
+            logger.info(f"✅ Investigation Complete for {conversation_id}")
 
-                # 6. Automated Remediation (The Doctor)
-                from app.services.policy_engine import PolicyEngine
-                from app.services.action_executor import ActionExecutor
-                
-                policy_engine = PolicyEngine()
-                action_executor = ActionExecutor()
-                
-                logger.info("🩺 Running Policy Engine...")
-                remediation_plan = policy_engine.evaluate(payload)
-                
-                remediation_status = "Skipped (No Policy Match)"
-                if remediation_plan:
-                    logger.info(f"💊 Remediation Plan Found: {remediation_plan}")
-                    # Execute
-                    success = await action_executor.execute(remediation_plan)
-                    remediation_status = "✅ Executed Successfully" if success else "❌ Execution Failed / Blocked"
-                    
-                    if success:
-                         # Append to report
-                         result += f"\n\n**⚡ 自动修复已被触发**:\n- 动作: `{remediation_plan['action']}`\n- 目标: `{remediation_plan['target']}`\n- 结果: 成功"
-                else:
-                    logger.info("Policy Engine returned no action.")
-
-                # 7. Notify (DingTalk)
-                from app.services.notifier import notifier
+            # 6. Automated Remediation (The Doctor)
+            from app.services.policy_engine import PolicyEngine
+            from app.services.action_executor import ActionExecutor
+            
+            policy_engine = PolicyEngine()
+            action_executor = ActionExecutor()
+            
+            logger.info("🩺 Running Policy Engine...")
+            remediation_plan = policy_engine.evaluate(payload.model_copy(update={"alerts": [alert]}))
+            
+            remediation_status = "Skipped (No Policy Match)"
+            if remediation_plan:
+                logger.info(f"💊 Remediation Plan Found: {remediation_plan}")
+                # Execute
+                success = await action_executor.execute(remediation_plan)
+                remediation_status = "✅ Executed Successfully" if success else "❌ Execution Failed / Blocked"
                 
-                report = f"""## 🚨 故障告警: {alert_name}
+                if success:
+                     # Append to report
+                     result += f"\n\n**⚡ 自动修复已被触发**:\n- 动作: `{remediation_plan['action']}`\n- 目标: `{remediation_plan['target']}`\n- 结果: 成功"
+            else:
+                logger.info("Policy Engine returned no action.")
+
+            # 7. Notify (DingTalk)
+            from app.services.notifier import notifier
+            
+            report = f"""## 🚨 故障告警: {alert_name}
 **来源**: {instance}
 **级别**: {severity.upper()}
 **概要**: {summary}
+**关联告警**: {len(related)} 条
 
 ---
 ### 🤖 AI 侦探调查报告
@@ -239,10 +768,12 @@ class AlertQueueService:
 
 > [查看详情](http://localhost:5173/chat?id={conversation_id})
 """
-                await notifier.send_markdown(f"故障告警: {alert_name}", report)
-                
-            except Exception as e:
-                logger.error(f"❌ Agent Investigation Failed: {e}")
-                # Notify Failure
-                from app.services.notifier import notifier
-                await notifier.send_markdown(f"告警处理失败: {alert_name}", f"Agent execution failed: {str(e)}\n\n(ID: {conversation_id})")
+            await notifier.send_markdown(f"故障告警: {alert_name}", report)
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Agent Investigation Failed: {e}")
+            # Notify Failure
+            from app.services.notifier import notifier
+            await notifier.send_markdown(f"告警处理失败: {alert_name}", f"Agent execution failed: {str(e)}\n\n(ID: {conversation_id})")
+            return False
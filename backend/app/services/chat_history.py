@@ -1,9 +1,13 @@
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.models.chat import Conversation, Message
+from app.db.models.chat import Conversation, Message, ToolCall
+import json
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
 class ChatHistoryService:
     @staticmethod
     async def create_conversation(session: AsyncSession, title: str = None, id: str = None, type: str = "chat") -> Conversation:
@@ -40,18 +44,58 @@ class ChatHistoryService:
         return message
 
     @staticmethod
-    async def get_recent_messages(session: AsyncSession, conversation_id: str, limit: int = 50) -> list[Message]:
-        result = await session.execute(
-            select(Message)
-            .where(Message.conversation_id == conversation_id)
-            .order_by(Message.created_at.asc()) # Get absolute history order
-            # Note: For "Recent N", we might want desc limit then reverse? 
-            # But usually we send full context. Let's just return all for now or optimize later.
-            # If we want limit, we should do subquery or slice.
-            # .limit(limit) 
-        )
-        return result.scalars().all()
+    async def get_recent_messages(session: AsyncSession, conversation_id: str, limit: int | None = 50,
+                                  after_id: int | None = None, before_id: int | None = None) -> list[Message]:
+        """
+        The latest `limit` messages (all if None) in chronological order.
+        `after_id` skips messages already folded into the conversation summary;
+        `before_id` only returns messages older than it.
+        """
+        query = select(Message).where(Message.conversation_id == conversation_id)
+        if after_id is not None:
+            query = query.where(Message.id > after_id)
+        if before_id is not None:
+            query = query.where(Message.id < before_id)
+        if limit is None:
+            result = await session.execute(query.order_by(Message.id.asc()))
+            return result.scalars().all()
+        # Newest N, then back to absolute history order
+        result = await session.execute(query.order_by(Message.id.desc()).limit(limit))
+        return list(reversed(result.scalars().all()))
+
+    @staticmethod
+    async def get_conversation_state(session: AsyncSession, conversation_id: str) -> Conversation | None:
+        """Conversation row without its messages (summary / token budget)."""
+        result = await session.execute(select(Conversation).where(Conversation.id == conversation_id))
+        return result.scalars().first()
+
+    @staticmethod
+    async def save_summary(session: AsyncSession, conversation_id: str, summary: str, upto_id: int):
+        conv = await ChatHistoryService.get_conversation_state(session, conversation_id)
+        if not conv:
+            return
+        conv.summary = summary
+        conv.summary_upto_id = upto_id
+        await session.commit()
+
+    @staticmethod
+    async def set_token_budget(session: AsyncSession, conversation_id: str, token_budget: int | None) -> bool:
+        conv = await ChatHistoryService.get_conversation_state(session, conversation_id)
+        if not conv:
+            return False
+        conv.token_budget = token_budget
+        await session.commit()
+        return True
     
+    @staticmethod
+    async def get_tool_usage(session: AsyncSession, conversation_id: str | None = None) -> list[dict]:
+        """Tool call counts by tool name, across all conversations or for one."""
+        query = select(ToolCall.name, func.count(ToolCall.id), func.count(func.distinct(ToolCall.conversation_id)))
+        if conversation_id:
+            query = query.where(ToolCall.conversation_id == conversation_id)
+        result = await session.execute(query.group_by(ToolCall.name).order_by(func.count(ToolCall.id).desc()))
+        return [{"name": name, "calls": calls, "conversations": convs} for name, calls, convs in result.all()]
+
     @staticmethod
     async def delete_conversation(session: AsyncSession, conversation_id: str) -> bool:
         """Delete a conversation and its messages."""
@@ -73,3 +117,79 @@ class ChatHistoryService:
         
         # Create new if not exists or no ID provided
         return await ChatHistoryService.create_conversation(session, id=conversation_id, type=type)
+
+class MessageBuffer:
+    """
+    Write-behind buffer for the messages produced by one graph run.
+
+    Messages are queued in memory and written in a single transaction per flush instead of
+    add + commit + refresh per message. `durability` decides when run_agent_graph flushes:
+    - "message": after every message (strongest; one commit each, as before)
+    - "step":    once per graph step (agent / tools node) - default
+    - "end":     only when the run completes, fails or is cancelled (fewest commits)
+
+    Assistant messages are deduplicated by message id (or visible content), since the same
+    AIMessage is reported by both on_chat_model_end and the agent node's on_chain_end.
+    Only the second report is content-only, so a message carrying tool calls is always kept,
+    and an empty key (no id, no content) never deduplicates.
+    """
+    def __init__(self, session: AsyncSession, conversation_id: str, durability: str = "step"):
+        self.session = session
+        self.conversation_id = conversation_id
+        self.durability = durability
+        self._pending: list[Message] = []
+        self._seen_assistant: set[str] = set()
+        self.flushes = 0
+        self.written = 0
+
+    async def add(self, role: str, content: str, tool_call_id: str = None, dedupe_key: str = None,
+                  tool_calls: list = None, tool_name: str = None):
+        if role == "assistant":
+            key = dedupe_key or content
+            if key and key in self._seen_assistant and not tool_calls:
+                return
+            if key:
+                self._seen_assistant.add(key)
+        self._pending.append(Message(
+            conversation_id=self.conversation_id,
+            role=role,
+            content=content,
+            tool_call_id=tool_call_id,
+            tool_name=tool_name,
+            tool_calls=[
+                ToolCall(
+                    conversation_id=self.conversation_id,
+                    call_id=tc.get("id") or f"call_{position}",
+                    name=tc["name"],
+                    args=json.dumps(tc.get("args", {}), ensure_ascii=False),
+                    position=position
+                ) for position, tc in enumerate(tool_calls or [])
+            ]
+        ))
+        if self.durability == "message":
+            await self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def step_done(self):
+        """Called at the end of each graph step."""
+        if self.durability in ("message", "step"):
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            self.session.add_all(batch)
+            await self.session.commit()
+        except Exception as e:
+            await self.session.rollback()
+            # Keep the rows; they are retried with the next flush
+            self._pending = batch + self._pending
+            logger.error(f"Failed to persist {len(batch)} messages for {self.conversation_id}: {e}")
+            return
+        self.flushes += 1
+        self.written += len(batch)
@@ -0,0 +1,412 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]  # (namespace or "", name)
+
+class Unanswerable(Exception):
+    """The cache cannot answer this query (not synced, or a selector it does not evaluate); ask the apiserver."""
+
+def _parse_selector(selector: Optional[str]) -> List[Tuple[str, str, Optional[str]]]:
+    """Equality-based selector -> [(key, op, value)] with op in ==, !=, exists, !exists."""
+    requirements = []
+    if not selector:
+        return requirements
+    for part in selector.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if " in " in part or " notin " in part or "(" in part:
+            raise Unanswerable(f"set-based selector {part}")
+        if "!=" in part:
+            key, value = part.split("!=", 1)
+            requirements.append((key.strip(), "!=", value.strip()))
+        elif "==" in part:
+            key, value = part.split("==", 1)
+            requirements.append((key.strip(), "==", value.strip()))
+        elif "=" in part:
+            key, value = part.split("=", 1)
+            requirements.append((key.strip(), "==", value.strip()))
+        elif part.startswith("!"):
+            requirements.append((part[1:].strip(), "!exists", None))
+        else:
+            requirements.append((part, "exists", None))
+    return requirements
+
+def _matches(values: Dict[str, str], requirements: List[Tuple[str, str, Optional[str]]]) -> bool:
+    for key, op, value in requirements:
+        actual = values.get(key)
+        if op == "==" and actual != value:
+            return False
+        if op == "!=" and actual == value:
+            return False
+        if op == "exists" and key not in values:
+            return False
+        if op == "!exists" and key in values:
+            return False
+    return True
+
+class Informer:
+    """
+    List + watch of one resource kind, kept in memory with secondary indexes.
+
+    Runs on its own daemon thread (a watch is a long-lived blocking stream). The initial list,
+    paged with limit/continue, gives the resourceVersion to watch from; every event advances it
+    (bookmarks included), so a dropped watch resumes where it stopped. When the apiserver answers
+    410 Gone (the version has been compacted) the informer relists and swaps the whole store in one step.
+    Readers take a short lock and never touch the network. They get `Unanswerable` (and go to the
+    apiserver) when nothing was heard from the apiserver for CLUSTER_CACHE_MAX_STALENESS_SECONDS,
+    e.g. while the watch keeps failing; a watch that ends normally counts as contact.
+    """
+    WATCH_TIMEOUT_SECONDS = 60
+
+    def __init__(self, kind: str, list_all: Callable, namespaced: bool,
+                 field_getters: Dict[str, Callable[[Any], Optional[str]]], node_of: Optional[Callable[[Any], Optional[str]]] = None):
+        self.kind = kind
+        self._list_all = list_all
+        self.namespaced = namespaced
+        # Fields a field selector may reference, e.g. "spec.nodeName" -> pod.spec.node_name
+        self.field_getters = field_getters
+        self._node_of = node_of
+        self._lock = threading.Lock()
+        self._store: Dict[Key, Any] = {}
+        self._by_namespace: Dict[str, Set[Key]] = defaultdict(set)
+        self._by_node: Dict[str, Set[Key]] = defaultdict(set)
+        self._by_owner: Dict[Tuple[str, str, str], Set[Key]] = defaultdict(set)  # (namespace, kind, name)
+        self._by_label: Dict[Tuple[str, str], Set[Key]] = defaultdict(set)
+        self.resource_version: Optional[str] = None
+        self.synced = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self.relists = 0
+        self.events = 0
+        # Change journal: key -> generation of its last change, oldest first (see changes_since)
+        self.generation = 0
+        self._changes: "OrderedDict[Key, int]" = OrderedDict()
+        self._changes_floor = 0
+        self.last_event_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._last_contact = 0.0  # monotonic time of the last successful list / watch event / watch end
+
+    # --- Index maintenance (watch thread, under lock) ---
+
+    @staticmethod
+    def _key(obj: Any) -> Key:
+        return obj.metadata.namespace or "", obj.metadata.name
+
+    def _index_entries(self, key: Key, obj: Any):
+        yield self._by_namespace, key[0]
+        if self._node_of:
+            node = self._node_of(obj)
+            if node:
+                yield self._by_node, node
+        for ref in obj.metadata.owner_references or []:
+            if ref.controller:
+                yield self._by_owner, (key[0], ref.kind, ref.name)
+        for label in (obj.metadata.labels or {}).items():
+            yield self._by_label, label
+
+    def _add(self, obj: Any):
+        key = self._key(obj)
+        if key in self._store:
+            self._remove(key)
+        self._store[key] = obj
+        for index, value in self._index_entries(key, obj):
+            index[value].add(key)
+
+    def _remove(self, key: Key):
+        obj = self._store.pop(key, None)
+        if obj is None:
+            return
+        for index, value in self._index_entries(key, obj):
+            bucket = index.get(value)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del index[value]
+
+    def _touch(self, key: Key):
+        self.generation += 1
+        self._changes[key] = self.generation
+        self._changes.move_to_end(key)
+        # Keep the journal bounded (deleted keys linger in it); older readers fall back to a full pass
+        while len(self._changes) > 2 * len(self._store) + 1000:
+            _, generation = self._changes.popitem(last=False)
+            self._changes_floor = generation
+
+    # --- List / watch loop ---
+
+    def _relist(self):
+        # Paged so no single response holds the whole cluster; all pages share the first page's snapshot
+        items, token, resource_version = [], None, None
+        while True:
+            resp = self._list_all(limit=settings.CLUSTER_CACHE_PAGE_SIZE, _continue=token,
+                                  _request_timeout=settings.K8S_REQUEST_TIMEOUT_SECONDS)
+            items.extend(resp.items)
+            resource_version = resource_version or resp.metadata.resource_version
+            token = resp.metadata._continue
+            if not token:
+                break
+        with self._lock:
+            self._store.clear()
+            for index in (self._by_namespace, self._by_node, self._by_owner, self._by_label):
+                index.clear()
+            for obj in items:
+                self._add(obj)
+            self.resource_version = resource_version
+            # Deletions missed while not watching are unknown: readers must start over
+            self.generation += 1
+            self._changes.clear()
+            self._changes_floor = self.generation
+        self.relists += 1
+        self._last_contact = time.monotonic()
+        self.synced.set()
+        logger.info(f"Cluster cache: listed {len(items)} {self.kind} (resourceVersion {self.resource_version})")
+
+    def _watch(self):
+        from kubernetes import watch
+        stream = watch.Watch().stream(
+            self._list_all,
+            resource_version=self.resource_version,
+            timeout_seconds=self.WATCH_TIMEOUT_SECONDS,
+            allow_watch_bookmarks=True,
+            _request_timeout=(10, self.WATCH_TIMEOUT_SECONDS + 30),
+        )
+        for event in stream:
+            if self._stop:
+                return
+            obj = event["object"]
+            kind = event["type"]
+            with self._lock:
+                if kind in ("ADDED", "MODIFIED"):
+                    self._add(obj)
+                    self._touch(self._key(obj))
+                elif kind == "DELETED":
+                    self._remove(self._key(obj))
+                    self._touch(self._key(obj))
+                if obj.metadata and obj.metadata.resource_version:
+                    self.resource_version = obj.metadata.resource_version
+            self.events += 1
+            self.last_event_at = time.time()
+            self._last_contact = time.monotonic()
+        # Closed by the server after timeout_seconds: still in touch
+        self._last_contact = time.monotonic()
+
+    def _run(self):
+        from kubernetes.client.exceptions import ApiException
+        backoff = 1.0
+        needs_list = True
+        while not self._stop:
+            try:
+                if needs_list:
+                    self._relist()
+                    needs_list = False
+                self._watch()
+                backoff = 1.0
+                self.last_error = None
+            except ApiException as e:
+                self.last_error = f"HTTP {e.status}: {e.reason}"
+                if e.status == 410:
+                    # resourceVersion too old: start over from a fresh list
+                    logger.info(f"Cluster cache: {self.kind} watch expired, relisting")
+                    needs_list = True
+                    continue
+                logger.warning(f"Cluster cache: {self.kind} watch failed: {self.last_error}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                logger.warning(f"Cluster cache: {self.kind} watch failed: {self.last_error}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name=f"informer-{self.kind}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop = True
+
+    # --- Readers ---
+
+    def fresh(self) -> bool:
+        return self.synced.is_set() and time.monotonic() - self._last_contact <= settings.CLUSTER_CACHE_MAX_STALENESS_SECONDS
+
+    def _check(self):
+        if not self.synced.is_set():
+            raise Unanswerable(f"{self.kind} not synced")
+        if not self.fresh():
+            raise Unanswerable(f"{self.kind} stale ({self.last_error or 'no watch events'})")
+
+    def get(self, namespace: Optional[str], name: str) -> Optional[Any]:
+        self._check()
+        return self._store.get(((namespace or "") if self.namespaced else "", name))
+
+    def list(self, namespace: Optional[str] = None, label_selector: Optional[str] = None,
+             field_selector: Optional[str] = None, node: Optional[str] = None,
+             owner: Optional[Tuple[str, str]] = None) -> List[Any]:
+        """
+        Objects matching all the given filters, in (namespace, name) order.
+        `owner` is a (kind, name) controller reference within `namespace`.
+        Raises Unanswerable for selectors the cache does not evaluate.
+        """
+        self._check()
+        labels = _parse_selector(label_selector)
+        fields = _parse_selector(field_selector)
+        for field_name, op, _ in fields:
+            if field_name not in self.field_getters or op not in ("==", "!="):
+                raise Unanswerable(f"field selector {field_name}")
+        if node is not None and self._node_of is None:
+            raise Unanswerable(f"{self.kind} has no node index")
+
+        with self._lock:
+            # Start from the narrowest index bucket
+            candidates: Optional[Set[Key]] = None
+            buckets = []
+            if namespace:
+                buckets.append(self._by_namespace.get(namespace, set()))
+            if node is not None:
+                buckets.append(self._by_node.get(node, set()))
+            if owner is not None:
+                buckets.append(self._by_owner.get((namespace or "", owner[0], owner[1]), set()))
+            buckets += [self._by_label.get((k, v), set()) for k, op, v in labels if op == "=="]
+            for bucket in sorted(buckets, key=len):
+                candidates = set(bucket) if candidates is None else candidates & bucket
+                if not candidates:
+                    break
+            keys = sorted(self._store if candidates is None else candidates)
+            objects = [self._store[k] for k in keys]
+
+        result = []
+        for obj in objects:
+            if labels and not _matches(obj.metadata.labels or {}, labels):
+                continue
+            if fields and not _matches({f: self.field_getters[f](obj) for f, _, _ in fields}, fields):
+                continue
+            result.append(obj)
+        return result
+
+    def changes_since(self, generation: int) -> Optional[Tuple[List[Key], int]]:
+        """
+        Keys added, modified or deleted after `generation`, and the current generation.
+        None when the journal no longer reaches back that far (relist, trimming): re-read everything.
+        """
+        with self._lock:
+            if generation < self._changes_floor or not self.fresh():
+                return None
+            keys = []
+            for key in reversed(self._changes):
+                if self._changes[key] <= generation:
+                    break
+                keys.append(key)
+            keys.reverse()
+            return keys, self.generation
+
+    def stats(self) -> dict:
+        return {
+            "synced": self.synced.is_set(),
+            "fresh": self.fresh(),
+            "seconds_since_contact": round(time.monotonic() - self._last_contact, 1) if self._last_contact else None,
+            "objects": len(self._store),
+            "resource_version": self.resource_version,
+            "generation": self.generation,
+            "relists": self.relists,
+            "events": self.events,
+            "last_event_at": self.last_event_at,
+            "last_error": self.last_error,
+        }
+
+def _meta_fields(extra: Dict[str, Callable[[Any], Optional[str]]]) -> Dict[str, Callable[[Any], Optional[str]]]:
+    return {
+        "metadata.name": lambda o: o.metadata.name,
+        "metadata.namespace": lambda o: o.metadata.namespace,
+        **extra,
+    }
+
+class ClusterCache:
+    """
+    Watch-based in-memory view of pods, nodes, events and deployments (CLUSTER_CACHE_ENABLED).
+
+    Consumers (K8sClient helpers, the in-process kubectl engine, patrol) ask the cache first and
+    fall back to the apiserver when it raises `Unanswerable`, e.g. before the first list
+    completes, while stale, or for set-based selectors.
+
+    Each process that runs it holds a full copy of these objects and keeps 4 watches open, so by
+    default only the leader worker does (it runs alert investigations and patrol, the heavy
+    readers); the other workers answer from the apiserver. CLUSTER_CACHE_ALL_WORKERS=true
+    runs it in every worker.
+    """
+    def __init__(self):
+        self.informers: Dict[str, Informer] = {}
+
+    def _build(self, k8s):
+        v1, apps_v1 = k8s.v1, k8s.apps_v1
+        self.informers = {
+            "pods": Informer("pods", v1.list_pod_for_all_namespaces, True, _meta_fields({
+                "spec.nodeName": lambda p: p.spec.node_name,
+                "status.phase": lambda p: p.status.phase if p.status else None,
+            }), node_of=lambda p: p.spec.node_name if p.spec else None),
+            "nodes": Informer("nodes", v1.list_node, False, _meta_fields({
+                "spec.unschedulable": lambda n: str(bool(n.spec.unschedulable)).lower(),
+            })),
+            "events": Informer("events", v1.list_event_for_all_namespaces, True, _meta_fields({
+                "involvedObject.kind": lambda e: e.involved_object.kind,
+                "involvedObject.name": lambda e: e.involved_object.name,
+                "involvedObject.namespace": lambda e: e.involved_object.namespace,
+                "involvedObject.uid": lambda e: e.involved_object.uid,
+                "reason": lambda e: e.reason,
+                "type": lambda e: e.type,
+            })),
+            "deployments": Informer("deployments", apps_v1.list_deployment_for_all_namespaces, True, _meta_fields({})),
+        }
+
+    def start(self):
+        """Start the informers in this worker, or once it is elected leader (no-op when disabled or offline)."""
+        from app.services.k8s_client import k8s_client
+        if not settings.CLUSTER_CACHE_ENABLED or not k8s_client.connected:
+            return
+        if settings.CLUSTER_CACHE_ALL_WORKERS:
+            self._start_informers()
+            return
+        from app.services.leader_lease import leader_lease
+
+        async def on_elected():
+            self._start_informers()
+        leader_lease.on_elected(on_elected)
+        leader_lease.start()
+
+    def _start_informers(self):
+        from app.services.k8s_client import k8s_client
+        if not self.informers:
+            self._build(k8s_client)
+        for informer in self.informers.values():
+            informer.start()
+
+    def informer(self, kind: str) -> Informer:
+        informer = self.informers.get(kind)
+        if informer is None:
+            raise Unanswerable(f"{kind} not cached")
+        return informer
+
+    def get(self, kind: str, namespace: Optional[str], name: str) -> Optional[Any]:
+        return self.informer(kind).get(namespace, name)
+
+    def list(self, kind: str, **filters) -> List[Any]:
+        return self.informer(kind).list(**filters)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.CLUSTER_CACHE_ENABLED,
+            "informers": {kind: informer.stats() for kind, informer in self.informers.items()},
+        }
+
+# 全局单例
+cluster_cache = ClusterCache()
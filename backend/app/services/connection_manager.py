@@ -1,15 +1,29 @@
-
 import asyncio
-from typing import Dict, List
+from typing import Dict, List, Optional
 from fastapi import WebSocket
 import logging
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
+class _Outbox:
+    """Outbound queue of one socket, drained by its own sender task."""
+    def __init__(self, websocket: WebSocket, conversation_id: str, size: int):
+        self.websocket = websocket
+        self.conversation_id = conversation_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.task: Optional[asyncio.Task] = None
+
 class ConnectionManager:
     """
     Manages WebSocket connections for real-time chat.
     Allows broadcasting from background tasks (alerts) to connected frontend clients.
+
+    Broadcasting never waits for a client: frames are put on a bounded per-socket queue and
+    sent by that socket's sender task with WS_SEND_TIMEOUT_SECONDS per frame. A socket whose
+    queue overflows, whose send times out or fails is evicted and closed (1013, try again later);
+    the client reconnects with `last_seq`.
     """
     _instance = None
     
@@ -18,6 +32,9 @@ class ConnectionManager:
             cls._instance = super(ConnectionManager, cls).__new__(cls)
             # Map conversation_id -> List[WebSocket]
             cls._instance.active_connections: Dict[str, List[WebSocket]] = {}
+            cls._instance._outboxes: Dict[WebSocket, _Outbox] = {}
+            cls._instance.sent_total = 0
+            cls._instance.evicted_total = 0
         return cls._instance
 
     async def connect(self, websocket: WebSocket, conversation_id: str):
@@ -25,6 +42,9 @@ class ConnectionManager:
         if conversation_id not in self.active_connections:
             self.active_connections[conversation_id] = []
         self.active_connections[conversation_id].append(websocket)
+        outbox = _Outbox(websocket, conversation_id, settings.WS_OUTBOUND_QUEUE_SIZE)
+        outbox.task = asyncio.create_task(self._sender(outbox))
+        self._outboxes[websocket] = outbox
         logger.info(f"Client connected to stream: {conversation_id} (Total: {len(self.active_connections[conversation_id])})")
 
     def disconnect(self, websocket: WebSocket, conversation_id: str):
@@ -34,22 +54,64 @@ class ConnectionManager:
                 self.active_connections[conversation_id].remove(websocket)
             if not self.active_connections[conversation_id]:
                 del self.active_connections[conversation_id]
+        outbox = self._outboxes.pop(websocket, None)
+        if outbox and outbox.task and outbox.task is not asyncio.current_task():
+            outbox.task.cancel()
         logger.info(f"Client disconnected from stream: {conversation_id}")
 
-    async def broadcast_json(self, conversation_id: str, data: dict):
+    def _evict(self, outbox: _Outbox, reason: str):
+        if self._outboxes.get(outbox.websocket) is not outbox:
+            return  # Already gone
+        logger.warning(f"Evicting client from stream {outbox.conversation_id}: {reason}")
+        self.evicted_total += 1
+        self.disconnect(outbox.websocket, outbox.conversation_id)
+        asyncio.create_task(self._close(outbox.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), timeout=settings.WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass  # Already closed or unreachable
+
+    async def _sender(self, outbox: _Outbox):
+        while True:
+            data = await outbox.queue.get()
+            try:
+                await asyncio.wait_for(outbox.websocket.send_json(data), timeout=settings.WS_SEND_TIMEOUT_SECONDS)
+                self.sent_total += 1
+            except asyncio.TimeoutError:
+                self._evict(outbox, f"send timed out after {settings.WS_SEND_TIMEOUT_SECONDS}s")
+                return
+            except Exception as e:
+                self._evict(outbox, f"send failed: {e}")
+                return
+
+    async def broadcast_json(self, conversation_id: str, data: dict, run_id: str = None):
         """
         Send JSON data to all clients listening to this conversation data.
         Currently used by AlertQueue to stream Agent progress to the UI.
+        Also published to the stream broker for clients connected to other workers.
+        Only enqueues; delivery happens on the per-socket sender tasks.
         """
-        if conversation_id in self.active_connections:
-            # Clone list to avoid modification during iteration
-            for connection in self.active_connections[conversation_id][:]:
-                try:
-                    await connection.send_json(data)
-                except Exception as e:
-                    logger.warning(f"Failed to send to client: {e}")
-                    # Likely disconnected, cleanup?
-                    # disconnect() is usually called by the endpoint handling the socket.
-                    pass
+        from app.services.stream_broker import stream_broker
+        await stream_broker.publish(conversation_id, data, run_id)
+        # Clone list: eviction modifies it
+        for connection in self.active_connections.get(conversation_id, [])[:]:
+            outbox = self._outboxes.get(connection)
+            if outbox is None:
+                continue
+            try:
+                outbox.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self._evict(outbox, f"{outbox.queue.maxsize} frames pending")
+
+    def stats(self) -> dict:
+        return {
+            "conversations": len(self.active_connections),
+            "connections": len(self._outboxes),
+            "pending_frames": sum(o.queue.qsize() for o in self._outboxes.values()),
+            "sent_total": self.sent_total,
+            "evicted_total": self.evicted_total,
+        }
 
 manager = ConnectionManager()
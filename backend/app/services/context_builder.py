@@ -0,0 +1,231 @@
+import json
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models.chat import Message
+from app.services.chat_history import ChatHistoryService
+
+logger = logging.getLogger(__name__)
+
+_encoder = None
+_encoder_failed = False
+
+def count_tokens(text: str) -> int:
+    """tiktoken (cl100k_base) when available, otherwise ~4 characters per token."""
+    global _encoder, _encoder_failed
+    if not text:
+        return 0
+    if _encoder is None and not _encoder_failed:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # Offline clusters cannot download the BPE file; the estimate is good enough for budgeting
+            logger.warning(f"tiktoken unavailable, estimating tokens by length: {e}")
+            _encoder_failed = True
+    if _encoder is not None:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+def message_tokens(message: BaseMessage) -> int:
+    tokens = 4 + count_tokens(message.content if isinstance(message.content, str) else json.dumps(message.content))
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        tokens += count_tokens(json.dumps(tool_calls, ensure_ascii=False, default=str))
+    return tokens
+
+def to_langchain(msg: Message) -> Optional[BaseMessage]:
+    """Convert a persisted Message row into a LangChain message."""
+    if msg.role == "user":
+        return HumanMessage(content=msg.content or "")
+    if msg.role == "assistant":
+        tool_calls = [
+            {"name": tc.name, "args": json.loads(tc.args or "{}"), "id": tc.call_id}
+            for tc in msg.tool_calls
+        ]
+        return AIMessage(content=msg.content or "", tool_calls=tool_calls)
+    if msg.role == "tool":
+        return ToolMessage(tool_call_id=msg.tool_call_id or "unknown", content=msg.content or "", name=msg.tool_name or "unknown")
+    return None
+
+@dataclass
+class _Span:
+    """Messages that must stay together: a user turn, or an assistant tool-call plus its tool results."""
+    ids: List[int] = field(default_factory=list)
+    messages: List[BaseMessage] = field(default_factory=list)
+    tokens: int = 0
+
+    def add(self, msg_id: int, message: BaseMessage):
+        self.ids.append(msg_id)
+        self.messages.append(message)
+        self.tokens += message_tokens(message)
+
+def _group(rows: List[Message]) -> List[_Span]:
+    spans: List[_Span] = []
+    for row in rows:
+        message = to_langchain(row)
+        if message is None:
+            continue
+        if isinstance(message, ToolMessage):
+            # Tool results belong to the preceding tool call; without it the provider rejects them
+            if spans and spans[-1].messages and getattr(spans[-1].messages[0], "tool_calls", None):
+                spans[-1].add(row.id, message)
+            continue
+        span = _Span()
+        span.add(row.id, message)
+        spans.append(span)
+    return [span for span in map(_answered, spans) if span.messages]
+
+def _answered(span: _Span) -> _Span:
+    """
+    Keep only the tool calls that have a result (a cancelled run can leave calls without one,
+    which the provider rejects) and the results that belong to a kept call.
+    """
+    call = span.messages[0]
+    if not isinstance(call, AIMessage) or not call.tool_calls:
+        return span
+    results = [m.tool_call_id for m in span.messages[1:]]
+    if Counter(results) == Counter(tc["id"] for tc in call.tool_calls):
+        return span
+    answered = set(results)
+    calls = [tc for tc in call.tool_calls if tc["id"] in answered]
+    kept = {tc["id"] for tc in calls}
+    complete = _Span()
+    if calls or call.content:
+        complete.add(span.ids[0], AIMessage(content=call.content, tool_calls=calls))
+    for msg_id, message in zip(span.ids[1:], span.messages[1:]):
+        if message.tool_call_id in kept:
+            kept.discard(message.tool_call_id)
+            complete.add(msg_id, message)
+    return complete
+
+def _render(spans: List[_Span]) -> str:
+    lines = []
+    for span in spans:
+        for message in span.messages:
+            content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+            limit = 1500 if isinstance(message, ToolMessage) else 4000
+            if len(content) > limit:
+                content = content[:limit] + " ...(truncated)"
+            if getattr(message, "tool_calls", None):
+                calls = ", ".join(f"{tc['name']}({json.dumps(tc.get('args', {}), ensure_ascii=False)})" for tc in message.tool_calls)
+                content = f"{content}\n[tool calls] {calls}"
+            lines.append(f"{message.type.upper()}: {content}")
+    return "\n".join(lines)
+
+async def _summarize(previous: Optional[str], spans: List[_Span]) -> str:
+    """Fold `spans` into the rolling summary (LLM; falls back to an extractive summary)."""
+    transcript = _render(spans)
+    from app.core.llm_config import LLMConfigManager
+    config = LLMConfigManager.get_config()
+    if config.api_key:
+        try:
+            from app.agent.graph.nodes.agent import get_llm
+            llm = get_llm(config).bind(max_tokens=settings.AGENT_SUMMARY_MAX_TOKENS)
+            prompt = (
+                "You maintain the running summary of a Kubernetes troubleshooting conversation.\n"
+                "Merge the previous summary and the new messages into one concise summary. Keep: the user's goals, "
+                "resources involved (namespaces, pods, nodes), findings and evidence from tools, root causes, "
+                "actions taken and their results, and open questions. Drop raw tool output.\n\n"
+                f"## PREVIOUS SUMMARY\n{previous or '(none)'}\n\n## NEW MESSAGES\n{transcript}"
+            )
+            response = await llm.ainvoke([HumanMessage(content=prompt)])
+            if response.content:
+                return response.content
+        except Exception as e:
+            logger.warning(f"Conversation summarization failed, using extractive summary: {e}")
+
+    lines = [previous] if previous else []
+    for span in spans:
+        for message in span.messages:
+            if isinstance(message, ToolMessage):
+                continue
+            content = (message.content or "").strip().replace("\n", " ")
+            if content:
+                lines.append(f"- {message.type}: {content[:200]}")
+    summary = "\n".join(lines)
+    # Keep the fallback inside the summary budget (drop the oldest lines)
+    max_chars = settings.AGENT_SUMMARY_MAX_TOKENS * 4
+    return summary[-max_chars:]
+
+async def build_context(session: AsyncSession, conversation_id: str, system_message: SystemMessage, pending_tokens: int = 0) -> List[BaseMessage]:
+    """
+    Token-budgeted context for the next graph run:
+    [system prompt, rolling summary of older history, most recent turns].
+
+    Recent spans are kept newest-first until the conversation's budget is reached; a tool call is
+    never separated from its results. When the history does not fit, the context is trimmed down to
+    AGENT_CONTEXT_TARGET_RATIO of the budget and the dropped spans are folded into the persisted
+    summary, so summarization runs once per trim rather than on every turn.
+    Unsummarized history beyond AGENT_HISTORY_MAX_MESSAGES is folded into the summary as well, and
+    tool calls left without results (cancelled runs) are dropped.
+    `pending_tokens` reserves room for the message about to be appended (the new user prompt).
+    """
+    conv = await ChatHistoryService.get_conversation_state(session, conversation_id)
+    budget = (conv.token_budget if conv and conv.token_budget else None) or settings.AGENT_CONTEXT_TOKEN_BUDGET
+    summary = conv.summary if conv else None
+    summary_upto_id = conv.summary_upto_id if conv else None
+
+    limit = settings.AGENT_HISTORY_MAX_MESSAGES
+    rows = await ChatHistoryService.get_recent_messages(session, conversation_id, limit=limit, after_id=summary_upto_id)
+    if len(rows) == limit:
+        # More unsummarized history than we load at once: fold everything before the window into
+        # the summary now instead of silently losing it
+        older = await ChatHistoryService.get_recent_messages(
+            session, conversation_id, limit=None, after_id=summary_upto_id, before_id=rows[0].id
+        )
+        # Tool results at the start of the window belong to a call before it
+        while older and rows and rows[0].role == "tool":
+            older.append(rows.pop(0))
+        if older:
+            overflow = _group(older)
+            for start in range(0, len(overflow), limit):
+                summary = await _summarize(summary, overflow[start:start + limit])
+            summary_upto_id = older[-1].id
+            try:
+                await ChatHistoryService.save_summary(session, conversation_id, summary, summary_upto_id)
+            except Exception as e:
+                logger.error(f"Failed to persist conversation summary: {e}")
+            logger.info(f"Context for {conversation_id}: folded {len(older)} messages beyond the history window into summary")
+    spans = _group(rows)
+
+    def summary_message(text: Optional[str]) -> List[BaseMessage]:
+        if not text:
+            return []
+        return [SystemMessage(content=f"## EARLIER CONVERSATION (SUMMARY)\n{text}")]
+
+    fixed = message_tokens(system_message) + pending_tokens
+    history_tokens = sum(span.tokens for span in spans)
+    summary_tokens = sum(message_tokens(m) for m in summary_message(summary))
+    if fixed + summary_tokens + history_tokens <= budget:
+        return [system_message] + summary_message(summary) + [m for span in spans for m in span.messages]
+
+    # Over budget: keep the newest spans within the target, always at least the latest one
+    target = int(budget * settings.AGENT_CONTEXT_TARGET_RATIO) - fixed - settings.AGENT_SUMMARY_MAX_TOKENS
+    kept: List[_Span] = []
+    used = 0
+    for span in reversed(spans):
+        if kept and used + span.tokens > target:
+            break
+        kept.append(span)
+        used += span.tokens
+    kept.reverse()
+    dropped = spans[:len(spans) - len(kept)]
+
+    if dropped:
+        summary = await _summarize(summary, dropped)
+        summary_upto_id = dropped[-1].ids[-1]
+        try:
+            await ChatHistoryService.save_summary(session, conversation_id, summary, summary_upto_id)
+        except Exception as e:
+            logger.error(f"Failed to persist conversation summary: {e}")
+        logger.info(f"Context for {conversation_id}: folded {sum(len(s.ids) for s in dropped)} messages into summary, "
+                    f"kept {sum(len(s.ids) for s in kept)} ({used} tokens, budget {budget})")
+
+    return [system_message] + summary_message(summary) + [m for span in kept for m in span.messages]
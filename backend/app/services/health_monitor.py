@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """
+    Background probes for the agent's dependencies: Kubernetes API, Prometheus, Loki and the LLM endpoint.
+
+    Each component is probed on its own loop (HEALTH_CHECK_INTERVAL_SECONDS, doubled after every
+    consecutive failure up to HEALTH_CHECK_MAX_BACKOFF_SECONDS). Readers (prompt construction, the
+    status API) only read the cached snapshot, so a flapping cluster never stalls a turn.
+    A component is reported down only after HEALTH_FAILURE_THRESHOLD consecutive failures.
+    """
+    def __init__(self, interval: float, max_backoff: float, failure_threshold: int, timeout: float):
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.timeout = timeout
+        self._snapshot: Dict[str, dict] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._probes: Dict[str, Callable[[], Awaitable[Optional[str]]]] = {
+            "kubernetes": self._probe_kubernetes,
+            "prometheus": self._probe_prometheus,
+            "loki": self._probe_loki,
+            "llm": self._probe_llm,
+        }
+
+    # --- Probes: return None when healthy, else an error string ---
+
+    async def _probe_kubernetes(self) -> Optional[str]:
+        from app.services.k8s_client import k8s_client
+        status = await asyncio.wait_for(k8s_client.run(k8s_client.check_connection), timeout=self.timeout + 1)
+        return None if status["connected"] else status["error"]
+
+    async def _get(self, url: str, headers: dict = None) -> httpx.Response:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return await self._client.get(url, headers=headers)
+
+    async def _probe_prometheus(self) -> Optional[str]:
+        from app.core.monitoring_config import MonitoringConfigManager
+        url = MonitoringConfigManager.get_config().prometheus_url.rstrip("/")
+        resp = await self._get(f"{url}/-/ready")
+        return None if resp.status_code == 200 else f"HTTP {resp.status_code}"
+
+    async def _probe_loki(self) -> Optional[str]:
+        from app.core.monitoring_config import MonitoringConfigManager
+        url = MonitoringConfigManager.get_config().loki_url.rstrip("/")
+        resp = await self._get(f"{url}/ready")
+        return None if resp.status_code == 200 else f"HTTP {resp.status_code}"
+
+    async def _probe_llm(self) -> Optional[str]:
+        from app.core.llm_config import LLMConfigManager
+        config = LLMConfigManager.get_config()
+        if not config.api_key:
+            return "API key not configured"
+        base_url = (config.base_url or "https://api.openai.com/v1").rstrip("/")
+        resp = await self._get(f"{base_url}/models", headers={"Authorization": f"Bearer {config.api_key}"})
+        if resp.status_code in (401, 403):
+            return f"Authentication failed (HTTP {resp.status_code})"
+        # Some compatible gateways do not implement /models; any non-5xx answer means reachable
+        return None if resp.status_code < 500 else f"HTTP {resp.status_code}"
+
+    # --- Loop ---
+
+    async def check(self, component: str) -> dict:
+        """Probe one component now and update its snapshot entry."""
+        started = time.monotonic()
+        try:
+            error = await self._probes[component]()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        latency_ms = int((time.monotonic() - started) * 1000)
+
+        previous = self._snapshot.get(component, {})
+        failures = 0 if error is None else previous.get("consecutive_failures", 0) + 1
+        if error is None:
+            status = "up"
+        elif failures >= self.failure_threshold or previous.get("status", "unknown") != "up":
+            status = "down"
+        else:
+            # Single failure after being healthy: keep reporting up until it repeats
+            status = "up"
+
+        now = time.time()
+        entry = {
+            "status": status,
+            "connected": status == "up",
+            "error": error,
+            "latency_ms": latency_ms,
+            "checked_at": now,
+            "since": previous.get("since", now) if previous.get("status") == status else now,
+            "consecutive_failures": failures,
+        }
+        if previous.get("status") not in (None, status):
+            logger.warning(f"Health: {component} {previous.get('status')} -> {status}" + (f" ({error})" if error else ""))
+        self._snapshot[component] = entry
+        return entry
+
+    async def _loop(self, component: str):
+        while True:
+            entry = await self.check(component)
+            failures = entry["consecutive_failures"]
+            delay = min(self.interval * (2 ** failures), self.max_backoff) if failures else self.interval
+            await asyncio.sleep(delay)
+
+    def start(self):
+        """Start the probe loops (idempotent)."""
+        for component in self._probes:
+            task = self._tasks.get(component)
+            if task is None or task.done():
+                self._tasks[component] = asyncio.create_task(self._loop(component))
+
+    # --- Readers (never block) ---
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            component: self._snapshot.get(component, {"status": "unknown", "connected": None, "error": None})
+            for component in self._probes
+        }
+
+    def kubernetes(self) -> dict:
+        """Cached {"connected", "error"} in the shape of K8sClient.check_connection()."""
+        entry = self._snapshot.get("kubernetes")
+        if entry is None:
+            # Not probed yet: fall back to whether the client config loaded at all
+            from app.services.k8s_client import k8s_client
+            if k8s_client.connected:
+                return {"connected": True, "error": None}
+            return {"connected": False, "error": "Client not initialized (Config load failed)"}
+        return {"connected": entry["connected"], "error": entry["error"]}
+
+# 全局单例
+health_monitor = HealthMonitor(
+    settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    settings.HEALTH_CHECK_MAX_BACKOFF_SECONDS,
+    settings.HEALTH_FAILURE_THRESHOLD,
+    settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+)
@@ -1,4 +1,8 @@
+import asyncio
+import functools
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 from kubernetes import client, config
 from app.core.config import settings
 
@@ -8,17 +12,28 @@ class K8sClient:
     """
     Kubernetes API 客户端封装
     支持集群内 (In-Cluster) 和 集群外 (Kubeconfig) 模式
+
+    The kubernetes client is blocking. From async code, use `call()` / `run()`: they run on a
+    dedicated executor (K8S_CLIENT_THREADS) so a slow apiserver never freezes the event loop or
+    starves the default thread pool, and concurrent calls overlap over one shared urllib3 pool
+    sized to that executor.
     """
     def __init__(self):
         self.connected = False
         self._load_config()
+        self._kubectl = None
+        self._executor = ThreadPoolExecutor(max_workers=settings.K8S_CLIENT_THREADS, thread_name_prefix="k8s-api")
         
         if self.connected:
-            self.v1 = client.CoreV1Api()
-            self.apps_v1 = client.AppsV1Api()
+            self.api_client = self._build_api_client()
+            self.v1 = client.CoreV1Api(self.api_client)
+            self.apps_v1 = client.AppsV1Api(self.api_client)
+            self.batch_v1 = client.BatchV1Api(self.api_client)
         else:
+            self.api_client = None
             self.v1 = None
             self.apps_v1 = None
+            self.batch_v1 = None
 
     def _load_config(self):
         try:
@@ -33,6 +48,58 @@ class K8sClient:
             logger.warning(f"Cluster Connect Failed: {e}")
             self.connected = False
 
+    @property
+    def kubectl(self):
+        """In-process engine for kubectl read commands (see app.services.kubectl_engine)."""
+        if self._kubectl is None:
+            from app.services.kubectl_engine import KubectlEngine
+            self._kubectl = KubectlEngine(self)
+        return self._kubectl
+
+    def _build_api_client(self) -> client.ApiClient:
+        configuration = client.Configuration.get_default_copy()
+        # One keep-alive connection per executor thread (urllib3 defaults to cpu_count * 5)
+        configuration.connection_pool_maxsize = settings.K8S_CLIENT_THREADS
+        return client.ApiClient(configuration)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking function (e.g. a batch of API calls) on the K8s executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def call(self, api_method: Callable, *args, **kwargs) -> Any:
+        """
+        Await one kubernetes-client API method, e.g. `await k8s_client.call(k8s_client.v1.list_node)`.
+        Applies K8S_REQUEST_TIMEOUT_SECONDS unless `_request_timeout` is given.
+        """
+        kwargs.setdefault("_request_timeout", settings.K8S_REQUEST_TIMEOUT_SECONDS)
+        return await self.run(api_method, *args, **kwargs)
+
+    # Non-namespaced list method, namespaced list method, per kind
+    _LIST_METHODS = {
+        "pods": ("v1", "list_pod_for_all_namespaces", "list_namespaced_pod"),
+        "nodes": ("v1", "list_node", None),
+        "events": ("v1", "list_event_for_all_namespaces", "list_namespaced_event"),
+        "deployments": ("apps_v1", "list_deployment_for_all_namespaces", "list_namespaced_deployment"),
+    }
+
+    async def list_resources(self, kind: str, namespace: str = None, label_selector: str = None, field_selector: str = None) -> list:
+        """
+        List pods / nodes / events / deployments, from the watch cache when it can answer,
+        otherwise from the apiserver.
+        """
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        try:
+            return cluster_cache.list(kind, namespace=namespace, label_selector=label_selector, field_selector=field_selector)
+        except Unanswerable:
+            pass
+        api_name, list_all, list_namespaced = self._LIST_METHODS[kind]
+        api = getattr(self, api_name)
+        kwargs = {k: v for k, v in (("label_selector", label_selector), ("field_selector", field_selector)) if v}
+        if namespace and list_namespaced:
+            return (await self.call(getattr(api, list_namespaced), namespace, **kwargs)).items
+        return (await self.call(getattr(api, list_all), **kwargs)).items
+
     async def get_pod_logs(self, namespace: str, pod_name: str, tail_lines: int = 100) -> str:
         """
         获取 Pod 日志
@@ -41,7 +108,8 @@ class K8sClient:
             return "Error: K8s client not connected (Offline Mode)"
 
         try:
-            logs = self.v1.read_namespaced_pod_log(
+            logs = await self.call(
+                self.v1.read_namespaced_pod_log,
                 name=pod_name,
                 namespace=namespace,
                 tail_lines=tail_lines
@@ -59,10 +127,17 @@ class K8sClient:
             return {"error": "K8s client not connected (Offline Mode)"}
 
         try:
-            dep = self.apps_v1.read_namespaced_deployment(
-                name=deployment_name,
-                namespace=namespace
-            )
+            from app.services.cluster_cache import cluster_cache, Unanswerable
+            try:
+                dep = cluster_cache.get("deployments", namespace, deployment_name)
+            except Unanswerable:
+                dep = None
+            if dep is None:
+                dep = await self.call(
+                    self.apps_v1.read_namespaced_deployment,
+                    name=deployment_name,
+                    namespace=namespace
+                )
             return {
                 "replicas": dep.status.replicas,
                 "ready_replicas": dep.status.ready_replicas,
@@ -72,6 +147,7 @@ class K8sClient:
         except client.exceptions.ApiException as e:
             logger.error(f"获取 Deployment 失败 [{namespace}/{deployment_name}]: {e}")
             return {"error": str(e)}
+
     def execute_cli(self, command: str) -> str:
         """
         Executes a kubectl command securely via subprocess
@@ -85,6 +161,17 @@ class K8sClient:
         import os
         from app.core.config import settings
 
+        # Common read verbs are served in-process over the pooled API client
+        if settings.KUBECTL_IN_PROCESS and self.connected:
+            from app.services.kubectl_engine import Unsupported
+            try:
+                output = self.kubectl.execute(command.strip().strip('"').strip("'"))
+                return output or "Success (No Output)"
+            except Unsupported as e:
+                logger.debug(f"kubectl in-process: falling back to subprocess ({e})")
+            except Exception as e:
+                logger.warning(f"kubectl in-process failed, falling back to subprocess: {e}")
+
         if settings.KUBE_IN_CLUSTER is False and settings.KUBECONFIG:
             clean_cmd = command.strip().strip('"').strip("'")
             full_cmd = f"kubectl {clean_cmd} --kubeconfig {settings.KUBECONFIG}"
@@ -0,0 +1,808 @@
+import json
+import logging
+import shlex
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+from kubernetes import client
+from kubernetes.utils import parse_quantity
+
+logger = logging.getLogger(__name__)
+
+class Unsupported(Exception):
+    """The command is outside the in-process subset; the caller falls back to the kubectl binary."""
+
+# --- Formatting helpers (mirroring kubectl's printers) ---
+
+def human_duration(seconds: float) -> str:
+    """kubectl's duration.HumanDuration."""
+    seconds = int(seconds)
+    if seconds < -1:
+        return "<invalid>"
+    if seconds < 0:
+        return "0s"
+    if seconds < 120:
+        return f"{seconds}s"
+    minutes = seconds // 60
+    if minutes < 10:
+        return f"{minutes}m{seconds % 60}s" if seconds % 60 else f"{minutes}m"
+    if minutes < 180:
+        return f"{minutes}m"
+    hours = minutes // 60
+    if hours < 8:
+        return f"{hours}h{minutes % 60}m" if minutes % 60 else f"{hours}h"
+    if hours < 48:
+        return f"{hours}h"
+    if hours < 192:
+        return f"{hours // 24}d{hours % 24}h" if hours % 24 else f"{hours // 24}d"
+    days = hours // 24
+    if days < 365 * 2:
+        return f"{days}d"
+    if days < 365 * 8:
+        return f"{days // 365}y{days % 365}d" if days % 365 else f"{days // 365}y"
+    return f"{days // 365}y"
+
+def age(ts: Optional[datetime]) -> str:
+    if ts is None:
+        return "<unknown>"
+    return human_duration((datetime.now(timezone.utc) - ts).total_seconds())
+
+def table(headers: List[str], rows: List[List[str]], no_headers: bool = False) -> str:
+    """Columns padded like kubectl's tabwriter (3 spaces)."""
+    lines = rows if no_headers else [headers] + rows
+    if not lines:
+        return ""
+    widths = [max(len(str(line[i])) for line in lines) for i in range(len(headers))]
+    out = []
+    for line in lines:
+        cells = [str(cell).ljust(widths[i] + 3) if i < len(line) - 1 else str(cell) for i, cell in enumerate(line)]
+        out.append("".join(cells).rstrip())
+    return "\n".join(out)
+
+def labels_string(labels: Optional[Dict[str, str]]) -> str:
+    return ",".join(f"{k}={v}" for k, v in sorted((labels or {}).items())) or "<none>"
+
+def _cpu(value: Any) -> str:
+    return f"{int(parse_quantity(value) * 1000)}m"
+
+def _memory(value: Any) -> str:
+    return f"{int(parse_quantity(value) / (1024 * 1024))}Mi"
+
+# --- Row printers per resource ---
+
+def _pod_status(pod: client.V1Pod) -> Tuple[str, int, int, int, Optional[datetime]]:
+    """(status, ready, total, restarts, last restart) computed like kubectl's printPod."""
+    status = pod.status
+    spec = pod.spec
+    reason = status.reason or status.phase or "Unknown"
+    restarts = 0
+    ready = 0
+    last_restart = None
+    total = len(spec.containers or [])
+
+    def track_restart(cs):
+        nonlocal restarts, last_restart
+        restarts += cs.restart_count or 0
+        terminated = cs.last_state.terminated if cs.last_state else None
+        if terminated and terminated.finished_at and (last_restart is None or terminated.finished_at > last_restart):
+            last_restart = terminated.finished_at
+
+    initializing = False
+    init_total = len(spec.init_containers or [])
+    for i, cs in enumerate(status.init_container_statuses or []):
+        track_restart(cs)
+        terminated = cs.state.terminated if cs.state else None
+        waiting = cs.state.waiting if cs.state else None
+        if terminated and terminated.exit_code == 0:
+            continue
+        if terminated:
+            if terminated.reason:
+                reason = f"Init:{terminated.reason}"
+            elif terminated.signal:
+                reason = f"Init:Signal:{terminated.signal}"
+            else:
+                reason = f"Init:ExitCode:{terminated.exit_code}"
+        elif waiting and waiting.reason and waiting.reason != "PodInitializing":
+            reason = f"Init:{waiting.reason}"
+        else:
+            reason = f"Init:{i}/{init_total}"
+        initializing = True
+        break
+
+    if not initializing:
+        has_running = False
+        for cs in reversed(status.container_statuses or []):
+            track_restart(cs)
+            state = cs.state
+            if state and state.waiting and state.waiting.reason:
+                reason = state.waiting.reason
+            elif state and state.terminated and state.terminated.reason:
+                reason = state.terminated.reason
+            elif state and state.terminated:
+                reason = f"Signal:{state.terminated.signal}" if state.terminated.signal else f"ExitCode:{state.terminated.exit_code}"
+            elif cs.ready and state and state.running:
+                has_running = True
+                ready += 1
+        if reason == "Completed" and has_running:
+            pod_ready = any(c.type == "Ready" and c.status == "True" for c in (status.conditions or []))
+            reason = "Running" if pod_ready else "NotReady"
+
+    if pod.metadata.deletion_timestamp:
+        reason = "Unknown" if status.reason == "NodeLost" else "Terminating"
+    return reason, ready, total, restarts, last_restart
+
+def _pod_row(pod: client.V1Pod, wide: bool) -> List[str]:
+    reason, ready, total, restarts, last_restart = _pod_status(pod)
+    restarts_text = f"{restarts} ({age(last_restart)} ago)" if restarts and last_restart else str(restarts)
+    row = [pod.metadata.name, f"{ready}/{total}", reason, restarts_text, age(pod.metadata.creation_timestamp)]
+    if wide:
+        gates = pod.spec.readiness_gates or []
+        row += [pod.status.pod_ip or "<none>", pod.spec.node_name or "<none>",
+                pod.status.nominated_node_name or "<none>", str(len(gates)) if gates else "<none>"]
+    return row
+
+def _node_roles(node: client.V1Node) -> str:
+    roles = sorted(k.split("/", 1)[1] for k in (node.metadata.labels or {}) if k.startswith("node-role.kubernetes.io/"))
+    return ",".join(r for r in roles if r) or "<none>"
+
+def _node_row(node: client.V1Node, wide: bool) -> List[str]:
+    ready = next((c.status for c in (node.status.conditions or []) if c.type == "Ready"), "Unknown")
+    status = "Ready" if ready == "True" else "NotReady" if ready == "False" else "Unknown"
+    if node.spec.unschedulable:
+        status += ",SchedulingDisabled"
+    info = node.status.node_info
+    row = [node.metadata.name, status, _node_roles(node), age(node.metadata.creation_timestamp), info.kubelet_version if info else ""]
+    if wide:
+        addresses = {a.type: a.address for a in (node.status.addresses or [])}
+        row += [addresses.get("InternalIP", "<none>"), addresses.get("ExternalIP", "<none>"),
+                info.os_image if info else "", info.kernel_version if info else "", info.container_runtime_version if info else ""]
+    return row
+
+def _containers_images(template) -> List[str]:
+    containers = template.spec.containers or []
+    return [",".join(c.name for c in containers), ",".join(c.image for c in containers)]
+
+def _selector(selector) -> str:
+    if selector is None or not selector.match_labels:
+        return "<none>"
+    return ",".join(f"{k}={v}" for k, v in selector.match_labels.items())
+
+def _deployment_row(dep: client.V1Deployment, wide: bool) -> List[str]:
+    s = dep.status
+    row = [dep.metadata.name, f"{s.ready_replicas or 0}/{dep.spec.replicas or 0}", str(s.updated_replicas or 0),
+           str(s.available_replicas or 0), age(dep.metadata.creation_timestamp)]
+    if wide:
+        row += _containers_images(dep.spec.template) + [_selector(dep.spec.selector)]
+    return row
+
+def _replicaset_row(rs: client.V1ReplicaSet, wide: bool) -> List[str]:
+    s = rs.status
+    row = [rs.metadata.name, str(rs.spec.replicas or 0), str(s.replicas or 0), str(s.ready_replicas or 0), age(rs.metadata.creation_timestamp)]
+    if wide:
+        row += _containers_images(rs.spec.template) + [_selector(rs.spec.selector)]
+    return row
+
+def _statefulset_row(sts: client.V1StatefulSet, wide: bool) -> List[str]:
+    row = [sts.metadata.name, f"{sts.status.ready_replicas or 0}/{sts.spec.replicas or 0}", age(sts.metadata.creation_timestamp)]
+    if wide:
+        row += _containers_images(sts.spec.template)
+    return row
+
+def _daemonset_row(ds: client.V1DaemonSet, wide: bool) -> List[str]:
+    s = ds.status
+    node_selector = ",".join(f"{k}={v}" for k, v in (ds.spec.template.spec.node_selector or {}).items()) or "<none>"
+    row = [ds.metadata.name, str(s.desired_number_scheduled or 0), str(s.current_number_scheduled or 0), str(s.number_ready or 0),
+           str(s.updated_number_scheduled or 0), str(s.number_available or 0), node_selector, age(ds.metadata.creation_timestamp)]
+    if wide:
+        row += _containers_images(ds.spec.template) + [_selector(ds.spec.selector)]
+    return row
+
+def _job_row(job: client.V1Job, wide: bool) -> List[str]:
+    s = job.status
+    duration = ""
+    if s.start_time:
+        end = s.completion_time or datetime.now(timezone.utc)
+        duration = human_duration((end - s.start_time).total_seconds())
+    row = [job.metadata.name, f"{s.succeeded or 0}/{job.spec.completions or 1}", duration, age(job.metadata.creation_timestamp)]
+    if wide:
+        row += _containers_images(job.spec.template) + [_selector(job.spec.selector)]
+    return row
+
+def _service_ports(svc: client.V1Service) -> str:
+    ports = []
+    for p in svc.spec.ports or []:
+        text = f"{p.port}:{p.node_port}" if p.node_port else str(p.port)
+        ports.append(f"{text}/{p.protocol or 'TCP'}")
+    return ",".join(ports) or "<none>"
+
+def _service_row(svc: client.V1Service, wide: bool) -> List[str]:
+    # Copy: the service may be the watch cache's shared object
+    external = list(svc.spec.external_i_ps or [])
+    ingress = (svc.status.load_balancer.ingress or []) if svc.status and svc.status.load_balancer else []
+    external += [i.ip or i.hostname for i in ingress]
+    if not external:
+        external_text = "<pending>" if svc.spec.type == "LoadBalancer" else (svc.spec.external_name or "<none>")
+    else:
+        external_text = ",".join(external)
+    row = [svc.metadata.name, svc.spec.type, svc.spec.cluster_ip or "<none>", external_text, _service_ports(svc), age(svc.metadata.creation_timestamp)]
+    if wide:
+        row += [",".join(f"{k}={v}" for k, v in (svc.spec.selector or {}).items()) or "<none>"]
+    return row
+
+def _namespace_row(ns: client.V1Namespace, wide: bool) -> List[str]:
+    return [ns.metadata.name, ns.status.phase, age(ns.metadata.creation_timestamp)]
+
+def _configmap_row(cm: client.V1ConfigMap, wide: bool) -> List[str]:
+    return [cm.metadata.name, str(len(cm.data or {}) + len(cm.binary_data or {})), age(cm.metadata.creation_timestamp)]
+
+_ACCESS_MODES = {"ReadWriteOnce": "RWO", "ReadOnlyMany": "ROX", "ReadWriteMany": "RWX", "ReadWriteOncePod": "RWOP"}
+
+def _pvc_row(pvc: client.V1PersistentVolumeClaim, wide: bool) -> List[str]:
+    capacity = (pvc.status.capacity or {}).get("storage", "")
+    modes = ",".join(_ACCESS_MODES.get(m, m) for m in (pvc.status.access_modes or []))
+    row = [pvc.metadata.name, pvc.status.phase, pvc.spec.volume_name or "", capacity, modes,
+           pvc.spec.storage_class_name or "<unset>", age(pvc.metadata.creation_timestamp)]
+    if wide:
+        row += [pvc.spec.volume_mode or "<unset>"]
+    return row
+
+def _event_time(ev: client.CoreV1Event) -> Optional[datetime]:
+    return ev.last_timestamp or ev.event_time or ev.first_timestamp or ev.metadata.creation_timestamp
+
+def _event_row(ev: client.CoreV1Event, wide: bool) -> List[str]:
+    obj = ev.involved_object
+    row = [age(_event_time(ev)), ev.type or "", ev.reason or "", f"{(obj.kind or '').lower()}/{obj.name}", (ev.message or "").strip()]
+    if wide:
+        source = ev.source.component if ev.source else ""
+        row = row[:4] + [source or (ev.reporting_component or ""), row[4], (ev.metadata.name or ""), str(ev.count or 1)]
+    return row
+
+@dataclass
+class _Resource:
+    plural: str
+    kind: str
+    api_version: str
+    api: str  # attribute of K8sClient
+    namespaced: bool
+    columns: List[str]
+    wide_columns: List[str]
+    row: Callable[[Any, bool], List[str]]
+    aliases: Tuple[str, ...] = field(default_factory=tuple)
+
+    def method(self, action: str) -> str:
+        """CoreV1Api method name, e.g. list_namespaced_pod / list_pod_for_all_namespaces / read_node."""
+        singular = {
+            "pods": "pod", "nodes": "node", "namespaces": "namespace", "services": "service",
+            "deployments": "deployment", "replicasets": "replica_set", "statefulsets": "stateful_set",
+            "daemonsets": "daemon_set", "jobs": "job", "configmaps": "config_map", "events": "event",
+            "persistentvolumeclaims": "persistent_volume_claim",
+        }[self.plural]
+        if action == "list_all":
+            return f"list_{singular}_for_all_namespaces" if self.namespaced else f"list_{singular}"
+        if action == "list":
+            return f"list_namespaced_{singular}" if self.namespaced else f"list_{singular}"
+        return f"read_namespaced_{singular}" if self.namespaced else f"read_{singular}"
+
+_RESOURCES = [
+    _Resource("pods", "Pod", "v1", "v1", True, ["NAME", "READY", "STATUS", "RESTARTS", "AGE"],
+              ["IP", "NODE", "NOMINATED NODE", "READINESS GATES"], _pod_row, ("pod", "po")),
+    _Resource("nodes", "Node", "v1", "v1", False, ["NAME", "STATUS", "ROLES", "AGE", "VERSION"],
+              ["INTERNAL-IP", "EXTERNAL-IP", "OS-IMAGE", "KERNEL-VERSION", "CONTAINER-RUNTIME"], _node_row, ("node", "no")),
+    _Resource("namespaces", "Namespace", "v1", "v1", False, ["NAME", "STATUS", "AGE"], [], _namespace_row, ("namespace", "ns")),
+    _Resource("services", "Service", "v1", "v1", True, ["NAME", "TYPE", "CLUSTER-IP", "EXTERNAL-IP", "PORT(S)", "AGE"],
+              ["SELECTOR"], _service_row, ("service", "svc")),
+    _Resource("configmaps", "ConfigMap", "v1", "v1", True, ["NAME", "DATA", "AGE"], [], _configmap_row, ("configmap", "cm")),
+    _Resource("persistentvolumeclaims", "PersistentVolumeClaim", "v1", "v1", True,
+              ["NAME", "STATUS", "VOLUME", "CAPACITY", "ACCESS MODES", "STORAGECLASS", "AGE"], ["VOLUMEMODE"], _pvc_row,
+              ("persistentvolumeclaim", "pvc")),
+    _Resource("events", "Event", "v1", "v1", True, ["LAST SEEN", "TYPE", "REASON", "OBJECT", "MESSAGE"],
+              [], _event_row, ("event", "ev")),
+    _Resource("deployments", "Deployment", "apps/v1", "apps_v1", True, ["NAME", "READY", "UP-TO-DATE", "AVAILABLE", "AGE"],
+              ["CONTAINERS", "IMAGES", "SELECTOR"], _deployment_row, ("deployment", "deploy")),
+    _Resource("replicasets", "ReplicaSet", "apps/v1", "apps_v1", True, ["NAME", "DESIRED", "CURRENT", "READY", "AGE"],
+              ["CONTAINERS", "IMAGES", "SELECTOR"], _replicaset_row, ("replicaset", "rs")),
+    _Resource("statefulsets", "StatefulSet", "apps/v1", "apps_v1", True, ["NAME", "READY", "AGE"],
+              ["CONTAINERS", "IMAGES"], _statefulset_row, ("statefulset", "sts")),
+    _Resource("daemonsets", "DaemonSet", "apps/v1", "apps_v1", True,
+              ["NAME", "DESIRED", "CURRENT", "READY", "UP-TO-DATE", "AVAILABLE", "NODE SELECTOR", "AGE"],
+              ["CONTAINERS", "IMAGES", "SELECTOR"], _daemonset_row, ("daemonset", "ds")),
+    _Resource("jobs", "Job", "batch/v1", "batch_v1", True, ["NAME", "COMPLETIONS", "DURATION", "AGE"],
+              ["CONTAINERS", "IMAGES", "SELECTOR"], _job_row, ("job",)),
+]
+RESOURCES: Dict[str, _Resource] = {}
+for _r in _RESOURCES:
+    for _name in (_r.plural,) + _r.aliases:
+        RESOURCES[_name] = _r
+# Events have a different wide layout
+_EVENT_WIDE_COLUMNS = ["LAST SEEN", "TYPE", "REASON", "OBJECT", "SOURCE", "MESSAGE", "NAME", "COUNT"]
+
+# --- Argument parsing ---
+
+@dataclass
+class _Args:
+    verb: str
+    positional: List[str] = field(default_factory=list)
+    namespace: Optional[str] = None
+    all_namespaces: bool = False
+    selector: Optional[str] = None
+    field_selector: Optional[str] = None
+    output: Optional[str] = None
+    no_headers: bool = False
+    container: Optional[str] = None
+    tail: Optional[int] = None
+    previous: bool = False
+    since_seconds: Optional[int] = None
+
+_VALUE_FLAGS = {
+    "-n": "namespace", "--namespace": "namespace",
+    "-l": "selector", "--selector": "selector",
+    "--field-selector": "field_selector",
+    "-o": "output", "--output": "output",
+    "-c": "container", "--container": "container",
+    "--tail": "tail", "--since": "since_seconds",
+}
+_BOOL_FLAGS = {
+    "-A": "all_namespaces", "--all-namespaces": "all_namespaces",
+    "--no-headers": "no_headers",
+    "-p": "previous", "--previous": "previous",
+}
+
+def _duration_seconds(value: str) -> int:
+    units = {"s": 1, "m": 60, "h": 3600}
+    total, number = 0, ""
+    for ch in value:
+        if ch.isdigit():
+            number += ch
+        elif ch in units and number:
+            total += int(number) * units[ch]
+            number = ""
+        else:
+            raise Unsupported(f"duration {value}")
+    if number:
+        raise Unsupported(f"duration {value}")
+    return total
+
+def parse_args(command: str) -> _Args:
+    try:
+        tokens = shlex.split(command)
+    except ValueError as e:
+        raise Unsupported(str(e))
+    if tokens and tokens[0] == "kubectl":
+        tokens = tokens[1:]
+    if not tokens:
+        raise Unsupported("empty command")
+    args = _Args(verb=tokens[0])
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        name, value = token, None
+        if token.startswith("--") and "=" in token:
+            name, value = token.split("=", 1)
+        elif token.startswith("-") and not token.startswith("--") and len(token) > 2 and token[:2] in _VALUE_FLAGS:
+            # -nfoo / -o=json / -ojson
+            name, value = token[:2], token[2:].lstrip("=")
+        if name in _BOOL_FLAGS and value is None:
+            setattr(args, _BOOL_FLAGS[name], True)
+        elif name in _VALUE_FLAGS:
+            if value is None:
+                i += 1
+                if i >= len(tokens):
+                    raise Unsupported(f"missing value for {name}")
+                value = tokens[i]
+            attr = _VALUE_FLAGS[name]
+            if attr == "tail":
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise Unsupported(f"--tail {value}")
+            elif attr == "since_seconds":
+                value = _duration_seconds(value)
+            setattr(args, attr, value)
+        elif token.startswith("-"):
+            # -w, --sort-by, jsonpath, --kubeconfig, ...: let kubectl handle it
+            raise Unsupported(f"flag {token}")
+        else:
+            args.positional.append(token)
+        i += 1
+    if args.output not in (None, "json", "yaml", "wide", "name"):
+        raise Unsupported(f"-o {args.output}")
+    return args
+
+# --- Engine ---
+
+class KubectlEngine:
+    """
+    In-process implementation of the common kubectl read commands over the pooled API client:
+    `get`, `describe` (pods, nodes, deployments), `logs` and `top` (pods, nodes), with
+    -n/-A, -l, --field-selector and -o json|yaml|wide|name.
+
+    Pods, nodes, events and deployments are served from the watch cache (app.services.cluster_cache)
+    once it has synced.
+
+    `execute()` raises `Unsupported` for anything else; K8sClient.execute_cli then falls back
+    to the kubectl binary. Output follows kubectl's formatting, and API errors are returned in
+    the same "Error (1): Error from server (...)" shape as the subprocess path.
+    """
+    def __init__(self, k8s):
+        self.k8s = k8s
+        self._default_namespace: Optional[str] = None
+
+    @property
+    def default_namespace(self) -> str:
+        if self._default_namespace is None:
+            self._default_namespace = self._resolve_default_namespace()
+        return self._default_namespace
+
+    def _resolve_default_namespace(self) -> str:
+        from app.core.config import settings
+        from kubernetes import config
+        try:
+            if settings.KUBE_IN_CLUSTER:
+                with open("/var/run/secrets/kubernetes.io/serviceaccount/namespace") as f:
+                    return f.read().strip() or "default"
+            _, active = config.list_kube_config_contexts(config_file=settings.KUBECONFIG)
+            return (active or {}).get("context", {}).get("namespace") or "default"
+        except Exception:
+            return "default"
+
+    def execute(self, command: str) -> str:
+        args = parse_args(command)
+        handler = {"get": self._get, "describe": self._describe, "logs": self._logs, "top": self._top}.get(args.verb)
+        if handler is None:
+            raise Unsupported(f"verb {args.verb}")
+        try:
+            return handler(args)
+        except client.exceptions.ApiException as e:
+            return f"Error (1): {self._api_error(e)}"
+
+    @staticmethod
+    def _api_error(e: client.exceptions.ApiException) -> str:
+        try:
+            body = json.loads(e.body)
+            return f"Error from server ({body.get('reason') or e.reason}): {body.get('message')}"
+        except Exception:
+            return f"Error from server ({e.reason}): {e.status}"
+
+    def _resolve(self, args: _Args, allow_missing_name: bool = True) -> Tuple[_Resource, Optional[str]]:
+        positional = list(args.positional)
+        if not positional:
+            raise Unsupported("no resource type")
+        if "/" in positional[0]:
+            kind, name = positional[0].split("/", 1)
+            positional = [kind, name] + positional[1:]
+        if len(positional) > 2 or "," in positional[0]:
+            raise Unsupported("multiple resources")
+        resource = RESOURCES.get(positional[0].lower())
+        if resource is None:
+            raise Unsupported(f"resource {positional[0]}")
+        name = positional[1] if len(positional) > 1 else None
+        if name is None and not allow_missing_name:
+            raise Unsupported("describe without a name")
+        return resource, name
+
+    @staticmethod
+    def _timeout() -> Dict[str, Any]:
+        """Same bound as K8sClient.call (and the subprocess path's timeout) for every API call."""
+        from app.core.config import settings
+        return {"_request_timeout": settings.K8S_REQUEST_TIMEOUT_SECONDS}
+
+    def _namespace(self, args: _Args) -> str:
+        return args.namespace or self.default_namespace
+
+    def _fetch(self, resource: _Resource, name: Optional[str], args: _Args) -> Tuple[Any, List[Any]]:
+        """(single object or None, list of items); answered from the watch cache when possible."""
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        api = getattr(self.k8s, resource.api)
+        namespace = self._namespace(args) if resource.namespaced else None
+        if name:
+            try:
+                obj = cluster_cache.get(resource.plural, namespace, name)
+            except Unanswerable:
+                obj = None
+            if obj is None:
+                # Not cached (or just created): the apiserver also gives kubectl's NotFound error
+                if resource.namespaced:
+                    obj = getattr(api, resource.method("read"))(name, namespace, **self._timeout())
+                else:
+                    obj = getattr(api, resource.method("read"))(name, **self._timeout())
+            return obj, [obj]
+        if args.all_namespaces:
+            namespace = None
+        items = self._list(resource, namespace, args.selector, args.field_selector)
+        if resource.plural == "events":
+            items = sorted(items, key=lambda ev: _event_time(ev) or datetime.min.replace(tzinfo=timezone.utc))
+        return None, items
+
+    def _list(self, resource: _Resource, namespace: Optional[str], label_selector: Optional[str] = None,
+              field_selector: Optional[str] = None) -> List[Any]:
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        try:
+            return cluster_cache.list(resource.plural, namespace=namespace, label_selector=label_selector, field_selector=field_selector)
+        except Unanswerable:
+            pass
+        api = getattr(self.k8s, resource.api)
+        kwargs = self._timeout()
+        if label_selector:
+            kwargs["label_selector"] = label_selector
+        if field_selector:
+            kwargs["field_selector"] = field_selector
+        if namespace is None:
+            return getattr(api, resource.method("list_all"))(**kwargs).items
+        return getattr(api, resource.method("list"))(namespace, **kwargs).items
+
+    def _serialize(self, resource: _Resource, obj: Any) -> dict:
+        data = self.k8s.api_client.sanitize_for_serialization(obj)
+        data.setdefault("apiVersion", resource.api_version)
+        data.setdefault("kind", resource.kind)
+        # Keep kubectl's key order: apiVersion, kind, metadata, ...
+        return {"apiVersion": data.pop("apiVersion"), "kind": data.pop("kind"), **data}
+
+    def _get(self, args: _Args) -> str:
+        resource, name = self._resolve(args)
+        obj, items = self._fetch(resource, name, args)
+
+        if args.output in ("json", "yaml"):
+            if obj is not None:
+                data = self._serialize(resource, obj)
+            else:
+                data = {"apiVersion": "v1", "items": [self._serialize(resource, i) for i in items],
+                        "kind": "List", "metadata": {"resourceVersion": ""}}
+            if args.output == "json":
+                return json.dumps(data, indent=4, ensure_ascii=False)
+            return yaml.safe_dump(data, default_flow_style=False, allow_unicode=True, sort_keys=False).rstrip()
+
+        if args.output == "name":
+            group = resource.api_version.split("/")[0] if "/" in resource.api_version else ""
+            prefix = f"{resource.kind.lower()}.{group}" if group else resource.kind.lower()
+            return "\n".join(f"{prefix}/{i.metadata.name}" for i in items)
+
+        if not items:
+            if resource.namespaced and not args.all_namespaces:
+                return f"No resources found in {self._namespace(args)} namespace."
+            return "No resources found"
+
+        wide = args.output == "wide"
+        if resource.plural == "events" and wide:
+            headers = list(_EVENT_WIDE_COLUMNS)
+        else:
+            headers = resource.columns + (resource.wide_columns if wide else [])
+        rows = [resource.row(i, wide) for i in items]
+        if resource.namespaced and args.all_namespaces and not name:
+            headers = ["NAMESPACE"] + headers
+            rows = [[i.metadata.namespace] + row for i, row in zip(items, rows)]
+        return table(headers, rows, args.no_headers)
+
+    # --- describe ---
+
+    def _events_for(self, kind: str, name: str, namespace: Optional[str]) -> List[str]:
+        selector = f"involvedObject.name={name},involvedObject.kind={kind}"
+        events = self._list(RESOURCES["events"], namespace, field_selector=selector)
+        if not events:
+            return ["Events:                <none>"]
+        events.sort(key=lambda ev: _event_time(ev) or datetime.min.replace(tzinfo=timezone.utc))
+        rows = []
+        for ev in events:
+            when = age(_event_time(ev))
+            if (ev.count or 1) > 1 and ev.first_timestamp:
+                when = f"{when} (x{ev.count} over {age(ev.first_timestamp)})"
+            source = (ev.source.component if ev.source else None) or ev.reporting_component or ""
+            rows.append([ev.type or "", ev.reason or "", when, source, (ev.message or "").strip()])
+        separator = ["----", "------", "----", "----", "-------"]
+        lines = table(["Type", "Reason", "Age", "From", "Message"], [separator] + rows).split("\n")
+        return ["Events:"] + ["  " + l for l in lines]
+
+    @staticmethod
+    def _field(label: str, value: Any, indent: int = 0, width: int = 22) -> str:
+        return " " * indent + f"{label + ':':<{width - indent}}{value if value not in (None, '') else '<none>'}"
+
+    def _describe(self, args: _Args) -> str:
+        resource, name = self._resolve(args, allow_missing_name=False)
+        describer = {"pods": self._describe_pod, "nodes": self._describe_node, "deployments": self._describe_deployment}.get(resource.plural)
+        if describer is None:
+            raise Unsupported(f"describe {resource.plural}")
+        obj, _ = self._fetch(resource, name, args)
+        return describer(obj)
+
+    def _describe_pod(self, pod: client.V1Pod) -> str:
+        m, spec, status = pod.metadata, pod.spec, pod.status
+        reason, *_ = _pod_status(pod)
+        owner = next((f"{r.kind}/{r.name}" for r in (m.owner_references or []) if r.controller), None)
+        lines = [
+            self._field("Name", m.name),
+            self._field("Namespace", m.namespace),
+            self._field("Priority", spec.priority or 0),
+            self._field("Service Account", spec.service_account_name),
+            self._field("Node", f"{spec.node_name}/{status.host_ip}" if status.host_ip else spec.node_name),
+            self._field("Start Time", status.start_time.strftime("%a, %d %b %Y %H:%M:%S %z") if status.start_time else None),
+            self._field("Labels", labels_string(m.labels).replace(",", "\n" + " " * 22)),
+            self._field("Status", reason if m.deletion_timestamp else status.phase),
+            self._field("IP", status.pod_ip),
+            self._field("Controlled By", owner),
+        ]
+        statuses = {cs.name: cs for cs in (status.init_container_statuses or []) + (status.container_statuses or [])}
+        for title, containers in (("Init Containers", spec.init_containers or []), ("Containers", spec.containers or [])):
+            if not containers:
+                continue
+            lines.append(f"{title}:")
+            for c in containers:
+                cs = statuses.get(c.name)
+                lines.append(f"  {c.name}:")
+                lines.append(self._field("Image", c.image, 4))
+                if c.ports:
+                    lines.append(self._field("Port", ", ".join(f"{p.container_port}/{p.protocol or 'TCP'}" for p in c.ports), 4))
+                if cs:
+                    lines += self._describe_state("State", cs.state)
+                    if cs.last_state and (cs.last_state.terminated or cs.last_state.waiting or cs.last_state.running):
+                        lines += self._describe_state("Last State", cs.last_state)
+                    lines.append(self._field("Ready", cs.ready, 4))
+                    lines.append(self._field("Restart Count", cs.restart_count, 4))
+                resources = c.resources
+                for kind in ("limits", "requests"):
+                    values = getattr(resources, kind, None) if resources else None
+                    if values:
+                        lines.append(f"    {kind.capitalize()}:")
+                        lines += [self._field(k, v, 6) for k, v in values.items()]
+                if c.env:
+                    lines.append("    Environment:")
+                    for e in c.env:
+                        value = e.value if e.value is not None else "<set from a reference>"
+                        lines.append(f"      {e.name}:  {value}")
+        if status.conditions:
+            lines.append("Conditions:")
+            lines += ["  " + l for l in table(["Type", "Status"], [[c.type, c.status] for c in status.conditions]).split("\n")]
+        lines.append(self._field("Node-Selectors", ",".join(f"{k}={v}" for k, v in (spec.node_selector or {}).items())))
+        lines += self._events_for("Pod", m.name, m.namespace)
+        return "\n".join(lines)
+
+    def _describe_state(self, label: str, state: client.V1ContainerState) -> List[str]:
+        if state.running:
+            return [self._field(label, "Running", 4),
+                    self._field("Started", state.running.started_at, 6)]
+        if state.waiting:
+            return [self._field(label, "Waiting", 4), self._field("Reason", state.waiting.reason, 6)]
+        if state.terminated:
+            t = state.terminated
+            return [self._field(label, "Terminated", 4), self._field("Reason", t.reason, 6),
+                    self._field("Exit Code", t.exit_code, 6), self._field("Started", t.started_at, 6),
+                    self._field("Finished", t.finished_at, 6)]
+        return [self._field(label, "Unknown", 4)]
+
+    def _describe_node(self, node: client.V1Node) -> str:
+        m, status = node.metadata, node.status
+        info = status.node_info
+        lines = [
+            self._field("Name", m.name),
+            self._field("Roles", _node_roles(node)),
+            self._field("Labels", labels_string(m.labels).replace(",", "\n" + " " * 22)),
+            self._field("CreationTimestamp", m.creation_timestamp),
+            self._field("Taints", "\n".join(f"{t.key}={t.value or ''}:{t.effect}" for t in (node.spec.taints or [])).replace("\n", "\n" + " " * 22)),
+            self._field("Unschedulable", bool(node.spec.unschedulable)),
+            "Conditions:",
+        ]
+        rows = [[c.type, c.status, str(c.last_heartbeat_time or ""), c.reason or "", c.message or ""] for c in (status.conditions or [])]
+        lines += ["  " + l for l in table(["Type", "Status", "LastHeartbeatTime", "Reason", "Message"], rows).split("\n")]
+        lines.append("Addresses:")
+        lines += [self._field(a.type, a.address, 2) for a in (status.addresses or [])]
+        for title, values in (("Capacity", status.capacity), ("Allocatable", status.allocatable)):
+            lines.append(f"{title}:")
+            lines += [self._field(k, v, 2) for k, v in (values or {}).items()]
+        if info:
+            lines.append("System Info:")
+            lines += [self._field("Kernel Version", info.kernel_version, 2), self._field("OS Image", info.os_image, 2),
+                      self._field("Container Runtime Version", info.container_runtime_version, 2, 30),
+                      self._field("Kubelet Version", info.kubelet_version, 2)]
+        pods = self._list(RESOURCES["pods"], None, field_selector=f"spec.nodeName={m.name},status.phase!=Succeeded,status.phase!=Failed")
+        lines.append(f"Non-terminated Pods:          ({len(pods)} in total)")
+        rows = [[p.metadata.namespace, p.metadata.name, age(p.metadata.creation_timestamp)] for p in pods]
+        lines += ["  " + l for l in table(["Namespace", "Name", "Age"], rows).split("\n")]
+        lines += self._events_for("Node", m.name, None)
+        return "\n".join(lines)
+
+    def _describe_deployment(self, dep: client.V1Deployment) -> str:
+        m, spec, status = dep.metadata, dep.spec, dep.status
+        strategy = spec.strategy.type if spec.strategy else None
+        lines = [
+            self._field("Name", m.name),
+            self._field("Namespace", m.namespace),
+            self._field("CreationTimestamp", m.creation_timestamp),
+            self._field("Labels", labels_string(m.labels).replace(",", "\n" + " " * 22)),
+            self._field("Selector", _selector(spec.selector)),
+            self._field("Replicas", f"{spec.replicas or 0} desired | {status.updated_replicas or 0} updated | "
+                                    f"{status.replicas or 0} total | {status.available_replicas or 0} available | "
+                                    f"{status.unavailable_replicas or 0} unavailable"),
+            self._field("StrategyType", strategy),
+            "Pod Template:",
+            self._field("Labels", labels_string(spec.template.metadata.labels if spec.template.metadata else None), 2),
+            "  Containers:",
+        ]
+        for c in spec.template.spec.containers or []:
+            lines.append(f"   {c.name}:")
+            lines.append(self._field("Image", c.image, 4))
+        if status.conditions:
+            lines.append("Conditions:")
+            rows = [[c.type, c.status, c.reason or ""] for c in status.conditions]
+            lines += ["  " + l for l in table(["Type", "Status", "Reason"], rows).split("\n")]
+        lines += self._events_for("Deployment", m.name, m.namespace)
+        return "\n".join(lines)
+
+    # --- logs / top ---
+
+    def _logs(self, args: _Args) -> str:
+        if len(args.positional) != 1 or "/" in args.positional[0] and not args.positional[0].startswith(("pod/", "pods/", "po/")):
+            # deploy/x, job/x, ...: kubectl resolves a pod for us
+            raise Unsupported("logs target")
+        pod = args.positional[0].split("/", 1)[-1]
+        kwargs = self._timeout()
+        container = args.container or self._default_container(pod, args)
+        if container:
+            kwargs["container"] = container
+        if args.tail is not None and args.tail >= 0:
+            kwargs["tail_lines"] = args.tail
+        if args.previous:
+            kwargs["previous"] = True
+        if args.since_seconds:
+            kwargs["since_seconds"] = args.since_seconds
+        return self.k8s.v1.read_namespaced_pod_log(pod, self._namespace(args), **kwargs)
+
+    _DEFAULT_CONTAINER_ANNOTATION = "kubectl.kubernetes.io/default-container"
+
+    def _default_container(self, pod_name: str, args: _Args) -> Optional[str]:
+        """The container kubectl picks without -c: the default-container annotation, else the first one."""
+        pod, _ = self._fetch(RESOURCES["pods"], pod_name, args)
+        containers = [c.name for c in (pod.spec.containers or [])]
+        if len(containers) <= 1:
+            return None  # The apiserver picks the only container itself
+        annotated = (pod.metadata.annotations or {}).get(self._DEFAULT_CONTAINER_ANNOTATION)
+        return annotated if annotated in containers else containers[0]
+
+    def _top(self, args: _Args) -> str:
+        if not args.positional or args.output:
+            raise Unsupported("top target")
+        target = args.positional[0].lower()
+        name = args.positional[1] if len(args.positional) > 1 else None
+        metrics_api = client.CustomObjectsApi(self.k8s.api_client)
+        kwargs = {"label_selector": args.selector} if args.selector else {}
+        timeout = self._timeout()
+
+        if target in ("node", "nodes", "no"):
+            if name:
+                items = [metrics_api.get_cluster_custom_object("metrics.k8s.io", "v1beta1", "nodes", name, **timeout)]
+            else:
+                items = metrics_api.list_cluster_custom_object("metrics.k8s.io", "v1beta1", "nodes", **kwargs, **timeout)["items"]
+            allocatable = {n.metadata.name: n.status.allocatable or {} for n in self.k8s.v1.list_node(**kwargs, **timeout).items}
+            rows = []
+            for item in sorted(items, key=lambda i: i["metadata"]["name"]):
+                node = item["metadata"]["name"]
+                cpu, memory = parse_quantity(item["usage"]["cpu"]), parse_quantity(item["usage"]["memory"])
+                alloc = allocatable.get(node, {})
+                cpu_pct = f"{int(cpu * 100 / parse_quantity(alloc['cpu']))}%" if alloc.get("cpu") else "<unknown>"
+                mem_pct = f"{int(memory * 100 / parse_quantity(alloc['memory']))}%" if alloc.get("memory") else "<unknown>"
+                rows.append([node, _cpu(cpu), cpu_pct, _memory(memory), mem_pct])
+            return table(["NAME", "CPU(cores)", "CPU(%)", "MEMORY(bytes)", "MEMORY(%)"], rows, args.no_headers)
+
+        if target in ("pod", "pods", "po"):
+            namespace = self._namespace(args)
+            if name:
+                items = [metrics_api.get_namespaced_custom_object("metrics.k8s.io", "v1beta1", namespace, "pods", name, **timeout)]
+            elif args.all_namespaces:
+                items = metrics_api.list_cluster_custom_object("metrics.k8s.io", "v1beta1", "pods", **kwargs, **timeout)["items"]
+            else:
+                items = metrics_api.list_namespaced_custom_object("metrics.k8s.io", "v1beta1", namespace, "pods", **kwargs, **timeout)["items"]
+            if not items:
+                return f"No resources found in {namespace} namespace."
+            rows = []
+            for item in sorted(items, key=lambda i: (i["metadata"]["namespace"], i["metadata"]["name"])):
+                cpu = sum(parse_quantity(c["usage"]["cpu"]) for c in item.get("containers", []))
+                memory = sum(parse_quantity(c["usage"]["memory"]) for c in item.get("containers", []))
+                row = [item["metadata"]["name"], _cpu(cpu), _memory(memory)]
+                if args.all_namespaces and not name:
+                    row = [item["metadata"]["namespace"]] + row
+                rows.append(row)
+            headers = ["NAME", "CPU(cores)", "MEMORY(bytes)"]
+            if args.all_namespaces and not name:
+                headers = ["NAMESPACE"] + headers
+            return table(headers, rows, args.no_headers)
+
+        raise Unsupported(f"top {target}")
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class LeaderLease:
+    """
+    Elects a single leader among the gunicorn workers of one pod via an exclusive file lock.
+
+    The lock is held for the lifetime of the process and released by the OS when it exits,
+    so a crashed leader is replaced by the next worker that retries.
+    Background singletons (alert consumption, patrol scheduling) register with on_elected()
+    and only run in the leader; the other workers stay free for HTTP/WebSocket traffic.
+    """
+    def __init__(self, path: str, retry_interval: float):
+        self.path = path
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._fd: Optional[int] = None
+        self._callbacks: List[Callable[[], Awaitable]] = []
+        self._tasks: List[asyncio.Task] = []
+        self._campaign_task: Optional[asyncio.Task] = None
+
+    def try_acquire(self) -> bool:
+        """Non-blocking attempt to take the lock."""
+        if self.is_leader:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # Record the owner for debugging (`cat <lock file>`)
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        self.is_leader = True
+        return True
+
+    def on_elected(self, callback: Callable[[], Awaitable]):
+        """Run `callback()` as a background task once this process becomes leader."""
+        self._callbacks.append(callback)
+        if self.is_leader:
+            self._tasks.append(asyncio.create_task(callback()))
+
+    def start(self):
+        """Start campaigning (idempotent)."""
+        if self._campaign_task is None or self._campaign_task.done():
+            self._campaign_task = asyncio.create_task(self._campaign())
+
+    async def _campaign(self):
+        while not self.is_leader:
+            try:
+                if self.try_acquire():
+                    logger.info(f"👑 Worker {os.getpid()} elected leader ({self.path})")
+                    self._tasks = [asyncio.create_task(cb()) for cb in self._callbacks]
+                    return
+            except Exception as e:
+                logger.error(f"Leader election failed: {e}")
+            await asyncio.sleep(self.retry_interval)
+
+    def status(self) -> dict:
+        return {"pid": os.getpid(), "is_leader": self.is_leader, "lock_path": self.path}
+
+# 全局单例
+leader_lease = LeaderLease(settings.LEADER_LOCK_PATH, settings.LEADER_RETRY_INTERVAL_SECONDS)
@@ -21,7 +21,11 @@ class PluginManager:
             cls._instance.plugins = {}  # name -> module
             cls._instance.plugin_metadata = {} # name -> metadata dict
             cls._instance.tools_registry = {}  # tool_name -> handler
+            cls._instance.cached_handlers = {}  # tool_name -> handler wrapped by the result cache (read-only tools)
+            cls._instance.read_only_policies = {}  # tool_name -> "read_only" (bool or predicate over the arguments)
             cls._instance.tools_schema = []   # OpenAI Format Schemas
+            # Bumped whenever the tool set changes; consumers cache derived state (e.g. bound LLMs) by it
+            cls._instance.tools_schema_version = 0
             # Default paths
             cls._instance.base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../plugins"))
             cls._instance.builtins_path = os.path.join(cls._instance.base_path, "builtins")
@@ -47,6 +51,8 @@ class PluginManager:
         self.plugins = {}
         self.plugin_metadata = {}
         self.tools_registry = {}
+        self.cached_handlers = {}
+        self.read_only_policies = {}
         self.tools_schema = []
         
         # Load builtins
@@ -56,6 +62,7 @@ class PluginManager:
         if os.path.exists(self.user_path):
             await self._load_from_directory(self.user_path, is_builtin=False)
             
+        self.tools_schema_version += 1
         logger.info(f"PluginManager reloaded. Plugins: {len(self.plugins)}, Tools: {len(self.tools_schema)}")
 
     async def _load_from_directory(self, directory: str, is_builtin: bool = False):
@@ -164,6 +171,16 @@ class PluginManager:
             
             # 2. Register Handler
             self.tools_registry[name] = tool["handler"]
+            self.read_only_policies[name] = tool.get("read_only", False)
+
+            # 3. Idempotent tools are served through the result cache
+            # "read_only": True, or a predicate over the call arguments (e.g. kubectl read verbs)
+            # "invalidates": cached tools whose results a (write) call of this tool makes stale
+            if tool.get("read_only") or tool.get("invalidates"):
+                from app.services.tool_cache import tool_cache
+                self.cached_handlers[name] = tool_cache.wrap(
+                    name, tool["handler"], tool.get("read_only", False), tool.get("cache_ttl"), tool.get("invalidates", ())
+                )
 
     async def toggle_plugin(self, plugin_id: str, active: bool):
         """Enable or disable a plugin."""
@@ -258,7 +275,12 @@ class PluginManager:
         return self.tools_schema
 
     def get_tool_handler(self, name: str):
-        return self.tools_registry.get(name)
+        return self.cached_handlers.get(name) or self.tools_registry.get(name)
+
+    def is_read_only(self, name: str, arguments: Dict[str, Any]) -> bool:
+        """Whether this call of the tool only reads (see the tool's "read_only")."""
+        from app.services.tool_cache import ToolResultCache
+        return ToolResultCache._is_read_only(self.read_only_policies.get(name, False), arguments)
         
     def get_active_plugins(self) -> Dict[str, Dict]:
         """Return metadata for all active/enabled plugins."""
@@ -0,0 +1,400 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CancelCallback = Optional[Callable[[], None]]
+
+class StreamBroker(ABC):
+    """
+    Carries agent stream frames and stop requests between the gunicorn workers of one pod,
+    so a WebSocket can watch (and stop) a conversation whose investigation runs in another worker.
+
+    The owning worker publishes every frame and registers its run with a cancel callback.
+    Other workers subscribe to the conversation and forward stop commands with request_cancel().
+    Local listeners keep reading from the owner's BroadcastStreamHandler; subscriptions only
+    deliver frames published by other processes.
+    """
+    @abstractmethod
+    async def publish(self, conversation_id: str, frame: Dict[str, Any], run_id: Optional[str] = None):
+        pass
+
+    @abstractmethod
+    async def register_execution(self, conversation_id: str, cancel: CancelCallback = None) -> str:
+        """Announce a run owned by this process. Returns its run id."""
+        pass
+
+    @abstractmethod
+    async def unregister_execution(self, conversation_id: str, run_id: str):
+        pass
+
+    @abstractmethod
+    async def is_running_elsewhere(self, conversation_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def subscribe(self, conversation_id: str, last_seq: Optional[int] = None) -> asyncio.Queue:
+        """Frames of a run owned by another process (after `last_seq` if given, else from now on)."""
+        pass
+
+    @abstractmethod
+    def unsubscribe(self, queue: asyncio.Queue):
+        pass
+
+    @abstractmethod
+    async def request_cancel(self, conversation_id: str) -> bool:
+        """Ask the owning process to stop the conversation's run. Returns False if none is known."""
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+class InProcessBroker(StreamBroker):
+    """Single-process backend: runs are only visible (and cancellable) within this worker."""
+    def __init__(self):
+        self._runs: Dict[str, Tuple[str, CancelCallback]] = {}
+
+    async def publish(self, conversation_id: str, frame: Dict[str, Any], run_id: Optional[str] = None):
+        return
+
+    async def register_execution(self, conversation_id: str, cancel: CancelCallback = None) -> str:
+        run_id = f"{os.getpid()}-{time.monotonic_ns()}"
+        self._runs[conversation_id] = (run_id, cancel)
+        return run_id
+
+    async def unregister_execution(self, conversation_id: str, run_id: str):
+        if self._runs.get(conversation_id, (None,))[0] == run_id:
+            del self._runs[conversation_id]
+
+    async def is_running_elsewhere(self, conversation_id: str) -> bool:
+        return False
+
+    async def subscribe(self, conversation_id: str, last_seq: Optional[int] = None) -> asyncio.Queue:
+        return asyncio.Queue()
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        return
+
+    async def request_cancel(self, conversation_id: str) -> bool:
+        run = self._runs.get(conversation_id)
+        if run and run[1]:
+            run[1]()
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "runs": len(self._runs)}
+
+class _Subscription:
+    def __init__(self, conversation_id: str, cursor: int, queue: asyncio.Queue,
+                 run_id: Optional[str] = None, seq: Optional[int] = None):
+        self.conversation_id = conversation_id
+        self.cursor = cursor  # last stream_events.id delivered
+        self.queue = queue
+        # Run and seq of the last frame delivered, to notice frames that were never recorded
+        self.run_id = run_id
+        self.seq = seq
+
+class SqliteBroker(StreamBroker):
+    """
+    Cross-process backend on a local SQLite file (WAL) shared by the workers of one pod.
+
+    - publish(): frames are batched and written every few milliseconds (no fsync; stream data is ephemeral),
+      and only for conversations another process subscribes to (stream_subscriptions): a run nobody
+      follows from another worker costs no writes. A subscriber that joins late and misses frames
+      gets a "gap" frame (the client reloads the history).
+    - One poll loop per process (STREAM_BROKER_POLL_MS) reads new frames for its subscriptions,
+      only as many as each subscriber's queue has room for, so a slow client is naturally backpressured.
+      The same loop delivers stop requests for runs this process owns and refreshes their heartbeat.
+    - Runs whose owner stopped heartbeating (crashed worker) are treated as finished.
+    - Frames older than STREAM_BROKER_RETENTION_SECONDS are pruned.
+    """
+    HEARTBEAT_SECONDS = 2.0
+
+    def __init__(self, path: str, poll_ms: int, retention_seconds: int, queue_size: int):
+        self.path = path
+        self.poll_interval = poll_ms / 1000
+        self.retention_seconds = retention_seconds
+        self.queue_size = max(2, queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-broker")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[Tuple] = []
+        self._runs: Dict[str, Tuple[str, CancelCallback]] = {}
+        self._subscriptions: List[_Subscription] = []
+        # Conversations that subscribers in other processes follow (refreshed every poll)
+        self._watched: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._last_heartbeat = 0.0
+        self._last_prune = 0.0
+        self.published_total = 0
+        self.delivered_total = 0
+
+    @property
+    def pid(self) -> int:
+        # Resolved lazily: the module may be imported before gunicorn forks the workers
+        return os.getpid()
+
+    # --- Blocking helpers (broker thread only) ---
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stream_events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id TEXT NOT NULL, run_id TEXT,"
+            " seq INTEGER, owner INTEGER NOT NULL, frame TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_stream_events_conv ON stream_events (conversation_id, id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stream_runs ("
+            " conversation_id TEXT PRIMARY KEY, run_id TEXT NOT NULL, owner INTEGER NOT NULL,"
+            " cancellable INTEGER NOT NULL, heartbeat REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stream_cancels ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL, owner INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stream_subscriptions ("
+            " conversation_id TEXT NOT NULL, owner INTEGER NOT NULL, heartbeat REAL NOT NULL,"
+            " PRIMARY KEY (conversation_id, owner))"
+        )
+        self._conn = conn
+
+    def _write(self, rows: List[Tuple]):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT INTO stream_events (conversation_id, run_id, seq, owner, frame, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _execute(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        return self._conn.execute(sql, params).fetchall()
+
+    def _poll(self, requests: List[Tuple[str, int, int]], run_ids: List[str], watching: List[str], heartbeat: bool, prune: bool):
+        events = []
+        for conversation_id, cursor, limit in requests:
+            events.append(self._conn.execute(
+                "SELECT id, run_id, seq, frame FROM stream_events WHERE conversation_id = ? AND id > ? AND owner != ? ORDER BY id LIMIT ?",
+                (conversation_id, cursor, self.pid, limit)
+            ).fetchall())
+        watched = set()
+        if run_ids:
+            watched = {row[0] for row in self._conn.execute(
+                "SELECT DISTINCT conversation_id FROM stream_subscriptions WHERE owner != ? AND heartbeat > ?",
+                (self.pid, time.time() - 3 * self.HEARTBEAT_SECONDS)
+            )}
+        cancels = self._conn.execute(
+            "SELECT id, run_id FROM stream_cancels WHERE owner = ?", (self.pid,)
+        ).fetchall()
+        if cancels:
+            self._conn.executemany("DELETE FROM stream_cancels WHERE id = ?", [(c[0],) for c in cancels])
+        now = time.time()
+        if heartbeat and run_ids:
+            self._conn.executemany(
+                "UPDATE stream_runs SET heartbeat = ? WHERE run_id = ?", [(now, r) for r in run_ids]
+            )
+        if heartbeat and watching:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stream_subscriptions (conversation_id, owner, heartbeat) VALUES (?, ?, ?)",
+                [(c, self.pid, now) for c in watching]
+            )
+        if prune:
+            self._conn.execute("DELETE FROM stream_events WHERE created_at < ?", (now - self.retention_seconds,))
+            self._conn.execute("DELETE FROM stream_cancels WHERE created_at < ?", (now - 60,))
+            self._conn.execute("DELETE FROM stream_runs WHERE heartbeat < ?", (now - 10 * self.HEARTBEAT_SECONDS,))
+            self._conn.execute("DELETE FROM stream_subscriptions WHERE heartbeat < ?", (now - 10 * self.HEARTBEAT_SECONDS,))
+        return events, [c[1] for c in cancels], watched
+
+    # --- Async API ---
+
+    async def _run(self, fn, *args):
+        if self._conn is None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._open)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _ensure_loop(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def publish(self, conversation_id: str, frame: Dict[str, Any], run_id: Optional[str] = None):
+        if conversation_id not in self._watched:
+            # No other process follows this conversation
+            return
+        self._pending.append((
+            conversation_id, run_id, frame.get("seq"), self.pid,
+            json.dumps(frame, ensure_ascii=False, default=str), time.time()
+        ))
+        self._ensure_loop()
+
+    async def register_execution(self, conversation_id: str, cancel: CancelCallback = None) -> str:
+        run_id = f"{self.pid}-{time.monotonic_ns()}"
+        self._runs[run_id] = (conversation_id, cancel)
+        await self._run(
+            self._execute,
+            "INSERT OR REPLACE INTO stream_runs (conversation_id, run_id, owner, cancellable, heartbeat) VALUES (?, ?, ?, ?, ?)",
+            (conversation_id, run_id, self.pid, 1 if cancel else 0, time.time())
+        )
+        self._ensure_loop()
+        return run_id
+
+    async def unregister_execution(self, conversation_id: str, run_id: str):
+        self._runs.pop(run_id, None)
+        # Make sure the final frames (done / error) reach other workers
+        await self._flush()
+        await self._run(self._execute, "DELETE FROM stream_runs WHERE run_id = ?", (run_id,))
+
+    async def _current_run(self, conversation_id: str) -> Optional[Tuple[str, int, int]]:
+        rows = await self._run(
+            self._execute,
+            "SELECT run_id, owner, cancellable FROM stream_runs WHERE conversation_id = ? AND heartbeat > ?",
+            (conversation_id, time.time() - 3 * self.HEARTBEAT_SECONDS)
+        )
+        return rows[0] if rows else None
+
+    async def is_running_elsewhere(self, conversation_id: str) -> bool:
+        run = await self._current_run(conversation_id)
+        return bool(run) and run[1] != self.pid
+
+    async def subscribe(self, conversation_id: str, last_seq: Optional[int] = None) -> asyncio.Queue:
+        run = await self._current_run(conversation_id)
+        cursor = None
+        if run and last_seq is not None:
+            rows = await self._run(
+                self._execute,
+                "SELECT MIN(id) FROM stream_events WHERE run_id = ? AND seq > ?", (run[0], last_seq)
+            )
+            if rows and rows[0][0] is not None:
+                cursor = rows[0][0] - 1
+        if cursor is None:
+            rows = await self._run(
+                self._execute, "SELECT MAX(id) FROM stream_events WHERE conversation_id = ?", (conversation_id,)
+            )
+            cursor = rows[0][0] or 0
+        # Announce the subscription after taking the cursor, so frames the owner starts writing are not skipped
+        await self._run(
+            self._execute,
+            "INSERT OR REPLACE INTO stream_subscriptions (conversation_id, owner, heartbeat) VALUES (?, ?, ?)",
+            (conversation_id, self.pid, time.time())
+        )
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscriptions.append(_Subscription(
+            conversation_id, cursor, queue, run[0] if run and last_seq is not None else None, last_seq
+        ))
+        self._ensure_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscriptions = [s for s in self._subscriptions if s.queue is not queue]
+        # The subscription row expires without heartbeats; the owner stops writing shortly after
+
+    async def request_cancel(self, conversation_id: str) -> bool:
+        local = [cb for cid, cb in self._runs.values() if cid == conversation_id and cb]
+        if local:
+            for cb in local:
+                cb()
+            return True
+        run = await self._current_run(conversation_id)
+        if not run or not run[2]:
+            return False
+        await self._run(
+            self._execute,
+            "INSERT INTO stream_cancels (run_id, owner, created_at) VALUES (?, ?, ?)", (run[0], run[1], time.time())
+        )
+        logger.info(f"Stop for {conversation_id} forwarded to worker {run[1]}")
+        return True
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        try:
+            await self._run(self._write, rows)
+            self.published_total += len(rows)
+        except Exception as e:
+            logger.error(f"Stream broker write failed ({len(rows)} frames dropped): {e}")
+
+    async def _loop(self):
+        while True:
+            try:
+                await self._flush()
+                # Keep room for a "gap" frame in front of the batch
+                ready = [s for s in self._subscriptions if s.queue.maxsize - s.queue.qsize() >= 2]
+                requests = [(s.conversation_id, s.cursor, s.queue.maxsize - s.queue.qsize() - 1) for s in ready]
+                now = time.monotonic()
+                heartbeat = now - self._last_heartbeat >= self.HEARTBEAT_SECONDS
+                prune = now - self._last_prune >= 30
+                if requests or self._runs or heartbeat or prune:
+                    watching = sorted({s.conversation_id for s in self._subscriptions})
+                    events, cancels, self._watched = await self._run(
+                        self._poll, requests, list(self._runs), watching, heartbeat, prune
+                    )
+                    if heartbeat:
+                        self._last_heartbeat = now
+                    if prune:
+                        self._last_prune = now
+                    for sub, rows in zip(ready, events):
+                        for event_id, run_id, seq, frame in rows:
+                            if seq is not None and run_id == sub.run_id and sub.seq is not None and seq > sub.seq + 1:
+                                # Published before the owner saw our subscription: never recorded
+                                if sub.queue.maxsize - sub.queue.qsize() < 2:
+                                    break
+                                sub.queue.put_nowait({"type": "gap", "from_seq": sub.seq + 1, "to_seq": seq - 1})
+                            sub.queue.put_nowait(json.loads(frame))
+                            sub.cursor = event_id
+                            if seq is not None:
+                                sub.run_id, sub.seq = run_id, seq
+                            self.delivered_total += 1
+                    for run_id in cancels:
+                        _, cancel = self._runs.get(run_id, (None, None))
+                        if cancel:
+                            logger.info(f"Stop requested by another worker for run {run_id}")
+                            cancel()
+                if not self._subscriptions and not self._runs and not self._pending:
+                    # Idle: nothing to deliver or own; restarted by the next publish/subscribe/register
+                    self._task = None
+                    return
+            except Exception as e:
+                logger.error(f"Stream broker poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "runs": len(self._runs),
+            "subscriptions": len(self._subscriptions),
+            "watched": len(self._watched),
+            "pending": len(self._pending),
+            "published_total": self.published_total,
+            "delivered_total": self.delivered_total,
+        }
+
+def create_broker() -> StreamBroker:
+    if settings.STREAM_BROKER == "sqlite":
+        return SqliteBroker(
+            settings.STREAM_BROKER_PATH,
+            settings.STREAM_BROKER_POLL_MS,
+            settings.STREAM_BROKER_RETENTION_SECONDS,
+            settings.STREAM_LISTENER_QUEUE_SIZE,
+        )
+    return InProcessBroker()
+
+# 全局单例
+stream_broker = create_broker()
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# bool, or a predicate over the call arguments (e.g. kubectl: only read verbs)
+ReadOnlyPolicy = Union[bool, Callable[[Dict[str, Any]], bool]]
+
+class ToolResultCache:
+    """
+    Result cache for read-only agent tools, shared by all conversations in the process.
+
+    - Tools opt in via `"read_only": True` (or a predicate over the arguments) in their tool
+      definition, optionally with `"cache_ttl"` seconds.
+    - Entries expire after the TTL and the least recently used ones are evicted beyond `max_entries`.
+    - Identical calls that are in flight at the same time share one execution (single-flight).
+      The execution is not tied to any caller: a caller that is cancelled (e.g. its chat was
+      stopped) stops waiting, while the others still get the result and it is still cached.
+    - A call that is not read-only invalidates the cached results of that tool and of the tools
+      listed in its `"invalidates"` (e.g. save_insight -> search_knowledge), so the agent sees
+      fresh state right after e.g. `kubectl delete pod`. Reads in flight during a write are not cached.
+    """
+    def __init__(self, max_entries: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._generation: Dict[str, int] = {}  # per tool, bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # served by an identical in-flight call
+        self.bypassed = 0
+
+    @staticmethod
+    def _key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _is_read_only(policy: ReadOnlyPolicy, arguments: Dict[str, Any]) -> bool:
+        if callable(policy):
+            try:
+                return bool(policy(arguments))
+            except Exception:
+                return False
+        return bool(policy)
+
+    def invalidate(self, *tool_names: str):
+        for tool_name in tool_names:
+            self._generation[tool_name] = self._generation.get(tool_name, 0) + 1
+        for key in [k for k in self._entries if k[0] in tool_names]:
+            del self._entries[key]
+
+    def _store(self, key: Tuple[str, str], result: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def wrap(self, tool_name: str, handler: Callable, policy: ReadOnlyPolicy, ttl: Optional[float] = None,
+             invalidates: Iterable[str] = ()) -> Callable:
+        """Return an async handler that serves `handler` through the cache."""
+        from app.services.tool_executor import tool_executor
+        ttl = self.default_ttl if ttl is None else ttl
+        affected = (tool_name, *invalidates)
+
+        async def execute(key: Tuple[str, str], arguments: Dict[str, Any]):
+            generation = self._generation.get(tool_name, 0)
+            try:
+                result = await tool_executor.call(handler, arguments)
+            finally:
+                self._inflight.pop(key, None)
+            # Errors are not cached; a write since the call started makes the result suspect
+            if self._generation.get(tool_name, 0) == generation:
+                self._store(key, result, ttl)
+            return result
+
+        async def cached_handler(**arguments):
+            if not self._is_read_only(policy, arguments):
+                self.bypassed += 1
+                self.invalidate(*affected)
+                try:
+                    return await tool_executor.call(handler, arguments)
+                finally:
+                    # Also drop what was read while the write ran
+                    self.invalidate(*affected)
+
+            key = self._key(tool_name, arguments)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.shared += 1
+            else:
+                self.misses += 1
+                inflight = self._inflight[key] = asyncio.create_task(execute(key, arguments))
+                # Retrieve the outcome so a failure nobody is waiting for any more is not logged as unhandled
+                inflight.add_done_callback(lambda t: t.cancelled() or t.exception())
+            # Cancelling this caller must not cancel the shared execution
+            return await asyncio.shield(inflight)
+
+        cached_handler.__name__ = getattr(handler, "__name__", tool_name)
+        cached_handler.__doc__ = getattr(handler, "__doc__", None)
+        return cached_handler
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "bypassed": self.bypassed,
+            "hit_rate": round((self.hits + self.shared) / lookups, 3) if lookups else 0.0,
+        }
+
+# 全局单例
+tool_cache = ToolResultCache(settings.TOOL_CACHE_MAX_ENTRIES, settings.TOOL_CACHE_TTL_SECONDS)
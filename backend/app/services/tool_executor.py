@@ -0,0 +1,82 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    """Parse "run_kubectl=4,save_insight=1" into {"run_kubectl": 4, "save_insight": 1}."""
+    limits = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        name, _, value = part.partition("=")
+        try:
+            limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            logger.warning(f"Ignoring invalid tool concurrency limit: {part}")
+    return limits
+
+class ToolExecutor:
+    """
+    Runs plugin tool handlers without blocking the event loop.
+
+    - Sync handlers (kubectl, k8sgpt, knowledge base ...) run on a dedicated bounded thread pool
+      instead of the default executor, so a burst of tool calls cannot starve other users of it.
+    - Each tool has its own concurrency limit (TOOL_CONCURRENCY_LIMITS, else TOOL_DEFAULT_CONCURRENCY),
+      shared by every conversation in the process.
+    """
+    def __init__(self, max_threads: int, default_limit: int, limits: Dict[str, int]):
+        self.max_threads = max_threads
+        self.default_limit = default_limit
+        self.limits = limits
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="tool")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.running: Dict[str, int] = {}
+        self.calls_total = 0
+
+    def _semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(tool_name)
+        if sem is None:
+            sem = asyncio.Semaphore(self.limits.get(tool_name, self.default_limit))
+            self._semaphores[tool_name] = sem
+        return sem
+
+    async def run(self, tool_name: str, handler: Callable, arguments: Dict[str, Any]) -> Any:
+        async with self._semaphore(tool_name):
+            self.running[tool_name] = self.running.get(tool_name, 0) + 1
+            self.calls_total += 1
+            try:
+                return await self.call(handler, arguments)
+            finally:
+                self.running[tool_name] -= 1
+
+    async def call(self, handler: Callable, arguments: Dict[str, Any]) -> Any:
+        """Invoke a handler without blocking the loop (no per-tool limit; run() applies it)."""
+        if asyncio.iscoroutinefunction(handler):
+            return await handler(**arguments)
+        loop = asyncio.get_running_loop()
+        # Keep contextvars (e.g. request-scoped logging) visible inside the handler
+        call = functools.partial(contextvars.copy_context().run, handler, **arguments)
+        return await loop.run_in_executor(self._executor, call)
+
+    def stats(self) -> dict:
+        return {
+            "threads": self.max_threads,
+            "default_limit": self.default_limit,
+            "limits": self.limits,
+            "running": {k: v for k, v in self.running.items() if v},
+            "calls_total": self.calls_total,
+        }
+
+# 全局单例
+tool_executor = ToolExecutor(
+    settings.TOOL_EXECUTOR_THREADS,
+    settings.TOOL_DEFAULT_CONCURRENCY,
+    _parse_limits(settings.TOOL_CONCURRENCY_LIMITS),
+)
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# <deployment>-<replicaset hash>-<pod hash>, <statefulset>-<ordinal>
+_DEPLOYMENT_POD_RE = re.compile(r"^(?P<name>.+)-[a-z0-9]{6,10}-[a-z0-9]{5}$")
+_STATEFULSET_POD_RE = re.compile(r"^(?P<name>.+)-\d+$")
+_REPLICASET_RE = re.compile(r"^(?P<name>.+)-[a-z0-9]{6,10}$")
+
+Owner = Tuple[str, str]  # (kind, name)
+
+class TopologyIndex:
+    """
+    In-memory index of cluster topology used for alert correlation.
+
+    Lookups are plain dict reads (no API calls on the alert path):
+    - pod -> top-level owner (ReplicaSet resolved to its Deployment, Job to its CronJob)
+    - pod -> node
+    - nodes that are currently NotReady
+    Pods and nodes are read from the watch cache (cluster_cache) while it is fresh; only the
+    ReplicaSet/Job -> controller map is rebuilt every TOPOLOGY_REFRESH_SECONDS. Without the cache
+    the refresh also lists pods and nodes into the index itself.
+    """
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._parents: Dict[Tuple[str, str, str], Owner] = {}  # (namespace, kind, name) of a ReplicaSet / Job
+        self._pod_owner: Dict[Tuple[str, str], Owner] = {}
+        self._pod_node: Dict[Tuple[str, str], str] = {}
+        self._unhealthy_nodes: Set[str] = set()
+        self.refreshed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Lookups (event loop, O(1)) ---
+
+    @staticmethod
+    def _cached(kind: str, namespace: Optional[str], name: str) -> Tuple[bool, Optional[object]]:
+        """(answered by the watch cache, object or None)."""
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        try:
+            return True, cluster_cache.get(kind, namespace, name)
+        except Unanswerable:
+            return False, None
+
+    def _controller_of(self, namespace: str, ref) -> Owner:
+        parent = self._parents.get((namespace, ref.kind, ref.name))
+        if parent:
+            return parent
+        match = _REPLICASET_RE.match(ref.name) if ref.kind == "ReplicaSet" else None
+        if match:
+            # ReplicaSet created since the last refresh
+            return ("Deployment", match.group("name"))
+        return (ref.kind, ref.name)
+
+    def owner_of(self, namespace: str, pod: str) -> Optional[Owner]:
+        cached, obj = self._cached("pods", namespace, pod)
+        if cached:
+            ref = next((r for r in (obj.metadata.owner_references or []) if r.controller), None) if obj else None
+            owner = self._controller_of(namespace, ref) if ref else None
+        else:
+            owner = self._pod_owner.get((namespace, pod))
+        if owner:
+            return owner
+        # Not indexed yet (new pod / offline): infer from the generated pod name
+        match = _DEPLOYMENT_POD_RE.match(pod)
+        if match:
+            return ("Deployment", match.group("name"))
+        match = _STATEFULSET_POD_RE.match(pod)
+        if match:
+            return ("StatefulSet", match.group("name"))
+        return None
+
+    def node_of(self, namespace: str, pod: str) -> Optional[str]:
+        cached, obj = self._cached("pods", namespace, pod)
+        if cached:
+            return obj.spec.node_name if obj and obj.spec else None
+        return self._pod_node.get((namespace, pod))
+
+    @staticmethod
+    def _ready(node) -> bool:
+        return any(c.type == "Ready" and c.status == "True" for c in ((node.status.conditions if node.status else None) or []))
+
+    def is_node_unhealthy(self, node: str) -> bool:
+        cached, obj = self._cached("nodes", None, node)
+        if cached:
+            return obj is not None and not self._ready(obj)
+        return node in self._unhealthy_nodes
+
+    # --- Refresh (worker thread) ---
+
+    @staticmethod
+    def _cache_fresh() -> bool:
+        from app.services.cluster_cache import cluster_cache, Unanswerable
+        try:
+            return cluster_cache.informer("pods").fresh() and cluster_cache.informer("nodes").fresh()
+        except Unanswerable:
+            return False
+
+    def _build(self):
+        from app.services.k8s_client import k8s_client
+        if not k8s_client.connected:
+            return None
+        v1, apps_v1 = k8s_client.v1, k8s_client.apps_v1
+
+        # ReplicaSet / Job -> their own controller
+        parents: Dict[Tuple[str, str, str], Owner] = {}
+        for rs in apps_v1.list_replica_set_for_all_namespaces(timeout_seconds=30).items:
+            for ref in rs.metadata.owner_references or []:
+                if ref.controller:
+                    parents[(rs.metadata.namespace, "ReplicaSet", rs.metadata.name)] = (ref.kind, ref.name)
+        try:
+            for job in k8s_client.batch_v1.list_job_for_all_namespaces(timeout_seconds=30).items:
+                for ref in job.metadata.owner_references or []:
+                    if ref.controller:
+                        parents[(job.metadata.namespace, "Job", job.metadata.name)] = (ref.kind, ref.name)
+        except Exception as e:
+            # e.g. no RBAC for batch/jobs: Jobs stay their own owner
+            logger.warning(f"Topology: skipping Jobs: {e}")
+
+        if self._cache_fresh():
+            # Pods and nodes are answered by the watch cache
+            return parents, {}, {}, set()
+
+        pod_owner: Dict[Tuple[str, str], Owner] = {}
+        pod_node: Dict[Tuple[str, str], str] = {}
+        _continue = None
+        while True:
+            resp = v1.list_pod_for_all_namespaces(limit=500, _continue=_continue, timeout_seconds=30)
+            for pod in resp.items:
+                key = (pod.metadata.namespace, pod.metadata.name)
+                if pod.spec and pod.spec.node_name:
+                    pod_node[key] = pod.spec.node_name
+                for ref in pod.metadata.owner_references or []:
+                    if ref.controller:
+                        owner = (ref.kind, ref.name)
+                        pod_owner[key] = parents.get((key[0], ref.kind, ref.name), owner)
+            _continue = resp.metadata._continue
+            if not _continue:
+                break
+
+        unhealthy = {node.metadata.name for node in v1.list_node(timeout_seconds=30).items if not self._ready(node)}
+        return parents, pod_owner, pod_node, unhealthy
+
+    async def refresh(self):
+        from app.services.k8s_client import k8s_client
+        result = await k8s_client.run(self._build)
+        if result is None:
+            return
+        # Swap whole dicts so readers never see a half-built index
+        self._parents, self._pod_owner, self._pod_node, self._unhealthy_nodes = result
+        self.refreshed_at = time.time()
+        logger.info(f"Topology index refreshed: {len(self._parents)} ReplicaSets/Jobs, "
+                    f"{len(self._pod_owner)} pods, {len(self._unhealthy_nodes)} unhealthy nodes")
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Topology index refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    def stats(self) -> dict:
+        return {
+            "source": "cluster_cache" if self._cache_fresh() else "index",
+            "controllers": len(self._parents),
+            "pods": len(self._pod_owner),
+            "unhealthy_nodes": sorted(self._unhealthy_nodes),
+            "refreshed_at": self.refreshed_at,
+        }
+
+# 全局单例
+topology_index = TopologyIndex(settings.TOPOLOGY_REFRESH_SECONDS)
@@ -0,0 +1,69 @@
+"""
+Benchmark: run_kubectl via the kubectl subprocess vs. the in-process engine (app.services.kubectl_engine).
+
+Usage (needs cluster access, same KUBE_IN_CLUSTER / KUBECONFIG settings as the backend):
+    python benchmark_kubectl.py [iterations] [namespace]
+"""
+import statistics
+import sys
+import time
+
+from app.core.config import settings
+from app.services.k8s_client import k8s_client
+from app.services.kubectl_engine import Unsupported
+
+COMMANDS = [
+    "get pods -n {ns}",
+    "get pods -A -o wide",
+    "get nodes",
+    "get deployments -n {ns} -o json",
+    "get events -n {ns}",
+    "describe node {node}",
+    "top nodes",
+]
+
+def measure(fn, iterations: int):
+    samples = []
+    output = ""
+    for _ in range(iterations):
+        started = time.perf_counter()
+        output = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return statistics.median(samples), p95, output
+
+def run_subprocess(command: str) -> str:
+    settings.KUBECTL_IN_PROCESS = False
+    try:
+        return k8s_client.execute_cli(command)
+    finally:
+        settings.KUBECTL_IN_PROCESS = True
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    namespace = sys.argv[2] if len(sys.argv) > 2 else "kube-system"
+    if not k8s_client.connected:
+        print("Kubernetes is not reachable (check KUBE_IN_CLUSTER / KUBECONFIG).")
+        sys.exit(1)
+    nodes = k8s_client.v1.list_node(limit=1).items
+    node = nodes[0].metadata.name if nodes else "unknown"
+
+    print(f"{iterations} iterations per command\n")
+    print(f"{'command':<36}{'subprocess p50/p95 (ms)':>26}{'in-process p50/p95 (ms)':>26}{'speedup':>10}")
+    for template in COMMANDS:
+        command = template.format(ns=namespace, node=node)
+        try:
+            k8s_client.kubectl.execute(command)
+        except Unsupported as e:
+            print(f"{command:<36}  unsupported in-process: {e}")
+            continue
+        except Exception as e:
+            print(f"{command:<36}  skipped: {e}")
+            continue
+        sub_p50, sub_p95, _ = measure(lambda: run_subprocess(command), iterations)
+        in_p50, in_p95, _ = measure(lambda: k8s_client.kubectl.execute(command), iterations)
+        print(f"{command:<36}{f'{sub_p50:.1f} / {sub_p95:.1f}':>26}{f'{in_p50:.1f} / {in_p95:.1f}':>26}{sub_p50 / in_p50:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
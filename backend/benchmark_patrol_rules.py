@@ -0,0 +1,149 @@
+"""
+Benchmark: patrol rule evaluation over synthetic clusters (no cluster access needed).
+
+Headline: end to end cost of app.features.patrol.rules as patrol uses it, i.e. for every
+batch of PATROL_PAGE_SIZE pods flattening them into the columnar table, evaluating the
+built-in rules and collecting the per-pod findings ("engine total"), against
+- the pre-rule-engine patrol check (a per-container loop with 2 rules), and
+- the same per-container loop implementing all built-in rules.
+The breakdown columns show flattening alone, the built-in rules alone, and the rules
+repeated to ~50 checks (where the vectorized evaluation pays off).
+
+Usage:
+    python benchmark_patrol_rules.py [containers ...]    (default: 10000 50000 100000)
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace as NS
+
+from app.core.config import settings
+from app.features.patrol.rules import RULES, ContainerTable, Rule, RuleEngine
+
+CONTAINERS_PER_POD = 2
+WAITING = [None] * 40 + ["CrashLoopBackOff", "ImagePullBackOff", "ErrImagePull", "ContainerCreating"]
+
+def synthetic_cluster(containers: int, seed: int = 7):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    nodes = [
+        NS(metadata=NS(name=f"node-{i}"), status=NS(conditions=[
+            NS(type="Ready", status="True"),
+            NS(type="MemoryPressure", status="True" if rng.random() < 0.05 else "False"),
+            NS(type="DiskPressure", status="False"),
+        ]))
+        for i in range(max(1, containers // 200))
+    ]
+    pods = []
+    for p in range(containers // CONTAINERS_PER_POD):
+        started = now - timedelta(seconds=rng.randint(60, 30 * 86400))
+        statuses = []
+        for c in range(CONTAINERS_PER_POD):
+            waiting = rng.choice(WAITING)
+            oom = rng.random() < 0.01
+            statuses.append(NS(
+                name=f"c{c}",
+                ready=waiting is None,
+                restart_count=rng.choice([0] * 20 + [1, 3, 7, 40]),
+                state=NS(waiting=NS(reason=waiting) if waiting else None, terminated=None),
+                last_state=NS(terminated=NS(reason="OOMKilled", finished_at=now - timedelta(minutes=5))) if oom else NS(terminated=None),
+            ))
+        pods.append(NS(
+            metadata=NS(name=f"pod-{p}", namespace=f"ns-{p % 50}", creation_timestamp=started),
+            spec=NS(node_name=rng.choice(nodes).metadata.name),
+            status=NS(phase="Pending" if rng.random() < 0.01 else "Running", start_time=started, container_statuses=statuses),
+        ))
+    return pods, nodes
+
+def legacy_findings(pods):
+    """The original per-pod loop: CrashLoopBackOff and more than 5 restarts only."""
+    result = []
+    for pod in pods:
+        found = {}
+        for cs in pod.status.container_statuses or []:
+            if cs.state and cs.state.waiting and cs.state.waiting.reason == "CrashLoopBackOff":
+                found[cs.name] = "CrashLoopBackOff"
+            elif (cs.restart_count or 0) > 5:
+                found[cs.name] = "High Restarts"
+        result.append(found)
+    return result
+
+def loop_findings(pods, nodes, now=None):
+    """The built-in rules as a per-container loop (same results as RuleEngine.pod_findings)."""
+    now = time.time() if now is None else now
+    pressure = {
+        node.metadata.name for node in nodes
+        if any(c.type in ("MemoryPressure", "DiskPressure", "PIDPressure") and c.status == "True"
+               for c in (node.status.conditions or []))
+    }
+    result = []
+    for pod in pods:
+        found = {}
+        started = pod.status.start_time or pod.metadata.creation_timestamp
+        age = now - started.timestamp()
+        pending = pod.status.phase == "Pending"
+        on_pressure = pod.spec.node_name in pressure
+        for cs in pod.status.container_statuses or []:
+            waiting = cs.state.waiting.reason if cs.state and cs.state.waiting else None
+            terminated = cs.state.terminated.reason if cs.state and cs.state.terminated else None
+            last = cs.last_state.terminated if cs.last_state else None
+            restarts = cs.restart_count or 0
+            if terminated == "OOMKilled" or (last and last.reason == "OOMKilled" and now - last.finished_at.timestamp() < 3600):
+                found[cs.name] = "OOMKilled"
+            elif waiting in ("ImagePullBackOff", "ErrImagePull", "InvalidImageName", "ErrImageNeverPull"):
+                found[cs.name] = "Image Pull Error"
+            elif waiting == "CrashLoopBackOff":
+                found[cs.name] = "CrashLoopBackOff"
+            elif restarts >= 3 and restarts / max(age / 3600, 1.0) >= 3:
+                found[cs.name] = "Restart Rate"
+            elif restarts > 5:
+                found[cs.name] = "High Restarts"
+            elif pending and age > 600:
+                found[cs.name] = "Pending Too Long"
+            elif not cs.ready and on_pressure:
+                found[cs.name] = "Node Pressure"
+        result.append(found)
+    return result
+
+def engine_findings(engine, pods, nodes, now):
+    """What patrol pays: node conditions once, then flatten + evaluate + map back per batch."""
+    pressure = ContainerTable.node_pressure(nodes)
+    found = []
+    for start in range(0, len(pods), settings.PATROL_PAGE_SIZE):
+        table = ContainerTable.from_pods(pods[start:start + settings.PATROL_PAGE_SIZE], now=now, pressure=pressure)
+        found += engine.pod_findings(table)
+    return found
+
+def measure(fn, iterations: int = 5):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 50_000, 100_000]
+    engine = RuleEngine(RULES)
+    many = RuleEngine([Rule(f"{r.name} #{i}", r.when) for i in range(7) for r in RULES])
+
+    print(f"{'containers':>10} {'engine total':>13} {'legacy loop':>12} {f'loop, {len(RULES)} rules':>14} | "
+          f"{'flatten':>9} {f'{len(RULES)} rules':>9} {f'{len(many.rules)} rules':>9} {'flagged':>8}")
+    for size in sizes:
+        pods, nodes = synthetic_cluster(size)
+        now = time.time()
+        legacy_ms, _ = measure(lambda: legacy_findings(pods))
+        loop_ms, expected = measure(lambda: loop_findings(pods, nodes, now))
+        total_ms, found = measure(lambda: engine_findings(engine, pods, nodes, now))
+        flatten_ms, table = measure(lambda: ContainerTable.from_pods(pods, nodes, now))
+        rules_ms, _ = measure(lambda: engine.evaluate(table), 20)
+        many_ms, _ = measure(lambda: many.evaluate(table), 20)
+        assert found == expected, "rule engine and loop disagree"
+        flagged = sum(len(f) for f in found)
+        print(f"{len(table):>10} {total_ms:>11.1f}ms {legacy_ms:>10.1f}ms {loop_ms:>12.1f}ms | "
+              f"{flatten_ms:>7.1f}ms {rules_ms:>7.2f}ms {many_ms:>7.2f}ms {flagged:>8}")
+
+if __name__ == "__main__":
+    main()
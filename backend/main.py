@@ -60,10 +60,28 @@ async def startup_event():
     from app.services.plugin_manager import plugin_manager
     await plugin_manager.initialize()
 
+    # 2.5 启动依赖健康探测 (K8s / Prometheus / Loki / LLM)
+    from app.services.health_monitor import health_monitor
+    health_monitor.start()
+
+    # 2.6 启动集群状态 Watch 缓存 (Pod / Node / Event / Deployment)，默认只在 Leader Worker 中运行
+    from app.services.cluster_cache import cluster_cache
+    cluster_cache.start()
+
     # 3. 启动 AlertQueue Worker (Active Monitoring)
+    # Journal 模式下只有 Leader Worker 消费告警，其他 Worker 只负责 HTTP/WebSocket
+    from app.services.alert_queue import AlertQueueService
+    AlertQueueService().start()
+
+    # 4. 巡检 (只在 Leader Worker 中运行): 处理各 Worker 转交的手动巡检，开启时按间隔定时巡检
+    from app.features.patrol.scheduler import patrol_scheduler
+    patrol_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush pending alert journal acks (journal mode)
     from app.services.alert_queue import AlertQueueService
-    import asyncio
-    asyncio.create_task(AlertQueueService().process_queue())
+    await AlertQueueService().shutdown()
 
 # 注册 Active Monitoring Webhook
 from app.api.endpoints import webhooks, alerts, system, settings
@@ -35,7 +35,10 @@ class K8SGPTPlugin(BasePlugin):
                     },
                     "required": []
                 },
-                "handler": lambda **kwargs: run_k8sgpt(**kwargs)
+                "handler": lambda **kwargs: run_k8sgpt(**kwargs),
+                "read_only": True,
+                # Full scans are slow; results change on the order of minutes
+                "cache_ttl": 120
             }
         ]
 
@@ -31,7 +31,8 @@ class KnowledgePlugin(BasePlugin):
                     },
                     "required": ["query"]
                 },
-                "handler": search_knowledge
+                "handler": search_knowledge,
+                "read_only": True
             },
             {
                 "name": "read_knowledge",
@@ -46,7 +47,8 @@ class KnowledgePlugin(BasePlugin):
                     },
                     "required": ["filename"]
                 },
-                "handler": read_knowledge
+                "handler": read_knowledge,
+                "read_only": True
             },
             {
                 "name": "save_insight",
@@ -78,7 +80,9 @@ class KnowledgePlugin(BasePlugin):
                     },
                     "required": ["topic", "content", "tags"]
                 },
-                "handler": save_insight
+                "handler": save_insight,
+                # New insights must show up in cached searches right away
+                "invalidates": ["search_knowledge", "read_knowledge"]
             }
         ]
 
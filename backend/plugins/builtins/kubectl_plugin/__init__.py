@@ -1,4 +1,4 @@
-from .tools import run_kubectl, verify_connection
+from .tools import run_kubectl, verify_connection, is_read_only
 
 def get_manifest():
     return {
@@ -24,7 +24,8 @@ def get_tools():
                 },
                 "required": ["args"]
             },
-            "handler": run_kubectl
+            "handler": run_kubectl,
+            "read_only": is_read_only
         },
         {
             "name": "verify_connection",
@@ -29,6 +29,21 @@ def run_kubectl(args: str, auto_analyze: bool = False) -> str:
     
     return truncated_output + analysis_text
 
+READ_ONLY_VERBS = {"get", "describe", "logs", "top", "explain", "events", "api-resources", "api-versions", "version", "cluster-info"}
+STREAMING_FLAGS = {"-w", "--watch", "--watch-only", "-f", "--follow"}
+
+def is_read_only(arguments: dict) -> bool:
+    """
+    Cache policy for run_kubectl: only plain read verbs are cacheable.
+    Mutating verbs (delete, scale, apply, ...) and streaming reads bypass the result cache.
+    """
+    tokens = str(arguments.get("args", "")).split()
+    if tokens and tokens[0] == "kubectl":
+        tokens = tokens[1:]
+    if not tokens or tokens[0] not in READ_ONLY_VERBS:
+        return False
+    return not any(t in STREAMING_FLAGS for t in tokens)
+
 def verify_connection() -> str:
     """
     Check if the Agent is currently connected to the Kubernetes Cluster.
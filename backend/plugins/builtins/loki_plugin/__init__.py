@@ -36,7 +36,8 @@ class LokiPlugin(BasePlugin):
                     },
                     "required": ["query"]
                 },
-                "handler": run_loki_query
+                "handler": run_loki_query,
+                "read_only": True
             }
         ]
 
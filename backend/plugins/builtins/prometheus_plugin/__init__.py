@@ -27,7 +27,8 @@ class PrometheusPlugin(BasePlugin):
                     },
                     "required": ["query"]
                 },
-                "handler": run_prometheus_query
+                "handler": run_prometheus_query,
+                "read_only": True
             }
         ]
 
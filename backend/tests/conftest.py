@@ -0,0 +1,23 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import app.db.models  # noqa: F401  (registers every table on Base.metadata)
+from app.db.base import Base
+
+@pytest.fixture
+def run_db(tmp_path):
+    """run_db(scenario): await `scenario(session)` against a fresh SQLite database and return its result."""
+    def run(scenario):
+        async def main():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            try:
+                async with AsyncSession(engine, expire_on_commit=False) as session:
+                    return await scenario(session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
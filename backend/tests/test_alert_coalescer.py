@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import alert_coalescer
+from app.services.alert_coalescer import AlertCoalescer, compute_fingerprint
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(alert_coalescer, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+def test_fingerprint_ignores_label_order():
+    assert compute_fingerprint({"a": "1", "b": "2"}) == compute_fingerprint({"b": "2", "a": "1"})
+    assert compute_fingerprint({"a": "1"}) != compute_fingerprint({"a": "2"})
+
+def test_repeats_are_coalesced_while_queued_or_running(clock):
+    coalescer = AlertCoalescer(window_seconds=60)
+    assert coalescer.admit("fp") is None
+
+    clock.value += 3600  # Still queued: never expires
+    entry = coalescer.admit("fp")
+    assert entry.state == "queued" and entry.repeat_count == 1
+
+    coalescer.mark_running("fp", "conv-1")
+    clock.value += 3600
+    assert coalescer.admit("fp").conversation_id == "conv-1"
+    assert coalescer.stats()["suppressed_total"] == 2
+
+def test_window_counts_from_end_of_investigation(clock):
+    coalescer = AlertCoalescer(window_seconds=60)
+    coalescer.admit("fp")
+    coalescer.mark_running("fp", "conv-1")
+    clock.value += 600
+    coalescer.mark_done("fp")
+
+    clock.value += 59
+    assert coalescer.admit("fp") is not None  # Repeats slide the window
+    clock.value += 61
+    assert coalescer.admit("fp") is None
+    assert coalescer.stats() == {"tracked": 1, "suppressed_total": 1, "queued": 1, "running": 0, "done": 0}
+
+def test_forget_readmits(clock):
+    coalescer = AlertCoalescer(window_seconds=60)
+    coalescer.admit("fp")
+    coalescer.forget("fp")
+    assert coalescer.admit("fp") is None
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from app.services.alert_correlator import AlertCorrelator
+
+class FakeTopology:
+    """pod -> (node, owner); nodes in `unhealthy` are NotReady."""
+    def __init__(self, pods, unhealthy=()):
+        self.pods = pods
+        self.unhealthy = set(unhealthy)
+
+    def node_of(self, namespace, pod):
+        return self.pods.get((namespace, pod), (None, None))[0]
+
+    def owner_of(self, namespace, pod):
+        return self.pods.get((namespace, pod), (None, None))[1]
+
+    def is_node_unhealthy(self, node):
+        return node in self.unhealthy
+
+def alert(**labels):
+    return SimpleNamespace(alert=SimpleNamespace(labels=labels), incident=None)
+
+PODS = {
+    ("shop", "web-1"): ("node-a", ("Deployment", "web")),
+    ("shop", "web-2"): ("node-b", ("Deployment", "web")),
+    ("shop", "db-0"): ("node-c", ("StatefulSet", "db")),
+    ("shop", "job-x"): ("node-d", None),
+}
+
+def test_candidate_keys():
+    correlator = AlertCorrelator(FakeTopology(PODS, unhealthy={"node-a"}), 300)
+
+    assert correlator.candidate_keys({"node": "node-a", "alertname": "NodeDown"}) == (["node/node-a"], None)
+    assert correlator.candidate_keys({"namespace": "shop", "pod": "web-1"}) == (
+        ["node/node-a", "owner/shop/Deployment/web"], "node/node-a")
+    assert correlator.candidate_keys({"namespace": "shop", "instance": "db-0", "alertname": "X"}) == (
+        ["owner/shop/StatefulSet/db"], "node/node-c")
+    # An ip:port instance is not a pod name
+    assert correlator.candidate_keys({"namespace": "shop", "instance": "10.0.0.1:9100", "alertname": "X"}) == (
+        ["namespace/shop/X"], None)
+    assert correlator.candidate_keys({"namespace": "shop", "pod": "job-x", "alertname": "JobFailed"}) == (
+        ["namespace/shop/JobFailed"], "node/node-d")
+
+def test_pods_of_one_workload_share_an_incident():
+    correlator = AlertCorrelator(FakeTopology(PODS), 300)
+    first, second = alert(namespace="shop", pod="web-1"), alert(namespace="shop", pod="web-2")
+
+    incident, is_new = correlator.correlate(first)
+    assert is_new and incident.lead is first
+    assert correlator.correlate(second) == (incident, False)
+    assert incident.members == [second] and second.incident is incident
+    assert correlator.correlate(alert(namespace="shop", pod="db-0"))[0] is not incident
+
+def test_node_incident_absorbs_pod_alerts_on_that_node():
+    correlator = AlertCorrelator(FakeTopology(PODS), 300)
+    node_incident, _ = correlator.correlate(alert(node="node-c", alertname="DiskPressure"))
+
+    incident, is_new = correlator.correlate(alert(namespace="shop", pod="db-0"))
+
+    assert (incident, is_new) == (node_incident, False)
+    assert correlator.stats()["correlated_total"] == 1
+
+def test_finished_incident_closes_after_window(monkeypatch):
+    from app.services import alert_correlator
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(alert_correlator, "time", SimpleNamespace(monotonic=lambda: now.value))
+    correlator = AlertCorrelator(FakeTopology(PODS), 300)
+    incident, _ = correlator.correlate(alert(namespace="shop", pod="web-1"))
+    correlator.mark_running(incident, "conv-1")
+    now.value += 3600
+    assert correlator.correlate(alert(namespace="shop", pod="web-2"))[1] is False  # Still running
+
+    correlator.mark_done(incident)
+    now.value += 301
+    assert correlator.correlate(alert(namespace="shop", pod="web-2"))[1] is True
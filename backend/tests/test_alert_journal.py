@@ -0,0 +1,44 @@
+import asyncio
+
+from app.services.alert_journal import AlertJournal
+
+def test_group_commit_and_replay(tmp_path):
+    path = str(tmp_path / "journal.db")
+
+    async def write():
+        journal = AlertJournal(path, flush_interval_ms=5)
+        first, second = await asyncio.gather(
+            journal.append([("fp-1", "{}"), ("fp-2", "{}")]),
+            journal.append([("fp-3", "{}")]),
+        )
+        commits = journal.commits_total
+        journal.ack(first[0])
+        await journal.close()
+        return first, second, commits
+
+    async def replay():
+        journal = AlertJournal(path)
+        rows = await journal.load_since(0)
+        await journal.close()
+        return rows
+
+    first, second, commits = asyncio.run(write())
+    assert commits == 1  # Concurrent appends share one transaction
+    assert first + second == sorted(first + second)
+    # A fresh process (restart) replays what was never acked
+    assert [(row[0], row[1]) for row in asyncio.run(replay())] == [(first[1], "fp-2"), (second[0], "fp-3")]
+
+def test_claimed_rows_are_not_tailed(tmp_path):
+    async def scenario():
+        journal = AlertJournal(str(tmp_path / "journal.db"), flush_interval_ms=5)
+        claimed = await journal.append([("mine", "{}")], claim=True)
+        other = await journal.append([("follower", "{}")])
+        rows = await journal.load_since(0)
+        pending = await journal.count_pending()
+        await journal.close()
+        return claimed, other, rows, pending
+
+    claimed, other, rows, pending = asyncio.run(scenario())
+    assert [row[0] for row in rows] == other
+    assert claimed[0] not in [row[0] for row in rows]
+    assert pending == 2
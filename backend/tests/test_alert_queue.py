@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.schemas.alert import Alert, AlertmanagerPayload
+from app.services.alert_queue import AlertPriorityQueue, AlertQueueService, AlertWorkItem
+
+def make_item(name: str = "PodDown", severity: str = "warning", namespace: str = "default",
+              starts_at: str = None) -> AlertWorkItem:
+    alert = Alert(status="firing", labels={"alertname": name, "severity": severity, "namespace": namespace},
+                  annotations={}, startsAt=starts_at)
+    payload = AlertmanagerPayload(receiver="test", status="firing", alerts=[alert], groupLabels={}, commonLabels={},
+                                  commonAnnotations={}, externalURL="", version="4", groupKey="{}")
+    return AlertWorkItem(payload=payload, alert=alert)
+
+def test_get_skips_ineligible_items():
+    async def scenario():
+        queue = AlertPriorityQueue(10)
+        busy = make_item("A", "critical", namespace="busy")
+        free = make_item("B", "info", namespace="free")
+        queue.offer(busy)
+        queue.offer(free)
+        item = await queue.get(lambda i: i.namespace != "busy")
+        return item, queue.qsize()
+
+    item, remaining = asyncio.run(scenario())
+    assert item.alert.labels["alertname"] == "B"
+    assert remaining == 1
+
+def test_get_waits_until_notified():
+    async def scenario():
+        queue = AlertPriorityQueue(10)
+        queue.offer(make_item(namespace="busy"))
+        slots = {"busy": 0}
+        getter = asyncio.create_task(queue.get(lambda i: slots[i.namespace] > 0))
+        await asyncio.sleep(0.01)
+        assert not getter.done()
+        slots["busy"] = 1
+        queue.notify()
+        return await asyncio.wait_for(getter, 1)
+
+    assert asyncio.run(scenario()).namespace == "busy"
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    # The singleton opens alert_debug.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(AlertQueueService, "_instance", None)
+    service = AlertQueueService()
+    monkeypatch.setattr(service, "_finish_incident", lambda item, finished: None)
+    monkeypatch.setattr(service, "_ack", lambda item: None)
+    return service
+
+@pytest.mark.parametrize("outcome, processed, failed", [(True, 1, 0), (False, 0, 1)])
+def test_run_item_counts_outcome(service, monkeypatch, outcome, processed, failed):
+    async def process(item):
+        return outcome
+    monkeypatch.setattr(service, "_process_alert", process)
+
+    asyncio.run(service._run_item(make_item()))
+
+    assert (service.processed_total, service.failed_total) == (processed, failed)
+    assert service.in_flight == 0
+    assert dict(service.in_flight_by_namespace) == {}
+
+def test_orders_by_severity_then_age():
+    async def scenario():
+        queue = AlertPriorityQueue(10)
+        queue.offer(make_item("new-warning", "warning", starts_at="2024-01-01T00:10:00Z"))
+        queue.offer(make_item("info", "info", starts_at="2024-01-01T00:00:00Z"))
+        queue.offer(make_item("old-warning", "warning", starts_at="2024-01-01T00:05:00.123456789Z"))
+        queue.offer(make_item("critical", "critical", starts_at="2024-01-01T00:20:00Z"))
+        return [(await queue.get()).alert.labels["alertname"] for _ in range(4)]
+
+    assert asyncio.run(scenario()) == ["critical", "old-warning", "new-warning", "info"]
+
+def test_full_queue_sheds_least_urgent():
+    queue = AlertPriorityQueue(2)
+    queue.offer(make_item("warning", "warning"))
+    queue.offer(make_item("info", "info"))
+
+    accepted, shed = queue.offer(make_item("critical", "critical"))
+
+    assert accepted
+    assert shed.alert.labels["alertname"] == "info"
+    assert queue.qsize() == 2
+    assert queue.depth_by_severity() == {"warning": 1, "critical": 1}
+
+def test_full_queue_rejects_equal_or_lower_severity():
+    queue = AlertPriorityQueue(1)
+    queue.offer(make_item("first", "warning"))
+
+    assert queue.offer(make_item("second", "warning")) == (False, None)
+    assert queue.offer(make_item("third", "info")) == (False, None)
+    assert queue.offer(make_item("forced", "info"), force=True) == (True, None)
+    assert queue.qsize() == 2
+
+def test_shedding_wakes_waiting_consumers():
+    async def scenario():
+        queue = AlertPriorityQueue(1)
+        queue.offer(make_item("info", "info"))
+        getter = asyncio.create_task(queue.get(lambda i: i.severity == "critical"))
+        await asyncio.sleep(0.01)
+        queue.offer(make_item("critical", "critical"))
+        return await asyncio.wait_for(getter, 1)
+
+    assert asyncio.run(scenario()).severity == "critical"
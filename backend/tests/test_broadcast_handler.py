@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from app.agent.stream import BroadcastStreamHandler
+from app.core.config import settings
+
+@pytest.fixture
+def small_buffers(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_COALESCE_TOKENS", False)
+    monkeypatch.setattr(settings, "STREAM_LISTENER_QUEUE_SIZE", 3)
+    monkeypatch.setattr(settings, "STREAM_REPLAY_BUFFER_SIZE", 5)
+
+def drain(queue):
+    frames = []
+    while not queue.empty():
+        frames.append(queue.get_nowait())
+    return frames
+
+async def emit(handler, count):
+    for _ in range(count):
+        await handler.send({"type": "tool_result"})
+
+def test_resume_replays_frames_after_last_seq(small_buffers):
+    async def scenario():
+        handler = BroadcastStreamHandler()
+        await emit(handler, 4)
+        return drain(await handler.subscribe(last_seq=2))
+
+    assert [f["seq"] for f in asyncio.run(scenario())] == [3, 4]
+
+def test_resume_reports_frames_lost_from_the_buffer(small_buffers):
+    async def scenario():
+        handler = BroadcastStreamHandler()
+        await emit(handler, 7)  # Buffer keeps 3..7
+        return drain(await handler.subscribe(last_seq=0))
+
+    frames = asyncio.run(scenario())
+    assert frames[0] == {"type": "gap", "from_seq": 1, "to_seq": 2}
+    # Only queue_size - 1 frames are replayed; the rest is handed over through a resync
+    assert frames[1:] == [{"type": "tool_result", "seq": 3}, {"type": "resync", "last_seq": 3}]
+
+def test_slow_listener_gets_resync_then_catches_up(small_buffers):
+    async def scenario():
+        handler = BroadcastStreamHandler()
+        slow = await handler.subscribe()
+        await emit(handler, 4)
+        frames = drain(slow)
+        handler.unsubscribe(slow)
+        resumed = await handler.subscribe(frames[-1]["last_seq"])
+        return frames, drain(resumed), handler.resyncs_total
+
+    frames, resumed, resyncs = asyncio.run(scenario())
+    assert frames == [{"type": "resync", "last_seq": 0}]
+    assert resumed == [{"type": "tool_result", "seq": 1}, {"type": "tool_result", "seq": 2}, {"type": "resync", "last_seq": 2}]
+    assert resyncs == 1
+
+def test_drop_oldest_policy(small_buffers, monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_SLOW_CONSUMER_POLICY", "drop_oldest")
+
+    async def scenario():
+        handler = BroadcastStreamHandler()
+        slow = await handler.subscribe()
+        await emit(handler, 5)
+        return [f["seq"] for f in drain(slow)], handler.dropped_total
+
+    assert asyncio.run(scenario()) == ([3, 4, 5], 2)
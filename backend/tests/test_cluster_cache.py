@@ -0,0 +1,92 @@
+from types import SimpleNamespace as NS
+
+import pytest
+
+from app.services.cluster_cache import Informer, Unanswerable, _parse_selector
+
+def make_pod(name, namespace="shop", node="node-a", labels=None, owner=None, version="1"):
+    refs = [NS(controller=True, kind=owner[0], name=owner[1])] if owner else None
+    return NS(metadata=NS(name=name, namespace=namespace, labels=labels, owner_references=refs, resource_version=version),
+              spec=NS(node_name=node), status=NS(phase="Running"))
+
+class FakeApi:
+    """list_all(limit, _continue): returns `pages` one by one."""
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def __call__(self, limit=None, _continue=None, _request_timeout=None, **kwargs):
+        self.calls.append(_continue)
+        index = int(_continue or 0)
+        token = str(index + 1) if index + 1 < len(self.pages) else None
+        return NS(items=self.pages[index], metadata=NS(resource_version="100" if index == 0 else "999", _continue=token))
+
+def informer_with(pages):
+    api = FakeApi(pages)
+    informer = Informer("pods", api, True, {
+        "metadata.name": lambda p: p.metadata.name,
+        "spec.nodeName": lambda p: p.spec.node_name,
+    }, node_of=lambda p: p.spec.node_name)
+    informer._relist()
+    return informer, api
+
+def names(objects):
+    return [o.metadata.name for o in objects]
+
+def test_parse_selector():
+    assert _parse_selector("app=web,tier!=db,env==prod,canary,!legacy") == [
+        ("app", "==", "web"), ("tier", "!=", "db"), ("env", "==", "prod"), ("canary", "exists", None), ("legacy", "!exists", None)]
+    with pytest.raises(Unanswerable):
+        _parse_selector("app in (web,api)")
+
+def test_unsynced_informer_is_unanswerable():
+    informer = Informer("pods", FakeApi([[]]), True, {})
+    with pytest.raises(Unanswerable):
+        informer.list()
+
+def test_paged_relist_and_filters():
+    informer, api = informer_with([
+        [make_pod("web-1", labels={"app": "web"}, owner=("ReplicaSet", "web-abc"))],
+        [make_pod("web-2", node="node-b", labels={"app": "web", "canary": "true"}, owner=("ReplicaSet", "web-abc")),
+         make_pod("db-0", namespace="data", node="node-b", labels={"app": "db"})],
+    ])
+    assert api.calls == [None, "1"]
+    assert informer.resource_version == "100"  # The first page's snapshot
+
+    assert names(informer.list()) == ["db-0", "web-1", "web-2"]
+    assert names(informer.list(namespace="shop", label_selector="app=web,!canary")) == ["web-1"]
+    assert names(informer.list(field_selector="spec.nodeName=node-b")) == ["db-0", "web-2"]
+    assert names(informer.list(node="node-b", namespace="shop")) == ["web-2"]
+    assert names(informer.list(namespace="shop", owner=("ReplicaSet", "web-abc"))) == ["web-1", "web-2"]
+    assert informer.get("data", "db-0").metadata.name == "db-0"
+    with pytest.raises(Unanswerable):
+        informer.list(field_selector="status.podIP=10.0.0.1")
+
+def test_watch_events_update_indexes_and_change_journal(monkeypatch):
+    informer, _ = informer_with([[make_pod("web-1", labels={"app": "web"}), make_pod("web-2", labels={"app": "web"})]])
+    start = informer.generation
+    events = [
+        {"type": "MODIFIED", "object": make_pod("web-1", node="node-b", labels={"app": "api"}, version="101")},
+        {"type": "DELETED", "object": make_pod("web-2", version="102")},
+        {"type": "ADDED", "object": make_pod("web-3", version="103")},
+    ]
+
+    class FakeWatch:
+        def stream(self, *args, **kwargs):
+            return iter(events)
+    import kubernetes.watch
+    monkeypatch.setattr(kubernetes.watch, "Watch", FakeWatch)
+    informer._watch()
+
+    assert informer.resource_version == "103"
+    assert names(informer.list(label_selector="app=web")) == []
+    assert names(informer.list(node="node-b")) == ["web-1"]
+    changed, generation = informer.changes_since(start)
+    assert changed == [("shop", "web-1"), ("shop", "web-2"), ("shop", "web-3")]
+    assert informer.changes_since(generation) == ([], generation)
+
+def test_relist_invalidates_change_readers():
+    informer, _ = informer_with([[make_pod("web-1")]])
+    before = informer.generation
+    informer._relist()
+    assert informer.changes_since(before) is None
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.connection_manager import ConnectionManager
+from app.services.stream_broker import stream_broker
+
+class FakeSocket:
+    def __init__(self, stalled=False):
+        self.stalled = stalled
+        self.sent = []
+        self.closed_with = None
+
+    async def send_json(self, data):
+        if self.stalled:
+            await asyncio.sleep(3600)
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(ConnectionManager, "_instance", None)
+    monkeypatch.setattr(settings, "WS_OUTBOUND_QUEUE_SIZE", 3)
+    monkeypatch.setattr(settings, "WS_SEND_TIMEOUT_SECONDS", 0.05)
+
+    async def publish(conversation_id, frame, run_id=None):
+        return
+    monkeypatch.setattr(stream_broker, "publish", publish)
+    return ConnectionManager()
+
+def test_stalled_client_is_evicted_without_delaying_others(manager):
+    async def scenario():
+        fast, stalled = FakeSocket(), FakeSocket(stalled=True)
+        await manager.connect(fast, "conv")
+        await manager.connect(stalled, "conv")
+        for seq in range(1, 3):
+            await manager.broadcast_json("conv", {"seq": seq})
+        await asyncio.sleep(0.01)
+        delivered_early = list(fast.sent)
+        await asyncio.sleep(0.1)  # The stalled send times out
+        return delivered_early, stalled.closed_with, manager.active_connections, manager.evicted_total
+
+    delivered_early, closed_with, connections, evicted = asyncio.run(scenario())
+    assert delivered_early == [{"seq": 1}, {"seq": 2}]
+    assert closed_with == 1013
+    assert len(connections["conv"]) == 1 and evicted == 1
+
+def test_overflowing_client_is_evicted(manager):
+    async def scenario():
+        stalled = FakeSocket(stalled=True)
+        await manager.connect(stalled, "conv")
+        for seq in range(1, 6):  # The sender holds one frame; three more fill the queue
+            await manager.broadcast_json("conv", {"seq": seq})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        return stalled.closed_with, manager.stats()
+
+    closed_with, stats = asyncio.run(scenario())
+    assert closed_with == 1013
+    assert stats["connections"] == 0 and stats["evicted_total"] == 1
@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from app.core.config import settings
+from app.services import context_builder
+from app.services.context_builder import ChatHistoryService, build_context
+
+def row(msg_id, role, content="", calls=(), call_id=None):
+    return SimpleNamespace(id=msg_id, role=role, content=content, tool_call_id=call_id, tool_name="run_kubectl",
+                           tool_calls=[SimpleNamespace(name="run_kubectl", args="{}", call_id=c) for c in calls])
+
+@pytest.fixture(autouse=True)
+def offline_tokens(monkeypatch):
+    # Estimate by length instead of downloading the tiktoken BPE file
+    monkeypatch.setattr(context_builder, "_encoder_failed", True)
+
+class FakeHistory:
+    """In-memory stand-in for the ChatHistoryService queries build_context uses."""
+    def __init__(self, monkeypatch, rows, summary=None, summary_upto_id=None, token_budget=None):
+        self.rows = rows
+        self.state = SimpleNamespace(summary=summary, summary_upto_id=summary_upto_id, token_budget=token_budget)
+        self.folded = []
+        monkeypatch.setattr(ChatHistoryService, "get_conversation_state", self.get_conversation_state)
+        monkeypatch.setattr(ChatHistoryService, "get_recent_messages", self.get_recent_messages)
+        monkeypatch.setattr(ChatHistoryService, "save_summary", self.save_summary)
+        monkeypatch.setattr(context_builder, "_summarize", self.summarize)
+
+    async def get_conversation_state(self, session, conversation_id):
+        return self.state
+
+    async def get_recent_messages(self, session, conversation_id, limit=50, after_id=None, before_id=None):
+        rows = [r for r in self.rows if (after_id is None or r.id > after_id) and (before_id is None or r.id < before_id)]
+        return rows if limit is None else rows[-limit:]
+
+    async def save_summary(self, session, conversation_id, summary, upto_id):
+        self.state.summary, self.state.summary_upto_id = summary, upto_id
+
+    async def summarize(self, previous, spans):
+        self.folded.append([i for span in spans for i in span.ids])
+        return f"{previous or ''}[{','.join(str(i) for span in spans for i in span.ids)}]"
+
+def build():
+    return asyncio.run(build_context(None, "conv", SystemMessage(content="system")))
+
+def test_tool_results_stay_with_their_call():
+    spans = context_builder._group([
+        row(1, "user", "why is web down?"),
+        row(2, "assistant", "", calls=["a", "b"]),
+        row(3, "tool", "pods", call_id="a"),
+        row(4, "tool", "events", call_id="b"),
+        row(5, "tool", "orphan", call_id="c"),
+        row(6, "assistant", "OOMKilled"),
+    ])
+    assert [span.ids for span in spans] == [[1], [2, 3, 4], [6]]
+
+def test_unanswered_tool_calls_are_dropped():
+    spans = context_builder._group([
+        row(1, "user", "check it"),
+        row(2, "assistant", "", calls=["a", "b"]),
+        row(3, "tool", "pods", call_id="a"),
+        row(4, "assistant", "", calls=["c"]),  # Cancelled before the tool ran
+        row(5, "assistant", "Looking", calls=["d"]),
+    ])
+    assert [span.ids for span in spans] == [[1], [2, 3], [5]]
+    assert [tc["id"] for tc in spans[1].messages[0].tool_calls] == ["a"]
+    assert spans[2].messages[0].tool_calls == [] and spans[2].messages[0].content == "Looking"
+
+def test_history_within_budget_is_sent_as_is(monkeypatch):
+    FakeHistory(monkeypatch, [row(1, "user", "hi"), row(2, "assistant", "hello")], summary="earlier", summary_upto_id=0)
+    context = build()
+    assert [type(m) for m in context] == [SystemMessage, SystemMessage, HumanMessage, AIMessage]
+    assert "earlier" in context[1].content
+
+def test_over_budget_folds_oldest_spans_into_summary(monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_SUMMARY_MAX_TOKENS", 10)
+    rows = [row(1, "user", "x" * 400), row(2, "assistant", "", calls=["a"]), row(3, "tool", "y" * 400, call_id="a"),
+            row(4, "user", "latest question")]
+    history = FakeHistory(monkeypatch, rows, token_budget=200)
+
+    context = build()
+
+    assert history.folded == [[1, 2, 3]]
+    assert history.state.summary_upto_id == 3
+    assert isinstance(context[-1], HumanMessage) and context[-1].content == "latest question"
+    assert not any(isinstance(m, ToolMessage) for m in context)
+
+def test_history_beyond_the_window_is_summarized(monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_HISTORY_MAX_MESSAGES", 2)
+    rows = [row(1, "user", "one"), row(2, "user", "two"), row(3, "assistant", "", calls=["a"]),
+            row(4, "tool", "result", call_id="a"), row(5, "user", "latest")]
+    history = FakeHistory(monkeypatch, rows, summary_upto_id=0)
+
+    context = build()
+
+    # The window [4, 5] starts with a tool result: it is folded together with its call,
+    # in chunks of the window size
+    assert history.folded == [[1, 2], [3, 4]]
+    assert history.state.summary_upto_id == 4
+    assert [m.content for m in context[2:]] == ["latest"]
@@ -0,0 +1,46 @@
+import asyncio
+
+from app.services.health_monitor import HealthMonitor
+
+def monitor_with(results, threshold=2):
+    """Monitor whose "loki" probe returns the queued results (None = healthy)."""
+    monitor = HealthMonitor(interval=15, max_backoff=120, failure_threshold=threshold, timeout=1)
+    queue = list(results)
+
+    async def probe():
+        result = queue.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    monitor._probes = {"loki": probe}
+    return monitor
+
+def statuses(monitor, count):
+    async def scenario():
+        return [(await monitor.check("loki"))["status"] for _ in range(count)]
+    return asyncio.run(scenario())
+
+def test_down_only_after_consecutive_failures():
+    monitor = monitor_with([None, "HTTP 503", None, "HTTP 503", ConnectionError("refused"), None])
+    assert statuses(monitor, 6) == ["up", "up", "up", "up", "down", "up"]
+
+def test_failing_from_the_start_is_down():
+    monitor = monitor_with(["HTTP 503"])
+    assert statuses(monitor, 1) == ["down"]
+    assert monitor.snapshot()["loki"]["error"] == "HTTP 503"
+
+def test_backoff_doubles_up_to_max(monkeypatch):
+    monitor = monitor_with(["HTTP 503"] * 6)
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+        if len(delays) == 5:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    try:
+        asyncio.run(monitor._loop("loki"))
+    except asyncio.CancelledError:
+        pass
+    assert delays == [30, 60, 120, 120, 120]
@@ -0,0 +1,22 @@
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.services.k8s_client import K8sClient
+
+def test_api_calls_run_on_the_k8s_executor_with_a_timeout():
+    k8s = K8sClient()
+
+    def list_pods(namespace, _request_timeout=None):
+        return threading.current_thread().name, namespace, _request_timeout
+
+    async def scenario():
+        return await k8s.call(list_pods, "shop"), await k8s.call(list_pods, "shop", _request_timeout=1)
+
+    default, explicit = asyncio.run(scenario())
+    assert default[0].startswith("k8s-api")
+    assert default[1:] == ("shop", settings.K8S_REQUEST_TIMEOUT_SECONDS)
+    assert explicit[2] == 1
+
+def test_connection_pool_matches_executor():
+    assert K8sClient()._build_api_client().configuration.connection_pool_maxsize == settings.K8S_CLIENT_THREADS
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace as NS
+
+import pytest
+
+from app.services.kubectl_engine import KubectlEngine, Unsupported, _pod_status, _service_row, human_duration, parse_args, table
+
+NOW = datetime.now(timezone.utc)
+
+def container_status(name, ready=True, restarts=0, waiting=None, terminated=None, last_finished=None):
+    return NS(name=name, ready=ready, restart_count=restarts,
+              state=NS(waiting=NS(reason=waiting) if waiting else None, terminated=terminated,
+                       running=NS() if ready else None),
+              last_state=NS(terminated=NS(finished_at=last_finished) if last_finished else None))
+
+def pod(name, statuses, containers=None, annotations=None, phase="Running"):
+    return NS(
+        metadata=NS(name=name, namespace="shop", creation_timestamp=NOW - timedelta(hours=3),
+                    deletion_timestamp=None, annotations=annotations),
+        spec=NS(containers=[NS(name=c) for c in (containers or [s.name for s in statuses])],
+                init_containers=None, readiness_gates=None, node_name="node-a"),
+        status=NS(phase=phase, reason=None, conditions=[], init_container_statuses=None,
+                  container_statuses=statuses, pod_ip="10.0.0.7", nominated_node_name=None),
+    )
+
+def test_parse_args_flags():
+    args = parse_args("kubectl get pods -nshop -l app=web --field-selector=status.phase=Running -owide --no-headers")
+    assert (args.verb, args.positional, args.namespace, args.selector) == ("get", ["pods"], "shop", "app=web")
+    assert (args.field_selector, args.output, args.no_headers) == ("status.phase=Running", "wide", True)
+
+    logs = parse_args("logs web-1 -c app --tail 50 -p --since=1h30m")
+    assert (logs.container, logs.tail, logs.previous, logs.since_seconds) == ("app", 50, True, 5400)
+    assert parse_args("get pods -A").all_namespaces
+
+@pytest.mark.parametrize("command", [
+    "get pods -w", "get pods -o jsonpath={.items}", "logs web --tail x", "logs web --since 5d",
+    "get pods -n", "get pods 'unterminated", "",
+])
+def test_parse_args_defers_to_kubectl(command):
+    with pytest.raises(Unsupported):
+        parse_args(command)
+
+@pytest.mark.parametrize("seconds, text", [
+    (59, "59s"), (150, "2m30s"), (600, "10m"), (3 * 3600 + 60, "3h1m"), (30 * 3600, "30h"),
+    (3 * 86400 + 3600, "3d1h"), (400 * 86400, "400d"), (3 * 365 * 86400, "3y"),
+])
+def test_human_duration(seconds, text):
+    assert human_duration(seconds) == text
+
+def test_table_pads_like_tabwriter():
+    assert table(["NAME", "READY"], [["web-1", "1/1"], ["db", "0/1"]]).splitlines() == [
+        "NAME    READY", "web-1   1/1", "db      0/1"]
+    assert table(["NAME", "READY"], [["db", "0/1"]], no_headers=True) == "db   0/1"
+
+def test_pod_status_like_kubectl():
+    crashing = pod("web-1", [container_status("app", ready=False, restarts=4, waiting="CrashLoopBackOff",
+                                              last_finished=NOW - timedelta(minutes=2)),
+                             container_status("sidecar")])
+    status, ready, total, restarts, last_restart = _pod_status(crashing)
+    assert (status, ready, total, restarts) == ("CrashLoopBackOff", 1, 2, 4)
+    assert last_restart == NOW - timedelta(minutes=2)
+
+    assert _pod_status(pod("web-2", [container_status("app")]))[:3] == ("Running", 1, 1)
+
+def test_service_row_does_not_mutate_the_cached_object():
+    external_ips = ["1.2.3.4"]
+    svc = NS(metadata=NS(name="web", creation_timestamp=NOW),
+             spec=NS(type="LoadBalancer", cluster_ip="10.96.0.10", external_i_ps=external_ips, external_name=None,
+                     ports=[NS(port=80, node_port=30080, protocol="TCP")], selector={"app": "web"}),
+             status=NS(load_balancer=NS(ingress=[NS(ip=None, hostname="lb.example.com")])))
+
+    row = _service_row(svc, wide=True)
+
+    assert row[:5] == ["web", "LoadBalancer", "10.96.0.10", "1.2.3.4,lb.example.com", "80:30080/TCP"]
+    assert row[-1] == "app=web"
+    assert external_ips == ["1.2.3.4"]
+
+class FakeCoreV1:
+    def __init__(self, pods):
+        self.pods = {p.metadata.name: p for p in pods}
+        self.log_calls = []
+
+    def list_namespaced_pod(self, namespace, **kwargs):
+        return NS(items=list(self.pods.values()))
+
+    def read_namespaced_pod(self, name, namespace, **kwargs):
+        return self.pods[name]
+
+    def read_namespaced_pod_log(self, name, namespace, **kwargs):
+        self.log_calls.append((name, namespace, kwargs.get("container"), kwargs.get("tail_lines")))
+        return "log line"
+
+@pytest.fixture
+def engine():
+    pods = [
+        pod("web-1", [container_status("app"), container_status("istio-proxy")],
+            annotations={"kubectl.kubernetes.io/default-container": "app"}),
+        pod("web-2", [container_status("istio-proxy"), container_status("app")]),
+        pod("db-0", [container_status("db", ready=False, waiting="ImagePullBackOff")]),
+    ]
+    engine = KubectlEngine(NS(v1=FakeCoreV1(pods)))
+    engine._default_namespace = "shop"
+    return engine
+
+def test_get_pods_table(engine):
+    lines = engine.execute("kubectl get pods").splitlines()
+    assert lines[0].split() == ["NAME", "READY", "STATUS", "RESTARTS", "AGE"]
+    assert lines[3].split() == ["db-0", "0/1", "ImagePullBackOff", "0", "3h"]
+    assert engine.execute("get pods -o name").splitlines() == ["pod/web-1", "pod/web-2", "pod/db-0"]
+
+def test_logs_picks_the_default_container(engine):
+    for command in ["logs web-1", "logs pod/web-2 --tail=10", "logs db-0", "logs web-2 -c app"]:
+        assert engine.execute(command) == "log line"
+    assert engine.k8s.v1.log_calls == [
+        ("web-1", "shop", "app", None),
+        ("web-2", "shop", "istio-proxy", 10),
+        ("db-0", "shop", None, None),
+        ("web-2", "shop", "app", None),
+    ]
+
+@pytest.mark.parametrize("command", ["exec web-1 -- ls", "get pods,svc", "get crd", "logs deploy/web", "describe pods"])
+def test_unsupported_commands(engine, command):
+    with pytest.raises(Unsupported):
+        engine.execute(command)
@@ -0,0 +1,36 @@
+import asyncio
+import os
+
+from app.services.leader_lease import LeaderLease
+
+def test_only_one_lease_holder(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    first, second = LeaderLease(path, 0.01), LeaderLease(path, 0.01)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert first.try_acquire()  # Idempotent for the holder
+    assert (tmp_path / "leader.lock").read_text().strip().isdigit()
+
+def test_callbacks_run_once_elected(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    holder = LeaderLease(path, 0.01)
+    holder.try_acquire()
+
+    async def scenario():
+        lease = LeaderLease(path, 0.01)
+        elected = asyncio.Event()
+
+        async def on_elected():
+            elected.set()
+        lease.on_elected(on_elected)
+        lease.start()
+        await asyncio.sleep(0.05)
+        assert not lease.is_leader and not elected.is_set()
+
+        # The lock goes away with the holder's file descriptor (process exit)
+        os.close(holder._fd)
+        await asyncio.wait_for(elected.wait(), 1)
+        return lease.status()
+
+    assert asyncio.run(scenario())["is_leader"]
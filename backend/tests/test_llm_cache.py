@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.agent.graph.nodes import agent
+from app.services.plugin_manager import plugin_manager
+
+TOOL = {"type": "function", "function": {"name": "run_kubectl", "description": "kubectl",
+                                         "parameters": {"type": "object", "properties": {}}}}
+
+def config(model="gpt-4o", api_key="sk-test"):
+    return SimpleNamespace(api_key=api_key, base_url="http://llm.local/v1", model_name=model)
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    monkeypatch.setattr(agent, "_llm_cache", {})
+    monkeypatch.setattr(agent, "_bound_cache", {})
+    monkeypatch.setattr(plugin_manager, "get_all_tools_schema", lambda: [TOOL])
+
+def test_client_is_shared_until_config_changes():
+    llm = agent.get_llm(config())
+    assert agent.get_llm(config()) is llm
+    other = agent.get_llm(config(model="gpt-4o-mini"))
+    assert other is not llm
+    assert list(agent._llm_cache) == [("sk-test", "http://llm.local/v1", "gpt-4o-mini")]
+
+def test_binding_is_rebuilt_when_tools_change(monkeypatch):
+    monkeypatch.setattr(plugin_manager, "tools_schema_version", 1)
+    bound = agent.get_bound_model(config())
+    assert agent.get_bound_model(config()) is bound
+
+    monkeypatch.setattr(plugin_manager, "tools_schema_version", 2)
+    rebound = agent.get_bound_model(config())
+    assert rebound is not bound
+    assert len(agent._bound_cache) == 1
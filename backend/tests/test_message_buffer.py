@@ -0,0 +1,59 @@
+from app.services.chat_history import ChatHistoryService, MessageBuffer
+
+TOOL_CALL = [{"id": "call-1", "name": "run_kubectl", "args": {"args": "get pods"}}]
+
+async def conversation(session):
+    return (await ChatHistoryService.create_conversation(session, title="test")).id
+
+def test_step_durability_writes_once_per_step(run_db):
+    async def scenario(session):
+        conversation_id = await conversation(session)
+        buffer = MessageBuffer(session, conversation_id, "step")
+        await buffer.add("assistant", "", dedupe_key="ai-1", tool_calls=TOOL_CALL)
+        await buffer.add("tool", "pod list", tool_call_id="call-1", tool_name="run_kubectl")
+        written_before_step = len(await ChatHistoryService.get_recent_messages(session, conversation_id))
+        await buffer.step_done()
+        rows = await ChatHistoryService.get_recent_messages(session, conversation_id)
+        return written_before_step, buffer.flushes, [(r.role, r.tool_call_id) for r in rows]
+
+    written_before_step, flushes, rows = run_db(scenario)
+    assert written_before_step == 0
+    assert flushes == 1
+    assert rows == [("assistant", None), ("tool", "call-1")]
+
+def test_end_durability_waits_for_explicit_flush(run_db):
+    async def scenario(session):
+        buffer = MessageBuffer(session, await conversation(session), "end")
+        await buffer.add("assistant", "thinking")
+        await buffer.step_done()
+        pending = buffer.pending
+        await buffer.flush()
+        return pending, buffer.pending, buffer.written
+
+    assert run_db(scenario) == (1, 0, 1)
+
+def test_assistant_duplicates_are_dropped(run_db):
+    async def scenario(session):
+        buffer = MessageBuffer(session, await conversation(session), "end")
+        await buffer.add("assistant", "done", dedupe_key="ai-1")
+        await buffer.add("assistant", "done", dedupe_key="ai-1")  # Reported again by on_chain_end
+        await buffer.add("assistant", "done")  # Same text, no id: keyed by content
+        await buffer.add("assistant", "done")
+        return buffer.pending
+
+    assert run_db(scenario) == 2
+
+def test_tool_call_messages_are_never_deduplicated(run_db):
+    async def scenario(session):
+        conversation_id = await conversation(session)
+        buffer = MessageBuffer(session, conversation_id, "end")
+        # Only tool calls: no id, no content
+        await buffer.add("assistant", "", tool_calls=TOOL_CALL)
+        await buffer.add("assistant", "", tool_calls=[{**TOOL_CALL[0], "id": "call-2"}])
+        await buffer.add("assistant", "", dedupe_key="ai-1")
+        await buffer.add("assistant", "", dedupe_key="ai-1", tool_calls=[{**TOOL_CALL[0], "id": "call-3"}])
+        await buffer.flush()
+        rows = await ChatHistoryService.get_recent_messages(session, conversation_id)
+        return [[tc.call_id for tc in r.tool_calls] for r in rows]
+
+    assert run_db(scenario) == [["call-1"], ["call-2"], [], ["call-3"]]
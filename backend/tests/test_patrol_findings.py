@@ -0,0 +1,152 @@
+import asyncio
+from types import SimpleNamespace as NS
+
+import pytest
+
+from app.features.patrol import patrol_service as patrol_module
+from app.features.patrol.findings import PatrolFindings
+from app.features.patrol.patrol_service import PatrolService
+
+KEY = ("shop", "web-1")
+
+def test_only_new_findings_are_reported():
+    findings = PatrolFindings()
+    assert findings.update(KEY, "1", {"app": "CrashLoopBackOff"}) == ["app"]
+    assert findings.unchanged(KEY, "1") and not findings.unchanged(KEY, "2") and not findings.unchanged(KEY, None)
+    assert findings.update(KEY, "2", {"app": "CrashLoopBackOff", "sidecar": "OOMKilled"}) == ["sidecar"]
+    assert findings.update(KEY, "3", {}) == []
+    assert findings.update(KEY, "4", {"app": "CrashLoopBackOff"}) == ["app"]  # Cleared, then back
+
+def test_deferred_and_pending_pods_are_rechecked():
+    findings = PatrolFindings()
+    findings.update(KEY, "1", {"app": "CrashLoopBackOff"})
+    findings.defer(KEY)
+    assert not findings.unchanged(KEY, "1")
+    assert findings.update(KEY, "1", {"app": "CrashLoopBackOff"}) == ["app"]  # All findings count as new again
+    assert findings.unchanged(KEY, "1")
+
+    findings.recheck(KEY, pending=True)
+    assert not findings.unchanged(KEY, "1")
+    findings.recheck(KEY, pending=False)
+    assert findings.unchanged(KEY, "1")
+
+def test_retain_forgets_pods_that_are_gone():
+    findings = PatrolFindings()
+    findings.update(KEY, "1", {"app": "CrashLoopBackOff"})
+    findings.update(("shop", "old"), "1", {})
+    findings.defer(("shop", "old"))
+    findings.retain({KEY})
+    assert list(findings.pods) == [KEY] and not findings.deferred
+
+def test_open_investigations_close_only_their_own_conversation():
+    findings = PatrolFindings()
+    findings.open(KEY, "patrol-2")
+    findings.close(KEY, "patrol-1")
+    assert findings.open_investigations == {KEY: "patrol-2"}
+    findings.close(KEY, "patrol-2")
+    assert findings.open_investigations == {}
+
+def test_state_round_trip_keeps_only_api_cursors():
+    findings = PatrolFindings()
+    findings.update(KEY, "1", {"app": "CrashLoopBackOff"})
+    findings.defer(KEY)
+    findings.recheck(("shop", "queued"), pending=True)
+    findings.open(KEY, "patrol-1")
+    findings.cursor = ("api", "rv7")
+    restored = PatrolFindings.from_state(findings.to_state())
+    assert restored.pods == findings.pods
+    assert restored.deferred == {KEY} and restored.pending == {("shop", "queued")}
+    assert restored.cursor == ("api", "rv7")
+    assert restored.open_investigations == {}  # Ended with the process that ran them
+
+    findings.cursor = ("cache", 42)  # An informer generation is meaningless in another process
+    assert PatrolFindings.from_state(findings.to_state()).cursor is None
+
+def make_pod(name, version, waiting=None):
+    return NS(
+        metadata=NS(name=name, namespace="shop", resource_version=version, creation_timestamp=None),
+        spec=NS(node_name="node-a"),
+        status=NS(phase="Running", start_time=None, container_statuses=[NS(
+            name="app", ready=waiting is None, restart_count=0,
+            state=NS(waiting=NS(reason=waiting) if waiting else None, terminated=None), last_state=None)]),
+    )
+
+class FakeScanner:
+    def __init__(self, pods):
+        self.pods = pods
+
+    async def scan(self, visit, flush):
+        for pod in self.pods:
+            await visit(pod)
+        await flush()
+        return {"pods": len(self.pods), "pages": 1, "source": "api", "resource_version": "rv1",
+                "complete": True, "error": None, "seconds": 0.1, "pods_per_second": 10.0}
+
+@pytest.fixture
+def cluster(monkeypatch):
+    """Patrol against fake pods: `cluster.pods` for full scans, `cluster.events` for watches from the cursor."""
+    state = NS(pods=[], events=[], watched_from=[], dispatched=[], refuse=False)
+
+    async def list_resources(kind):
+        return []
+    async def run(fn, resource_version):
+        state.watched_from.append(resource_version)
+        return state.events, "rv2"
+    async def call(fn, name, namespace):
+        return next(p for p in state.pods if p.metadata.name == name)
+    monkeypatch.setattr(patrol_module, "k8s_client", NS(
+        connected=True, list_resources=list_resources, run=run, call=call, v1=NS(read_namespaced_pod=None)))
+    monkeypatch.setattr(patrol_module, "pod_scanner", FakeScanner(state.pods))
+
+    service = PatrolService()
+    async def dispatch(pod, container, reason):
+        if state.refuse:
+            return None
+        state.dispatched.append((pod.metadata.name, container, reason))
+        return f"patrol-{len(state.dispatched)}"
+    service._dispatch_agent_investigation = dispatch
+    state.diagnose = lambda incremental: asyncio.run(service._diagnose_logs(incremental))
+    state.service = service
+    return state
+
+def test_incremental_run_evaluates_changed_pods_from_the_cursor(cluster):
+    cluster.pods += [make_pod("web-1", "1", waiting="CrashLoopBackOff"), make_pod("web-2", "1")]
+    result = cluster.diagnose(True)  # No cursor yet: full scan
+    assert result["scan"]["mode"] == "full"
+    assert cluster.dispatched == [("web-1", "app", "CrashLoopBackOff")]
+    assert cluster.service.findings.cursor == ("api", "rv1")
+
+    cluster.events = [("MODIFIED", make_pod("web-2", "2", waiting="ImagePullBackOff")), ("DELETED", make_pod("web-1", "1"))]
+    result = cluster.diagnose(True)
+    assert result["scan"]["mode"] == "incremental" and result["scan"]["pods"] == 1
+    assert cluster.watched_from == ["rv1"]
+    assert cluster.dispatched[1:] == [("web-2", "app", "Image Pull Error")]
+    assert list(cluster.service.findings.pods) == [("shop", "web-2")]
+    assert cluster.service.findings.cursor == ("api", "rv2")
+
+def test_refused_dispatch_is_retried_on_the_next_run(cluster):
+    cluster.pods.append(make_pod("web-1", "1", waiting="CrashLoopBackOff"))
+    cluster.refuse = True
+    result = cluster.diagnose(True)
+    assert cluster.dispatched == [] and cluster.service.findings.deferred == {KEY}
+    assert result["issues"][0]["status"] == "Known Issue"
+
+    cluster.refuse = False
+    result = cluster.diagnose(True)  # Unchanged pod, read back because it was deferred
+    assert cluster.dispatched == [("web-1", "app", "CrashLoopBackOff")]
+    assert result["issues"][0]["status"] == "Investigation Triggered"
+
+def test_full_run_re_evaluates_unchanged_pods(cluster, monkeypatch):
+    cluster.pods.append(make_pod("web-1", "1"))
+    evaluated = []
+    original = patrol_module.rule_engine.pod_findings
+    def pod_findings(table):
+        evaluated.extend(p.metadata.name for p in table.pods)
+        return original(table)
+    monkeypatch.setattr(patrol_module.rule_engine, "pod_findings", pod_findings)
+
+    cluster.diagnose(False)
+    cluster.events = []
+    cluster.diagnose(True)  # Nothing changed
+    cluster.diagnose(False)
+    assert evaluated == ["web-1", "web-1"]
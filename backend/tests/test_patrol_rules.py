@@ -0,0 +1,78 @@
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace as NS
+
+from app.features.patrol.rules import RULES, ContainerTable, Rule, RuleEngine, eq, gt, rule_engine
+from benchmark_patrol_rules import loop_findings, synthetic_cluster
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def container(name, waiting=None, terminated=None, last=None, last_minutes_ago=5, restarts=0, ready=True):
+    return NS(
+        name=name, ready=ready, restart_count=restarts,
+        state=NS(waiting=NS(reason=waiting) if waiting else None, terminated=NS(reason=terminated) if terminated else None),
+        last_state=NS(terminated=NS(reason=last, finished_at=NOW - timedelta(minutes=last_minutes_ago)) if last else None),
+    )
+
+def pod(name, *statuses, phase="Running", node="node-a", age_minutes=60 * 24):
+    started = NOW - timedelta(minutes=age_minutes)
+    return NS(metadata=NS(name=name, namespace="shop", creation_timestamp=started), spec=NS(node_name=node),
+              status=NS(phase=phase, start_time=started, container_statuses=list(statuses)))
+
+def node(name, *pressure):
+    return NS(metadata=NS(name=name), status=NS(conditions=[NS(type="Ready", status="True")] +
+                                                [NS(type=c, status="True") for c in pressure]))
+
+def findings(pods, nodes=()):
+    return rule_engine.pod_findings(ContainerTable.from_pods(pods, nodes, now=NOW.timestamp()))
+
+def test_table_has_one_row_per_container():
+    pods = [pod("a", container("app"), container("sidecar", waiting="CrashLoopBackOff")),
+            NS(metadata=NS(name="b", creation_timestamp=NOW), spec=None, status=None)]
+    table = ContainerTable.from_pods(pods, now=NOW.timestamp())
+    assert table.containers == ["app", "sidecar", ""]
+    assert table.pod_index.tolist() == [0, 0, 1]
+    assert table.isin("waiting_reason", ["CrashLoopBackOff"]).tolist() == [False, True, False]
+    assert table.isin("waiting_reason", ["NotSeen"]).tolist() == [False, False, False]
+
+def test_earlier_rules_take_precedence():
+    found = findings([pod("a",
+        container("oom", terminated="OOMKilled", restarts=10),
+        container("old-oom", last="OOMKilled", last_minutes_ago=120, restarts=10),
+        container("pull", waiting="ImagePullBackOff", restarts=10),
+        container("crash", waiting="CrashLoopBackOff", restarts=10),
+        container("healthy"),
+    )])
+    assert found == [{"oom": "OOMKilled", "old-oom": "High Restarts", "pull": "Image Pull Error", "crash": "CrashLoopBackOff"}]
+
+def test_restart_rate_is_averaged_over_at_least_an_hour():
+    found = findings([pod("young", container("app", restarts=3), age_minutes=10),
+                      pod("old", container("app", restarts=4), age_minutes=24 * 60)])
+    assert found == [{"app": "Restart Rate"}, {}]
+
+def test_pod_without_container_statuses_can_be_pending_too_long():
+    unscheduled = NS(metadata=NS(name="a", creation_timestamp=NOW - timedelta(minutes=30)), spec=NS(node_name=None),
+                     status=NS(phase="Pending", start_time=None, container_statuses=None))
+    recent = pod("b", phase="Pending", age_minutes=5)
+    recent.status.container_statuses = []
+    assert findings([unscheduled, recent]) == [{"": "Pending Too Long"}, {}]
+
+def test_node_pressure_flags_containers_that_are_not_ready():
+    pods = [pod("a", container("app", ready=False), container("ok"), node="node-a"),
+            pod("b", container("app", ready=False), node="node-b")]
+    assert findings(pods, [node("node-a", "DiskPressure"), node("node-b")]) == [{"app": "Node Pressure"}, {}]
+    assert ContainerTable.node_pressure([node("node-a", "MemoryPressure"), node("node-b")]) == {"node-a": {"MemoryPressure"}}
+
+def test_custom_rules_compose():
+    engine = RuleEngine([Rule("Flaky", gt("restart_count", 1) & ~eq("waiting_reason", "CrashLoopBackOff"))])
+    table = ContainerTable.from_pods([pod("a", container("x", restarts=2), container("y", restarts=2, waiting="CrashLoopBackOff"))],
+                                     now=NOW.timestamp())
+    assert engine.pod_findings(table) == [{"x": "Flaky"}]
+    assert engine.evaluate(table).tolist() == [0, -1]
+
+def test_engine_matches_a_per_container_loop():
+    pods, nodes = synthetic_cluster(2000, seed=3)
+    now = time.time()
+    found = RuleEngine(RULES).pod_findings(ContainerTable.from_pods(pods, nodes, now=now))
+    assert found == loop_findings(pods, nodes, now)
+    assert len({reason for f in found for reason in f.values()}) >= 5  # The sample exercises most rules
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace as NS
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models.patrol import PatrolRunRequest
+from app.features.patrol import scheduler as scheduler_module
+from app.features.patrol.dispatcher import PatrolDispatcher
+from app.features.patrol.patrol_service import patrol_service
+from app.features.patrol.scheduler import PatrolScheduler
+
+class Stop(BaseException):
+    pass
+
+@pytest.fixture
+def serve_once(monkeypatch):
+    """serve_once(session, requests): one pass of the leader's request loop; returns the incremental flags it ran with."""
+    runs = []
+    async def run_patrol(incremental=None):
+        runs.append(incremental)
+        return {"id": f"report-{len(runs)}"}
+    async def stop(_):
+        raise Stop()
+    monkeypatch.setattr(patrol_service, "run_patrol", run_patrol)
+    monkeypatch.setattr(scheduler_module, "asyncio", NS(sleep=stop))
+
+    async def serve(session, requests):
+        monkeypatch.setattr(scheduler_module, "AsyncSessionLocal",
+                            sessionmaker(bind=session.bind, class_=AsyncSession, expire_on_commit=False))
+        session.add_all(requests)
+        await session.commit()
+        scheduler = PatrolScheduler(0, 0)
+        async def publish():
+            pass
+        scheduler._publish_stats = publish
+        with pytest.raises(Stop):
+            await scheduler._serve_requests()
+        session.expire_all()  # Updated by the scheduler's own sessions
+        rows = (await session.execute(select(PatrolRunRequest).order_by(PatrolRunRequest.id))).scalars().all()
+        return runs, scheduler, rows
+    return serve
+
+@pytest.mark.parametrize("flags, incremental", [
+    ([None, None], None),
+    ([None, True], True),
+    ([True, False, None], False),
+])
+def test_pending_requests_share_one_run(run_db, serve_once, flags, incremental):
+    requests = [PatrolRunRequest(id=f"r{i}", incremental=flag) for i, flag in enumerate(flags)]
+    async def scenario(session):
+        return await serve_once(session, requests)
+    runs, scheduler, rows = run_db(scenario)
+    assert runs == [incremental]
+    assert scheduler.requests_served == len(flags)
+    assert [(r.status, r.report_id) for r in rows] == [("done", "report-1")] * len(flags)
+
+def test_abandoned_requests_expire_instead_of_running(run_db, serve_once):
+    old = datetime.utcnow() - timedelta(seconds=PatrolScheduler._deadline() + 5)
+    async def scenario(session):
+        return await serve_once(session, [PatrolRunRequest(id="old", created_at=old)])
+    runs, _, rows = run_db(scenario)
+    assert runs == []
+    assert [(r.id, r.status) for r in rows] == [("old", "expired")]
+
+def test_dispatcher_refuses_duplicates_and_overflow():
+    async def scenario():
+        dispatcher = PatrolDispatcher(max_concurrent=1, max_pending=1, timeout=5)
+        release = asyncio.Event()
+        async def run(key, conversation_id, prompt):
+            await release.wait()
+        dispatcher._run = run
+        done = []
+        assert dispatcher.submit(("shop", "a", "app"), "c1", "", on_done=lambda: done.append("a"))
+        assert not dispatcher.submit(("shop", "a", "app"), "c2", "")  # Already queued
+        assert dispatcher.submit(("shop", "b", "app"), "c3", "")
+        assert not dispatcher.submit(("shop", "c", "app"), "c4", "")  # 1 running + 1 pending
+        assert dispatcher.is_active(("shop", "a", "app")) and dispatcher.refused_total == 2
+        release.set()
+        await asyncio.sleep(0.01)
+        assert done == ["a"] and not dispatcher.is_active(("shop", "a", "app"))
+        assert dispatcher.submit(("shop", "c", "app"), "c5", "")
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from types import SimpleNamespace as NS
+
+from kubernetes.client.exceptions import ApiException
+
+from app.features.patrol import scanner
+from app.features.patrol.scanner import PodScanner
+
+def pod(name):
+    return NS(metadata=NS(name=name, namespace="shop"))
+
+class FakeApi:
+    """Pages of pod names served by `_continue` token ("p1", "p2", ...); `expired` tokens answer 410."""
+    def __init__(self, pages, expired=(), fail_at=None):
+        self.pages = pages
+        self.expired = dict(expired)
+        self.fail_at = fail_at
+        self.tokens = []
+        self.v1 = NS(list_pod_for_all_namespaces=self.list_pods)
+
+    def list_pods(self, limit=None, _continue=None):
+        self.tokens.append(_continue)
+        if _continue in self.expired:
+            e = ApiException(status=410)
+            e.body = json.dumps({"metadata": {"continue": self.expired[_continue]}})
+            raise e
+        index = int(_continue[1:]) if _continue else 0
+        if index == self.fail_at:
+            raise RuntimeError("apiserver unavailable")
+        token = f"p{index + 1}" if index + 1 < len(self.pages) else None
+        return NS(items=[pod(n) for n in self.pages[index]], metadata=NS(resource_version=f"rv{index}", _continue=token))
+
+    async def call(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+def scan(monkeypatch, api, page_size=2):
+    monkeypatch.setattr(scanner, "k8s_client", api)
+    visited, flushes = [], []
+    async def visit(p):
+        visited.append(p.metadata.name)
+    async def flush():
+        flushes.append(len(visited))
+    stats = asyncio.run(PodScanner(page_size).scan(visit, flush))
+    return stats, visited, flushes
+
+def test_pages_are_streamed_with_continue_tokens(monkeypatch):
+    api = FakeApi([["a", "b"], ["c", "d"], ["e"]])
+    stats, visited, flushes = scan(monkeypatch, api)
+    assert api.tokens == [None, "p1", "p2"]
+    assert visited == ["a", "b", "c", "d", "e"]
+    assert flushes == [2, 4, 5]  # After every page
+    assert stats["source"] == "api" and stats["complete"] and stats["pages"] == 3 and stats["pods"] == 5
+    assert stats["resource_version"] == "rv0"  # The first page's snapshot
+
+def test_expired_continue_token_resumes_from_the_servers_token(monkeypatch):
+    api = FakeApi([["a"], ["b"], ["c"]], expired={"p1": "p2"})
+    stats, visited, _ = scan(monkeypatch, api, page_size=1)
+    assert api.tokens == [None, "p1", "p2"]
+    assert visited == ["a", "c"]
+    assert stats["complete"]
+
+def test_failed_page_reports_an_incomplete_scan(monkeypatch):
+    api = FakeApi([["a", "b"], ["c", "d"]], fail_at=1)
+    stats, visited, _ = scan(monkeypatch, api)
+    assert visited == ["a", "b"]
+    assert stats["pods"] == 2 and not stats["complete"]
+    assert "apiserver unavailable" in stats["error"]
+
+def test_synced_watch_cache_is_sliced_without_api_calls(monkeypatch):
+    from app.services.cluster_cache import cluster_cache
+    monkeypatch.setattr(cluster_cache, "list", lambda kind: [pod(n) for n in "abcde"])
+    api = FakeApi([])
+    stats, visited, flushes = scan(monkeypatch, api)
+    assert api.tokens == []
+    assert visited == list("abcde") and flushes == [2, 4, 5]
+    assert stats["source"] == "cache" and stats["resource_version"] is None
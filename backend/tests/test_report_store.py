@@ -0,0 +1,60 @@
+from types import SimpleNamespace as NS
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.features.patrol import report_store as report_store_module
+from app.features.patrol.report_store import PatrolReportStore
+
+def report(status, issues=0, mode="full"):
+    diagnosis = {"issues": [{"pod": f"p{i}"} for i in range(issues)], "scan": {"mode": mode}}
+    return {"data": {"status": status, "checks": [{"name": "AI Diagnosis", "data": diagnosis}]}, "markdown": f"# {status}"}
+
+def use_database(monkeypatch, session):
+    monkeypatch.setattr(report_store_module, "AsyncSessionLocal",
+                        sessionmaker(bind=session.bind, class_=AsyncSession, expire_on_commit=False))
+
+def test_only_the_newest_reports_are_kept(run_db, monkeypatch):
+    async def scenario(session):
+        use_database(monkeypatch, session)
+        store = PatrolReportStore(max_entries=10, ttl=60, retention=2)
+        ids = [await store.save(report(status)) for status in ("success", "warning", "failed")]
+        store._cache.clear()
+        return ids, await store.list(), [await store.get(i) for i in ids]
+    ids, listed, reports = run_db(scenario)
+    assert [r["id"] for r in listed] == ids[:0:-1]
+    assert [r["status"] for r in listed] == ["failed", "warning"]
+    assert reports[0] is None and reports[2] == report("failed")
+
+def test_listing_uses_the_plain_columns(run_db, monkeypatch):
+    async def scenario(session):
+        use_database(monkeypatch, session)
+        store = PatrolReportStore(max_entries=10, ttl=60, retention=10)
+        await store.save(report("warning", issues=3, mode="incremental"))
+        return await store.list()
+    [listed] = run_db(scenario)
+    assert (listed["status"], listed["mode"], listed["issue_count"]) == ("warning", "incremental", 3)
+
+def test_reports_are_cached_with_lru_and_ttl(run_db, monkeypatch):
+    clock = NS(now=0.0)
+    monkeypatch.setattr(report_store_module, "time", NS(monotonic=lambda: clock.now))
+    async def scenario(session):
+        use_database(monkeypatch, session)
+        store = PatrolReportStore(max_entries=2, ttl=60, retention=10)
+        a, b, c = [await store.save(report(s)) for s in ("success", "warning", "failed")]
+        assert list(store._cache) == [b, c]  # a evicted
+        assert await store.get(b) == report("warning") and store.hits == 1
+        assert await store.get(a) == report("success") and store.misses == 1  # Read back from the database
+        assert list(store._cache) == [b, a]
+        clock.now = 61
+        assert await store.get(b) == report("warning") and store.misses == 2  # Expired
+    run_db(scenario)
+
+def test_state_is_replaced_per_key(run_db, monkeypatch):
+    async def scenario(session):
+        use_database(monkeypatch, session)
+        store = PatrolReportStore(max_entries=2, ttl=60, retention=10)
+        await store.save_state("findings", {"pods": [1]})
+        await store.save_state("findings", {"pods": [2]})
+        return await store.load_state("findings"), await store.load_state("leader_stats")
+    assert run_db(scenario) == ({"pods": [2]}, None)
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.services.stream_broker import SqliteBroker
+
+class OtherWorker(SqliteBroker):
+    """A second gunicorn worker sharing the broker file."""
+    pid = 424242
+
+@pytest.fixture
+def brokers(tmp_path):
+    path = str(tmp_path / "stream_broker.db")
+    return SqliteBroker(path, 5, 600, 100), OtherWorker(path, 5, 600, 100)
+
+async def publish(broker, run_id, seqs):
+    for seq in seqs:
+        await broker.publish("conv", {"type": "token", "content": str(seq), "seq": seq}, run_id)
+
+def drain(queue):
+    frames = []
+    while not queue.empty():
+        frames.append(queue.get_nowait())
+    return frames
+
+def test_frames_are_only_written_for_remote_subscribers(brokers):
+    owner, viewer = brokers
+
+    async def scenario():
+        run_id = await owner.register_execution("conv")
+        assert await viewer.is_running_elsewhere("conv")
+        assert not await owner.is_running_elsewhere("conv")
+        await publish(owner, run_id, [1, 2])
+        await asyncio.sleep(0.05)
+        unwatched = owner.published_total
+
+        queue = await viewer.subscribe("conv")
+        await asyncio.sleep(0.05)  # The owner notices the subscription
+        await publish(owner, run_id, [3, 4])
+        await owner.unregister_execution("conv", run_id)
+        await asyncio.sleep(0.05)
+        viewer.unsubscribe(queue)
+        return unwatched, drain(queue)
+
+    unwatched, frames = asyncio.run(scenario())
+    assert unwatched == 0
+    assert [f["seq"] for f in frames] == [3, 4]
+
+def test_late_resume_reports_unrecorded_frames(brokers):
+    owner, viewer = brokers
+
+    async def scenario():
+        run_id = await owner.register_execution("conv")
+        await publish(owner, run_id, [1, 2, 3])
+        queue = await viewer.subscribe("conv", last_seq=1)
+        await asyncio.sleep(0.05)
+        await publish(owner, run_id, [4])
+        await owner.unregister_execution("conv", run_id)
+        await asyncio.sleep(0.05)
+        viewer.unsubscribe(queue)
+        return drain(queue)
+
+    assert asyncio.run(scenario()) == [
+        {"type": "gap", "from_seq": 2, "to_seq": 3},
+        {"type": "token", "content": "4", "seq": 4},
+    ]
+
+def test_resume_replays_recorded_frames(brokers):
+    owner, viewer = brokers
+
+    async def scenario():
+        run_id = await owner.register_execution("conv")
+        first = await viewer.subscribe("conv")
+        await asyncio.sleep(0.05)
+        await publish(owner, run_id, [1, 2, 3])
+        await asyncio.sleep(0.05)
+        viewer.unsubscribe(first)
+        # Reconnect (e.g. to this worker again) after seq 1
+        second = await viewer.subscribe("conv", last_seq=1)
+        await asyncio.sleep(0.05)
+        await owner.unregister_execution("conv", run_id)
+        viewer.unsubscribe(second)
+        return drain(second)
+
+    assert [f["seq"] for f in asyncio.run(scenario())] == [2, 3]
+
+def test_stop_is_forwarded_to_the_owner(brokers):
+    owner, viewer = brokers
+
+    async def scenario():
+        stopped = asyncio.Event()
+        run_id = await owner.register_execution("conv", stopped.set)
+        assert await viewer.request_cancel("conv")
+        await asyncio.wait_for(stopped.wait(), 1)
+        await owner.unregister_execution("conv", run_id)
+        return await viewer.request_cancel("conv")
+
+    assert asyncio.run(scenario()) is False
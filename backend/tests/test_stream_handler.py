@@ -0,0 +1,53 @@
+import asyncio
+
+from app.agent.stream import CoalescingStreamHandler
+
+class RecordingHandler(CoalescingStreamHandler):
+    def __init__(self, coalesce=True):
+        super().__init__(coalesce)
+        self.frames = []
+
+    async def _emit(self, frame):
+        self.frames.append(frame)
+
+def test_tokens_are_coalesced_and_flushed_before_other_events():
+    async def scenario():
+        handler = RecordingHandler()
+        for token in ["Che", "cking", " pods"]:
+            await handler.send({"type": "token", "content": token})
+        await handler.send({"type": "tool_start", "tool": "run_kubectl"})
+        await handler.send({"type": "token", "content": "Done"})
+        await handler.send({"type": "done"})
+        return handler.frames
+
+    assert asyncio.run(scenario()) == [
+        {"type": "token", "content": "Checking pods", "count": 3, "seq": 1},
+        {"type": "tool_start", "tool": "run_kubectl", "seq": 2},
+        {"type": "token", "content": "Done", "count": 1, "seq": 3},
+        {"type": "done", "seq": 4},
+    ]
+
+def test_flush_on_size_and_interval():
+    async def scenario():
+        handler = RecordingHandler()
+        handler.max_bytes = 8
+        handler.flush_interval = 0.01
+        await handler.send({"type": "token", "content": "12345"})
+        await handler.send({"type": "token", "content": "6789"})  # 9 bytes: flushed now
+        sized = list(handler.frames)
+        await handler.send({"type": "token", "content": "tail"})
+        await asyncio.sleep(0.05)  # Flushed by the timer
+        return sized, handler.frames[len(sized):]
+
+    sized, timed = asyncio.run(scenario())
+    assert [f["content"] for f in sized] == ["123456789"]
+    assert [(f["content"], f["seq"]) for f in timed] == [("tail", 2)]
+
+def test_uncoalesced_tokens_are_numbered_individually():
+    async def scenario():
+        handler = RecordingHandler(coalesce=False)
+        await handler.send({"type": "token", "content": "a"})
+        await handler.send({"type": "token", "content": "b"})
+        return handler.frames
+
+    assert asyncio.run(scenario()) == [{"type": "token", "content": "a", "seq": 1}, {"type": "token", "content": "b", "seq": 2}]
@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services import tool_cache
+from app.services.tool_cache import ToolResultCache
+
+def counting_handler(delay: float = 0.0):
+    calls = []
+
+    async def handler(**arguments):
+        calls.append(arguments)
+        await asyncio.sleep(delay)
+        return f"result {len(calls)}"
+    return handler, calls
+
+def test_identical_concurrent_calls_share_one_execution():
+    cache = ToolResultCache(max_entries=10, default_ttl=60)
+    handler, calls = counting_handler(0.01)
+    cached = cache.wrap("get_pods", handler, policy=True)
+
+    async def scenario():
+        return await asyncio.gather(*[cached(namespace="shop") for _ in range(5)])
+
+    assert asyncio.run(scenario()) == ["result 1"] * 5
+    assert len(calls) == 1
+    assert (cache.misses, cache.shared) == (1, 4)
+
+def test_hits_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = ToolResultCache(max_entries=10, default_ttl=60)
+    handler, calls = counting_handler()
+    cached = cache.wrap("get_pods", handler, policy=True)
+
+    async def scenario():
+        first = await cached(namespace="shop")
+        hit = await cached(namespace="shop")
+        now[0] += 61
+        return first, hit, await cached(namespace="shop")
+
+    assert asyncio.run(scenario()) == ("result 1", "result 1", "result 2")
+    assert cache.hits == 1
+
+def test_least_recently_used_is_evicted():
+    cache = ToolResultCache(max_entries=2, default_ttl=60)
+    handler, calls = counting_handler()
+    cached = cache.wrap("get", handler, policy=True)
+
+    async def scenario():
+        for name in ["a", "b", "a", "c", "a", "b"]:
+            await cached(name=name)
+
+    asyncio.run(scenario())
+    # "b" was evicted by "c" (a was used more recently); "a" stayed cached
+    assert [c["name"] for c in calls] == ["a", "b", "c", "b"]
+
+def test_write_invalidates_own_and_listed_tools():
+    cache = ToolResultCache(max_entries=10, default_ttl=60)
+    kubectl, kubectl_calls = counting_handler()
+    search, search_calls = counting_handler()
+    # kubectl: reads are cached, writes are not and invalidate
+    run_kubectl = cache.wrap("run_kubectl", kubectl, policy=lambda args: args["args"].startswith("get"),
+                             invalidates=["search"])
+    cached_search = cache.wrap("search", search, policy=True)
+
+    async def scenario():
+        await run_kubectl(args="get pods")
+        await cached_search(query="oom")
+        await run_kubectl(args="delete pod web-1")
+        await run_kubectl(args="get pods")
+        await cached_search(query="oom")
+
+    asyncio.run(scenario())
+    assert [c["args"] for c in kubectl_calls] == ["get pods", "delete pod web-1", "get pods"]
+    assert len(search_calls) == 2
+    assert cache.bypassed == 1
+
+def test_read_during_write_is_not_cached():
+    cache = ToolResultCache(max_entries=10, default_ttl=60)
+    handler, calls = counting_handler(0.02)
+    cached = cache.wrap("run_kubectl", handler, policy=lambda args: args["args"].startswith("get"))
+
+    async def scenario():
+        read = asyncio.create_task(cached(args="get pods"))
+        await asyncio.sleep(0)
+        await cached(args="scale deploy web --replicas=0")
+        await read
+        await cached(args="get pods")
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    cache = ToolResultCache(max_entries=10, default_ttl=60)
+    handler, calls = counting_handler(0.02)
+    cached = cache.wrap("get_pods", handler, policy=True)
+
+    async def scenario():
+        first = asyncio.create_task(cached(namespace="shop"))
+        second = asyncio.create_task(cached(namespace="shop"))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "result 1"
+    assert cache.stats()["entries"] == 1
+
+def test_errors_are_not_cached():
+    cache = ToolResultCache(max_entries=10, default_ttl=60)
+    attempts = []
+
+    async def flaky(**arguments):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("apiserver unavailable")
+        return "ok"
+    cached = cache.wrap("get_pods", flaky, policy=True)
+
+    async def scenario():
+        try:
+            await cached()
+        except RuntimeError:
+            pass
+        return await cached()
+
+    assert asyncio.run(scenario()) == "ok"
+    assert len(attempts) == 2
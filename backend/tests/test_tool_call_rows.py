@@ -0,0 +1,37 @@
+from langchain_core.messages import AIMessage, ToolMessage
+
+from app.services.chat_history import ChatHistoryService, MessageBuffer
+from app.services.context_builder import to_langchain
+
+def test_tool_calls_round_trip_and_usage(run_db):
+    async def scenario(session):
+        first = (await ChatHistoryService.create_conversation(session)).id
+        second = (await ChatHistoryService.create_conversation(session)).id
+        buffer = MessageBuffer(session, first, "end")
+        await buffer.add("assistant", "Checking", dedupe_key="ai-1", tool_calls=[
+            {"id": "call-1", "name": "run_kubectl", "args": {"args": "get pods -n shop"}},
+            {"id": "call-2", "name": "query_loki", "args": {"query": "{app=\"web\"}"}},
+        ])
+        await buffer.add("tool", "web-1 Running", tool_call_id="call-1", tool_name="run_kubectl")
+        await buffer.flush()
+        other = MessageBuffer(session, second, "end")
+        await other.add("assistant", "", tool_calls=[{"id": "call-3", "name": "run_kubectl", "args": {}}])
+        await other.flush()
+        session.expunge_all()  # Read back from the database, not the identity map
+
+        rows = await ChatHistoryService.get_recent_messages(session, first)
+        return ([to_langchain(r) for r in rows], await ChatHistoryService.get_tool_usage(session),
+                await ChatHistoryService.get_tool_usage(session, second))
+
+    messages, usage, usage_second = run_db(scenario)
+
+    ai, tool = messages
+    assert isinstance(ai, AIMessage) and ai.content == "Checking"
+    assert [(tc["id"], tc["name"], tc["args"]) for tc in ai.tool_calls] == [
+        ("call-1", "run_kubectl", {"args": "get pods -n shop"}),
+        ("call-2", "query_loki", {"query": "{app=\"web\"}"}),
+    ]
+    assert isinstance(tool, ToolMessage) and (tool.tool_call_id, tool.name) == ("call-1", "run_kubectl")
+    assert usage == [{"name": "run_kubectl", "calls": 2, "conversations": 2},
+                     {"name": "query_loki", "calls": 1, "conversations": 1}]
+    assert usage_second == [{"name": "run_kubectl", "calls": 1, "conversations": 1}]
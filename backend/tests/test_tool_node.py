@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.agent.graph.nodes import tools
+from app.services.plugin_manager import plugin_manager
+from app.services.tool_executor import ToolExecutor, _parse_limits
+
+def test_parse_limits():
+    assert _parse_limits("run_kubectl=4, save_insight=1,bad,x=y") == {"run_kubectl": 4, "save_insight": 1}
+    assert _parse_limits("") == {}
+
+def test_per_tool_concurrency_limit():
+    executor = ToolExecutor(max_threads=4, default_limit=2, limits={"slow": 1})
+    running = {"slow": 0, "fast": 0}
+    peak = {"slow": 0, "fast": 0}
+
+    def handler(name):
+        async def run():
+            running[name] += 1
+            peak[name] = max(peak[name], running[name])
+            await asyncio.sleep(0.01)
+            running[name] -= 1
+        return run
+
+    async def scenario():
+        await asyncio.gather(*[executor.run(name, handler(name), {}) for name in ["slow"] * 3 + ["fast"] * 3])
+
+    asyncio.run(scenario())
+    assert peak == {"slow": 1, "fast": 2}
+    assert executor.calls_total == 6
+
+def test_sync_handlers_run_off_the_loop():
+    executor = ToolExecutor(max_threads=2, default_limit=2, limits={})
+    assert asyncio.run(executor.run("t", lambda: threading.current_thread().name, {})).startswith("tool")
+
+def test_reads_run_together_and_writes_alone(monkeypatch):
+    events = []
+
+    def handler(name):
+        async def run(**arguments):
+            events.append(f"start {name}")
+            await asyncio.sleep(0.01)
+            events.append(f"end {name}")
+            return f"{name} done"
+        return run
+
+    monkeypatch.setattr(plugin_manager, "get_tool_handler", handler)
+    monkeypatch.setattr(plugin_manager, "is_read_only", lambda name, arguments: name.startswith("get"))
+    calls = [{"name": name, "args": {}, "id": f"call-{i}"}
+             for i, name in enumerate(["get_pods", "get_events", "scale", "get_pods_again"])]
+    state = {"messages": [HumanMessage(content="scale it, yes"), AIMessage(content="", tool_calls=calls)]}
+
+    result = asyncio.run(tools.tool_node(state))
+
+    assert [m.tool_call_id for m in result["messages"]] == ["call-0", "call-1", "call-2", "call-3"]
+    assert result["messages"][2].content == "scale done"
+    assert events == [
+        "start get_pods", "start get_events", "end get_pods", "end get_events",
+        "start scale", "end scale",
+        "start get_pods_again", "end get_pods_again",
+    ]
@@ -8,6 +8,7 @@ import { AlertsPage } from './components/features/alerts/AlertsPage'
 import PluginDashboard from './components/features/plugins/PluginDashboard'
 import { SettingsPage } from './components/features/settings/SettingsPage'
 import { useChatWebSocket } from './hooks/useChatWebSocket'
+import { getConversationMessages } from './api/conversations'
 
 function App() {
     console.log("Rendering App Component");
@@ -53,31 +54,15 @@ function App() {
         const fetchHistory = async () => {
             console.log(`App: Fetching history for ${currentConversationId}...`);
             try {
-                const res = await fetch(`/api/conversations/${currentConversationId}/messages`);
-                if (res.ok) {
-                    const data = await res.json();
-                    console.log(`App: History loaded. Count: ${data.length}`);
-
-                    // Post-process history to recover "Thought" state (Heuristic)
-                    const processed = data.map((msg: any, idx: number) => {
-                        if (msg.role !== 'assistant') return msg;
-                        const nextMsg = data[idx + 1];
-                        // Heuristic: If followed by Tool or another Assistant, it is likely a Thought/Reasoning step
-                        if (nextMsg && (nextMsg.role === 'tool' || nextMsg.role === 'assistant')) {
-                            return { ...msg, isThought: true };
-                        }
-                        return msg;
-                    });
-
-                    setMessages(processed);
+                const history = await getConversationMessages(currentConversationId);
+                if (history) {
+                    console.log(`App: History loaded. Count: ${history.length}`);
+                    setMessages(history);
                 } else {
-                    console.warn(`App: Fetch failed with status ${res.status}`);
-                    if (res.status === 404) {
-                        console.warn("Conversation not found, resetting state.");
-                        setCurrentConversationId(null);
-                        setUiSelectedId(null);
-                        localStorage.removeItem("activeConversationId");
-                    }
+                    console.warn("Conversation not found, resetting state.");
+                    setCurrentConversationId(null);
+                    setUiSelectedId(null);
+                    localStorage.removeItem("activeConversationId");
                 }
             } catch (e) {
                 console.error("Failed to load history", e);
@@ -0,0 +1,25 @@
+import { API_BASE_URL } from '../config';
+import type { Message } from '../hooks/useChatWebSocket';
+
+// Messages of a conversation, or null if it does not exist (404)
+export const getConversationMessages = async (conversationId: string): Promise<Message[] | null> => {
+    const response = await fetch(`${API_BASE_URL}/conversations/${conversationId}/messages`);
+    if (response.status === 404) {
+        return null;
+    }
+    if (!response.ok) {
+        throw new Error(`Failed to fetch history (${response.status})`);
+    }
+    const data = await response.json();
+
+    // Post-process history to recover "Thought" state (Heuristic)
+    return data.map((msg: any, idx: number) => {
+        if (msg.role !== 'assistant') return msg;
+        const nextMsg = data[idx + 1];
+        // Heuristic: If followed by Tool or another Assistant, it is likely a Thought/Reasoning step
+        if (nextMsg && (nextMsg.role === 'tool' || nextMsg.role === 'assistant')) {
+            return { ...msg, isThought: true };
+        }
+        return msg;
+    });
+};
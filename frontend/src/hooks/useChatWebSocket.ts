@@ -1,4 +1,9 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
+import { getConversationMessages } from '../api/conversations';
+
+// Reconnect attempts after an abnormal close (e.g. evicted as a slow client), with exponential backoff
+const MAX_RECONNECT_ATTEMPTS = 5;
+const RECONNECT_BASE_DELAY_MS = 500;
 
 export interface Message {
     role: 'user' | 'assistant' | 'system' | 'tool';
@@ -21,21 +26,50 @@ export const useChatWebSocket = (conversationId: string | null, onConversationIn
 
     const wsRef = useRef<WebSocket | null>(null);
     const contentRef = useRef<string>("");
+    // Resume state: the conversation this socket streams (also set by 'init'), and the seq of
+    // the last stream frame received from the current run (sent back as `last_seq` on reconnect)
+    const activeIdRef = useRef<string | null>(conversationId);
+    const lastSeqRef = useRef<number | null>(null);
+    const reconnectAttemptsRef = useRef<number>(0);
+    const reconnectTimerRef = useRef<number | null>(null);
     // Reset state when conversation ID changes
     useEffect(() => {
         setMessages([]);
         setStreamingContent("");
         setCurrentTool(null);
         setStatus('idle');
+        activeIdRef.current = conversationId;
+        lastSeqRef.current = null;
     }, [conversationId]);
 
+    // Frames were lost (replay buffer overrun, or the run ended while we were away):
+    // take the persisted history and keep streaming from here
+    const reloadHistory = useCallback(async () => {
+        const id = activeIdRef.current;
+        if (!id) return;
+        try {
+            const history = await getConversationMessages(id);
+            if (history) {
+                setMessages(history);
+            }
+        } catch (e) {
+            console.error("Failed to reload history", e);
+        }
+        contentRef.current = "";
+        setStreamingContent("");
+        setCurrentTool(null);
+    }, []);
+
     const connect = useCallback(() => {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
         const host = window.location.host;
         let wsUrl = `${protocol}//${host}/api/chat/ws`;
 
-        if (conversationId) {
-            wsUrl += `?conversation_id=${conversationId}`;
+        if (activeIdRef.current) {
+            wsUrl += `?conversation_id=${activeIdRef.current}`;
+            if (lastSeqRef.current !== null) {
+                wsUrl += `&last_seq=${lastSeqRef.current}`;
+            }
         }
 
         console.log(`Connecting to WS: ${wsUrl}`);
@@ -43,22 +77,44 @@ export const useChatWebSocket = (conversationId: string | null, onConversationIn
 
         ws.onopen = () => {
             console.log("WS Connected");
-            setStatus('connected');
+            reconnectAttemptsRef.current = 0;
+            // A resumed run keeps streaming; its frames set the status again
+            setStatus(prev => (prev === 'streaming' && lastSeqRef.current !== null) ? prev : 'connected');
         };
 
         ws.onmessage = (event) => {
             try {
                 const data = JSON.parse(event.data);
+                if (typeof data.seq === 'number') {
+                    lastSeqRef.current = data.seq;
+                }
 
                 switch (data.type) {
                     case 'init':
                         // New session created by backend
                         console.log("WS Session Init:", data.conversation_id);
+                        activeIdRef.current = data.conversation_id;
                         if (onConversationInit) {
                             onConversationInit(data.conversation_id, data.title);
                         }
                         break;
 
+                    case 'resume':
+                        // Answer to a reconnect with last_seq
+                        if (!data.running) {
+                            console.log("WS Resume: run already finished, reloading history");
+                            lastSeqRef.current = null;
+                            setStatus('connected');
+                            reloadHistory();
+                        }
+                        break;
+
+                    case 'gap':
+                    case 'resync':
+                        console.warn(`WS ${data.type}: stream frames were missed, reloading history`);
+                        reloadHistory();
+                        break;
+
                     case 'token':
                         setStatus('streaming');
                         contentRef.current += data.content;
@@ -106,6 +162,7 @@ export const useChatWebSocket = (conversationId: string | null, onConversationIn
                     case 'done':
                         console.log("WS Done Event. Content length:", contentRef.current.length);
                         setStatus('connected');
+                        lastSeqRef.current = null;
                         if (contentRef.current) {
                             const finalContent = contentRef.current;
                             console.log("Appending FINAL message:", finalContent.substring(0, 50));
@@ -138,6 +195,18 @@ export const useChatWebSocket = (conversationId: string | null, onConversationIn
                 return;
             }
 
+            // Reconnect and resume the stream after the last frame we got
+            if (activeIdRef.current && wsRef.current === ws && reconnectAttemptsRef.current < MAX_RECONNECT_ATTEMPTS) {
+                const delay = RECONNECT_BASE_DELAY_MS * 2 ** reconnectAttemptsRef.current;
+                reconnectAttemptsRef.current += 1;
+                console.log(`WS reconnecting in ${delay}ms (last_seq: ${lastSeqRef.current})`);
+                reconnectTimerRef.current = window.setTimeout(() => {
+                    reconnectTimerRef.current = null;
+                    connect();
+                }, delay);
+                return;
+            }
+
             // If we have pending content when abnormally closed, save it
             if (contentRef.current) {
                 console.log("Committing interrupted message:", contentRef.current);
@@ -149,12 +218,19 @@ export const useChatWebSocket = (conversationId: string | null, onConversationIn
         };
 
         wsRef.current = ws;
-    }, [conversationId, onConversationInit]); // Reconnect when ID changes
+    }, [conversationId, onConversationInit, reloadHistory]); // Reconnect when ID changes
 
     useEffect(() => {
         connect();
         return () => {
-            wsRef.current?.close();
+            if (reconnectTimerRef.current !== null) {
+                window.clearTimeout(reconnectTimerRef.current);
+                reconnectTimerRef.current = null;
+            }
+            reconnectAttemptsRef.current = 0;
+            const ws = wsRef.current;
+            wsRef.current = null;
+            ws?.close();
         };
     }, [connect]);
 
@@ -169,6 +245,7 @@ export const useChatWebSocket = (conversationId: string | null, onConversationIn
 
         // UI Updates
         contentRef.current = "";
+        lastSeqRef.current = null; // The new run numbers its frames from 1
         setStreamingContent("");
         setCurrentTool(null);
         setStatus('streaming');